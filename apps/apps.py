@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AppsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps"
+
+    def ready(self):
+        # Reason: importing the module connects the response cache invalidation receivers.
+        from apps import signals  # noqa: F401
+        from django.db.backends.signals import connection_created
+        from apps.tracing import install_sql_recorder
+
+        connection_created.connect(install_sql_recorder)
@@ -0,0 +1,106 @@
+import copy
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.http.response import HttpResponseBadRequest
+from graphene_django.views import HttpError
+from graphql import OperationType
+
+
+class ResolvedOperation(NamedTuple):
+    """
+    A request body's parameters and document, resolved once per operation.
+
+    Fields:
+        params (Tuple): ``(query, variables, operation_name, id)`` as returned
+            by ``get_graphql_params``.
+        entry (Optional[CachedDocument]): The document, or None without a
+            query or when the query does not parse.
+        operation_ast (Optional[OperationDefinitionNode]): The operation the
+            request selects, if any.
+    """
+
+    params: Tuple
+    entry: Any
+    operation_ast: Any
+
+    @property
+    def is_query(self) -> bool:
+        """
+        True for a query, safe to run beside its batch neighbours.
+
+        Operations that cannot be parsed count as queries: they fail without
+        executing anything.
+        """
+        return (
+            self.operation_ast is None
+            or self.operation_ast.operation == OperationType.QUERY
+        )
+
+
+def get_batch_settings() -> dict:
+    config = {"ENABLED": True, "MAX_OPERATIONS": 25}
+    config.update(getattr(settings, "GRAPHQL_BATCH", {}))
+    return config
+
+
+def parse_batch(body: bytes) -> Optional[List[dict]]:
+    """
+    Return the operations of a batched JSON request body.
+
+    Args:
+        body (bytes): Raw ``application/json`` request body.
+    Returns:
+        Optional[List[dict]]: The operations, or None if the body is not a
+        JSON array or batching is disabled.
+    Raises:
+        HttpError: If the array is empty, too long or holds a non-object.
+    """
+    config = get_batch_settings()
+    if not config["ENABLED"] or body.lstrip()[:1] != b"[":
+        return None
+    try:
+        operations = json.loads(body)
+    except ValueError:
+        raise HttpError(HttpResponseBadRequest("POST body sent invalid JSON."))
+    if not operations:
+        raise HttpError(HttpResponseBadRequest("Received an empty list in the batch request."))
+    if len(operations) > config["MAX_OPERATIONS"]:
+        raise HttpError(
+            HttpResponseBadRequest(
+                f"Batch of {len(operations)} operations exceeds the maximum of "
+                f"{config['MAX_OPERATIONS']}."
+            )
+        )
+    if not all(isinstance(operation, dict) for operation in operations):
+        raise HttpError(HttpResponseBadRequest("Every batched operation must be a JSON object."))
+    return operations
+
+
+def operation_request(request, loaders):
+    """
+    Copy a batched request for one of its operations.
+
+    The view keeps per-operation state such as response cache tags, traces
+    and mutation errors on the request, so each operation gets its own
+    shallow copy. The copies of neighbouring query operations share
+    ``loaders``, so keys they load are fetched together.
+
+    Args:
+        request (HttpRequest): The batched request.
+        loaders (Optional[LoaderRegistry]): Registry shared with the other
+            operations, or None for a fresh one.
+    Returns:
+        HttpRequest: A copy sharing body, headers and user with ``request``.
+    """
+    operation = copy.copy(request)
+    operation.loaders = loaders
+    return operation
+
+
+def encode_batch(results: List[str]) -> str:
+    """
+    Join encoded operation results into a JSON array, in input order.
+    """
+    return "[{}]".format(",".join(results))
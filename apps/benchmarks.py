@@ -0,0 +1,354 @@
+import math
+import time
+from itertools import cycle
+from types import SimpleNamespace
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+from django.db import connection
+from graphql import execute, get_operation_ast, parse, validate
+from apps.compiler import CompiledDeferredExecutionContext, compile_plan
+from apps.dataloaders import (
+    AppCountsLoader,
+    AppLoader,
+    UserAppsLoader,
+    UserLoader,
+    entity_cache,
+)
+from apps.execution import DeferredExecutionContext
+from apps.models import DeployedApp, User
+from apps.plans import change_plans
+from apps.schema import encode_relay_ids, schema
+from apps.tracing import Trace, TracingMiddleware, activate
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a benchmark scenario issues more SQL queries than its budget.
+    """
+
+
+class Scenario(NamedTuple):
+    """
+    One repeatable benchmark.
+
+    Fields:
+        name (str): Dotted name, grouped by what is measured.
+        run (Callable[[], int]): Runs one iteration and returns the rows it
+            produced.
+        query_budget (int): Most SQL queries one iteration may issue.
+        teardown (Optional[Callable[[], None]]): Undoes writes after the run.
+    """
+
+    name: str
+    run: Callable[[], int]
+    query_budget: int
+    teardown: Optional[Callable[[], None]] = None
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Timings and query counts of one scenario.
+
+    Fields:
+        name (str): Scenario name.
+        iterations (int): Measured iterations.
+        rows (int): Rows produced per iteration.
+        p50 (float): Median iteration time in milliseconds.
+        p95 (float): 95th percentile iteration time in milliseconds.
+        p99 (float): 99th percentile iteration time in milliseconds.
+        rows_per_second (float): Rows produced per second over all iterations.
+        queries (int): Most SQL queries issued by one iteration.
+        query_budget (int): The scenario's query budget.
+    """
+
+    name: str
+    iterations: int
+    rows: int
+    p50: float
+    p95: float
+    p99: float
+    rows_per_second: float
+    queries: int
+    query_budget: int
+
+    @property
+    def within_budget(self) -> bool:
+        return self.queries <= self.query_budget
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of ``samples``.
+    """
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class QueryCounter:
+    """
+    Connection execute wrapper counting SQL statements.
+
+    Cheaper than ``CaptureQueriesContext``, which also records the SQL text,
+    so counting barely affects the timings it runs beside.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_scenario(scenario: Scenario, iterations: int = 20, warmup: int = 2) -> BenchmarkResult:
+    """
+    Time a scenario and count its queries.
+
+    The entity cache is cleared before every iteration, so loaders are
+    measured against the database rather than cached rows.
+
+    Args:
+        scenario (Scenario): Benchmark to run.
+        iterations (int): Measured iterations.
+        warmup (int): Unmeasured iterations run first.
+    Returns:
+        BenchmarkResult: Percentiles, throughput and the largest query count.
+    """
+    try:
+        for _ in range(warmup):
+            entity_cache.clear()
+            scenario.run()
+        timings, queries, rows = [], 0, 0
+        for _ in range(iterations):
+            entity_cache.clear()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                rows = scenario.run()
+                timings.append(time.perf_counter() - started)
+            queries = max(queries, counter.count)
+    finally:
+        if scenario.teardown is not None:
+            scenario.teardown()
+
+    total = sum(timings)
+    return BenchmarkResult(
+        name=scenario.name,
+        iterations=iterations,
+        rows=rows,
+        p50=percentile(timings, 50) * 1000,
+        p95=percentile(timings, 95) * 1000,
+        p99=percentile(timings, 99) * 1000,
+        rows_per_second=rows * iterations / total if total else 0.0,
+        queries=queries,
+        query_budget=scenario.query_budget,
+    )
+
+
+def check_budgets(results: Iterable[BenchmarkResult]):
+    """
+    Raises:
+        QueryBudgetExceeded: If any result issued more queries than its budget.
+    """
+    over = [result for result in results if not result.within_budget]
+    if over:
+        raise QueryBudgetExceeded(
+            "; ".join(
+                f"{result.name} issued {result.queries} queries "
+                f"(budget {result.query_budget})"
+                for result in over
+            )
+        )
+
+
+def _count_rows(value) -> int:
+    """
+    Count the non-null list items in a response, at every depth.
+    """
+    if isinstance(value, dict):
+        return sum(_count_rows(item) for item in value.values())
+    if isinstance(value, list):
+        return sum((item is not None) + _count_rows(item) for item in value)
+    return 0
+
+
+def _execute(query: str, variables=None) -> dict:
+    result = schema.execute(query, variables=variables)
+    if result.errors:
+        raise result.errors[0]
+    return result.data
+
+
+def _query_scenario(name: str, query: str, query_budget: int, variables=None) -> Scenario:
+    return Scenario(
+        name, lambda: _count_rows(_execute(query, variables)), query_budget
+    )
+
+
+def _traced_scenario(name: str, query: str, query_budget: int, variables=None) -> Scenario:
+    """
+    Run a query the way the view runs a traced request, to compare against
+    the untraced scenario for the same query.
+    """
+    middleware = [TracingMiddleware()]
+
+    def run():
+        with activate(Trace(requested=True)):
+            result = schema.execute(query, variables=variables, middleware=middleware)
+        if result.errors:
+            raise result.errors[0]
+        return _count_rows(result.data)
+
+    return Scenario(name, run, query_budget)
+
+
+def _execution_scenario(
+    name: str, query: str, query_budget: int, variables=None, compiled: bool = False
+) -> Scenario:
+    """
+    Execute a query parsed and validated once, the way the view runs a
+    cached document, with or without its compiled plan.
+    """
+    document = parse(query)
+    errors = validate(schema.graphql_schema, document)
+    if errors:
+        raise errors[0]
+    plan = None
+    execution_context_class = DeferredExecutionContext
+    if compiled:
+        plan = compile_plan(schema.graphql_schema, document, get_operation_ast(document))
+        execution_context_class = CompiledDeferredExecutionContext
+
+    def run():
+        result = execute(
+            schema.graphql_schema,
+            document,
+            context_value=SimpleNamespace(graphql_plan=plan),
+            variable_values=variables,
+            execution_context_class=execution_context_class,
+        )
+        if result.errors:
+            raise result.errors[0]
+        return _count_rows(result.data)
+
+    return Scenario(name, run, query_budget)
+
+
+SCALARS_QUERY = """
+query ($first: Int!) {
+  allUsers(first: $first) {
+    edges { node { id username plan createdAt updatedAt } }
+  }
+}
+"""
+
+NESTED_QUERY = """
+query ($first: Int!) {
+  allUsers(first: $first) {
+    edges { node { username appCount activeAppCount
+      apps { edges { node { id active owner { username } } } } } }
+  }
+}
+"""
+
+NODES_QUERY = """
+query ($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on UserNode { username }
+    ... on DeployedAppNode { active }
+  }
+}
+"""
+
+BULK_PLAN_MUTATION = """
+mutation ($ids: [ID!]!) {
+  %s(userIds: $ids) { results { status user { plan } } }
+}
+"""
+
+
+def build_scenarios(sample_size: int = 100) -> List[Scenario]:
+    """
+    Build the standard scenarios over the first ``sample_size`` users and apps.
+
+    Query budgets are the batched query counts of each path; a resolver
+    that starts querying per row pushes its scenario over budget no matter
+    how fast the database is.
+
+    Returns:
+        List[Scenario]: Loader, root resolver, query, tracing, compiled
+            execution and mutation benchmarks.
+    """
+    user_ids = list(
+        User.objects.order_by("created_at", "id").values_list("id", flat=True)[:sample_size]
+    )
+    app_ids = list(
+        DeployedApp.objects.order_by("created_at", "id").values_list("id", flat=True)[
+            :sample_size
+        ]
+    )
+    count_keys = [
+        (user_id, field) for user_id in user_ids for field in ("app_count", "active_app_count")
+    ]
+    plans = dict(User.objects.filter(id__in=user_ids).values_list("id", "plan"))
+    global_user_ids = encode_relay_ids("UserNode", user_ids)
+    node_ids = global_user_ids + encode_relay_ids("DeployedAppNode", app_ids)
+    # Reason: alternating directions makes every iteration change every user.
+    mutations = cycle(["upgradeAccounts", "downgradeAccounts"])
+
+    def flip_plans():
+        mutation = next(mutations)
+        data = _execute(BULK_PLAN_MUTATION % mutation, {"ids": global_user_ids})
+        return len(data[mutation]["results"])
+
+    def restore_plans():
+        for plan in ("HOBBY", "PRO"):
+            change_plans([pk for pk, value in plans.items() if value == plan], plan)
+
+    return [
+        Scenario("loader.users", lambda: len(UserLoader().load_many(user_ids)), 1),
+        Scenario("loader.apps", lambda: len(AppLoader().load_many(app_ids)), 1),
+        Scenario(
+            "loader.user_apps",
+            lambda: sum(map(len, UserAppsLoader().load_many(user_ids))),
+            1,
+        ),
+        Scenario(
+            "loader.app_counts", lambda: len(AppCountsLoader().load_many(count_keys)), 1
+        ),
+        _query_scenario(
+            "resolver.all_users",
+            "query ($first: Int!) "
+            "{ allUsers(first: $first) { edges { node { id username plan } } } }",
+            1,
+            {"first": sample_size},
+        ),
+        _query_scenario(
+            "resolver.all_apps",
+            "query ($first: Int!) "
+            "{ allApps(first: $first, active: true) { edges { node { id active } } } }",
+            1,
+            {"first": sample_size},
+        ),
+        _query_scenario("resolver.nodes", NODES_QUERY, 2, {"ids": node_ids}),
+        # Reason: users, their apps joined to owners, and one GROUP BY for the counts.
+        _query_scenario("query.users_apps_owners", NESTED_QUERY, 3, {"first": sample_size}),
+        # Reason: the untraced query above is the baseline for tracing overhead.
+        _traced_scenario(
+            "tracing.users_apps_owners", NESTED_QUERY, 3, {"first": sample_size}
+        ),
+        # Reason: the standard executor is the baseline for each compiled plan.
+        *(
+            _execution_scenario(
+                f"{executor}.{name}", query, budget, {"first": sample_size}, compiled
+            )
+            for name, query, budget in (
+                ("users_scalars", SCALARS_QUERY, 1),
+                ("users_apps_owners", NESTED_QUERY, 3),
+            )
+            for executor, compiled in (("standard", False), ("compiled", True))
+        ),
+        # Reason: one UPDATE ... RETURNING and one batched load of the changed users.
+        Scenario("mutation.bulk_plan_change", flip_plans, 2, teardown=restore_plans),
+    ]
@@ -0,0 +1,308 @@
+import io
+import json
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as datetime_time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from apps.dataloaders import invalidate_entities
+from apps.ids import allocate_ids
+from apps.models import DeployedApp, User, app_counters_enabled, refresh_app_counters
+from apps.response_cache import invalidate_tags, invalidate_updated_rows, tags_for_write
+
+IMPORT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 1 << 16
+
+_SEPARATORS = " \t\r\n,[]"
+
+
+class BulkImportError(Exception):
+    """
+    Raised for input that is not a stream of Django serialized objects.
+    """
+
+
+def iter_records(stream, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yield the objects of a JSON array or NDJSON stream one at a time.
+
+    Only ``chunk_size`` characters plus the object being decoded are held in
+    memory, so a fixture of any size streams at constant memory. Whitespace,
+    commas and the brackets of a top-level array are skipped between
+    objects, which makes ``dumpdata`` output, NDJSON and concatenated
+    objects all valid input.
+
+    Args:
+        stream: Text stream to read.
+        chunk_size (int): Characters read at a time.
+    Raises:
+        BulkImportError: On malformed JSON or a top-level value that is not
+            an object.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in _SEPARATORS:
+            position += 1
+        if position < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if eof:
+                    raise BulkImportError(f"Invalid JSON: {error}") from error
+            else:
+                if not isinstance(record, dict):
+                    raise BulkImportError("Expected a JSON object per record.")
+                position = end
+                yield record
+                continue
+        elif eof:
+            return
+        # Reason: the next object is incomplete or missing; read more after it.
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def copy_value(value) -> str:
+    """
+    Encode a database-prepared value as a field of PostgreSQL's COPY text format.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date, datetime_time)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def write_bulk_create(model, objs: List, using: str, ignore_conflicts: bool) -> int:
+    """
+    Insert rows with ``bulk_create``, which assigns ids to rows without one.
+
+    ``bulk_create`` does not report skipped rows, so with ``ignore_conflicts``
+    the batch's keys are counted before and after the insert.
+
+    Returns:
+        int: Rows inserted.
+    """
+    manager = model._default_manager.db_manager(using)
+    present = 0
+    if ignore_conflicts:
+        keys = [obj.pk for obj in objs if obj.pk is not None]
+        present = manager.filter(pk__in=keys).count() if keys else 0
+    manager.bulk_create(objs, batch_size=len(objs), ignore_conflicts=ignore_conflicts)
+    if not ignore_conflicts:
+        return len(objs)
+    return manager.filter(pk__in=[obj.pk for obj in objs]).count() - present
+
+
+def write_copy(model, objs: List, using: str, ignore_conflicts: bool) -> int:
+    """
+    Insert rows with PostgreSQL's ``COPY ... FROM STDIN``.
+
+    Values go through the same ``pre_save`` and ``get_db_prep_save`` steps
+    as ``bulk_create``. With ``ignore_conflicts`` the rows are copied into a
+    temporary table and inserted from there with ``ON CONFLICT DO NOTHING``,
+    since COPY itself cannot skip rows.
+
+    Returns:
+        int: Rows inserted.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    prefix = getattr(model, "ID_PREFIX", None)
+    missing = [obj for obj in objs if not obj.pk]
+    if prefix and missing:
+        for obj, object_id in zip(missing, allocate_ids(prefix, len(missing))):
+            obj.pk = object_id
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        # Reason: leave auto-incremented keys to the database when no row has one.
+        if not (field.primary_key and len(missing) == len(objs) and not prefix)
+    ]
+    data = io.StringIO()
+    for obj in objs:
+        data.write(
+            "\t".join(
+                copy_value(field.get_db_prep_save(field.pre_save(obj, True), connection))
+                for field in fields
+            )
+        )
+        data.write("\n")
+    data.seek(0)
+
+    table = quote(model._meta.db_table)
+    columns = ", ".join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        target = table
+        if ignore_conflicts:
+            target = quote(f"import_{model._meta.db_table}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {target} (LIKE {table} INCLUDING DEFAULTS) "
+                "ON COMMIT DROP"
+            )
+        sql = f"COPY {target} ({columns}) FROM STDIN"
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(sql, data)
+        else:
+            # Reason: psycopg 3 replaced copy_expert() with a copy() context manager.
+            with cursor.copy(sql) as copy:
+                copy.write(data.getvalue())
+        if not ignore_conflicts:
+            return len(objs)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {target} "
+            "ON CONFLICT DO NOTHING"
+        )
+        return cursor.rowcount
+
+
+def get_writer(using: str) -> Callable:
+    return write_copy if connections[using].vendor == "postgresql" else write_bulk_create
+
+
+@contextmanager
+def deferred_indexes(using: str, enabled: bool):
+    """
+    Yield a callback that drops a model's ``Meta.indexes`` until the block exits.
+
+    Maintaining secondary indexes row by row is slower than building them
+    once over the loaded table. Indexes are recreated even if the load fails.
+    Primary keys, unique constraints and foreign key indexes stay in place.
+    The callback must run outside the batch transactions: each model's
+    indexes are dropped in their own transaction and only recorded once it
+    commits, so a failed batch never leads to recreating an existing index.
+    """
+    dropped = []
+
+    def defer(model):
+        if not enabled or not model._meta.indexes:
+            return
+        connection = connections[using]
+        editor = connection.schema_editor()
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for index in model._meta.indexes:
+                cursor.execute(str(index.remove_sql(model, editor)))
+        dropped.extend((model, index) for index in model._meta.indexes)
+
+    try:
+        yield defer
+    finally:
+        if dropped:
+            connection = connections[using]
+            editor = connection.schema_editor()
+            with connection.cursor() as cursor:
+                for model, index in dropped:
+                    cursor.execute(str(index.create_sql(model, editor)))
+
+
+def after_insert(model, objs: List):
+    """
+    Repair what ``save()`` would have maintained for rows inserted in bulk.
+
+    Recounts the owners of inserted apps when ``GRAPHQL_APP_COUNTERS`` is
+    enabled and drops the inserted rows, which may be cached as missing,
+    from the entity and response caches.
+    """
+    tags = set()
+    for obj in objs:
+        tags.update(tags_for_write(obj, created=True))
+    invalidate_tags(tags)
+    invalidate_entities(model, [obj.pk for obj in objs])
+    if issubclass(model, DeployedApp):
+        owner_ids = {obj.owner_id for obj in objs}
+        if app_counters_enabled():
+            refresh_app_counters(owner_ids)
+        invalidate_entities(User, owner_ids)
+        invalidate_updated_rows(User, owner_ids)
+
+
+def import_records(
+    records: Iterable[dict],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    using: str = DEFAULT_DB_ALIAS,
+    defer_indexes: bool = False,
+    ignore_conflicts: bool = False,
+    progress: Optional[Callable[[int, float], None]] = None,
+) -> Dict[str, int]:
+    """
+    Insert serialized objects in batches, one transaction per batch.
+
+    Records are deserialized like ``loaddata`` input, buffered until
+    ``batch_size`` of them are pending and then written model by model in
+    the order the models first appear in the batch, so parents listed before their
+    children are inserted first. Rows are inserted, never updated; with
+    ``ignore_conflicts`` rows whose key already exists are skipped. Unlike
+    ``loaddata`` no model signals are sent, and ``auto_now`` fields take the
+    import time, as with ``bulk_create``.
+
+    Args:
+        records (Iterable[dict]): Objects with ``model``, ``pk`` and ``fields``.
+        batch_size (int): Rows per transaction.
+        using (str): Database alias.
+        defer_indexes (bool): Drop ``Meta.indexes`` during the load and
+            rebuild them at the end.
+        ignore_conflicts (bool): Skip rows whose key already exists.
+        progress (Optional[Callable[[int, float], None]]): Called with the
+            rows processed so far and the seconds elapsed after every batch.
+    Returns:
+        Dict[str, int]: Rows inserted per model label, which leaves out rows
+        skipped by ``ignore_conflicts``.
+    Raises:
+        BulkImportError: On malformed input.
+    """
+    write = get_writer(using)
+    started = time.perf_counter()
+    counts, pending, written = {}, {}, 0
+
+    def flush(defer):
+        nonlocal written
+        for model in pending:
+            if model._meta.label not in counts:
+                defer(model)
+                counts[model._meta.label] = 0
+        with transaction.atomic(using=using):
+            for model, objs in pending.items():
+                counts[model._meta.label] += write(model, objs, using, ignore_conflicts)
+                after_insert(model, objs)
+                written += len(objs)
+        pending.clear()
+        if progress is not None:
+            progress(written, time.perf_counter() - started)
+
+    def deserialize(batch):
+        try:
+            for deserialized in Deserializer(batch, using=using):
+                if deserialized.m2m_data:
+                    raise BulkImportError("Many-to-many data is not supported.")
+                yield deserialized.object
+        except DeserializationError as error:
+            raise BulkImportError(str(error)) from error
+
+    with deferred_indexes(using, defer_indexes) as defer:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) < batch_size:
+                continue
+            for obj in deserialize(batch):
+                pending.setdefault(type(obj), []).append(obj)
+            batch = []
+            flush(defer)
+        for obj in deserialize(batch):
+            pending.setdefault(type(obj), []).append(obj)
+        if pending:
+            flush(defer)
+    return counts
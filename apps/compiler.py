@@ -0,0 +1,389 @@
+import datetime
+from asyncio import gather
+from functools import partial
+from math import isfinite
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import graphene
+from graphene.relay.node import GlobalID
+from graphene.types.resolver import dict_or_attr_resolver
+from graphene_django import DjangoObjectType
+from graphql import (
+    BREAK,
+    DocumentNode,
+    ExecutionContext,
+    FieldNode,
+    FragmentDefinitionNode,
+    GraphQLEnumType,
+    GraphQLObjectType,
+    GraphQLSchema,
+    OperationDefinitionNode,
+    OperationType,
+    Visitor,
+    get_named_type,
+    get_nullable_type,
+    is_abstract_type,
+    is_leaf_type,
+    is_non_null_type,
+    is_object_type,
+    is_specified_scalar_type,
+    visit,
+)
+from graphql.execution.collect_fields import collect_fields, collect_sub_fields
+from graphql.execution.execute import get_field_def
+from graphql.pyutils import Path, Undefined
+from graphql.type import GRAPHQL_MAX_INT, GRAPHQL_MIN_INT
+from apps.execution import AsyncExecutionContext, DeferredExecutionContext
+
+# Returned by a field reader that cannot produce the value itself; the field
+# then runs through the standard executor, which also reports any error.
+MISS = object()
+
+ENUM_MEMO_SIZE = 256
+
+
+class FieldPlan(NamedTuple):
+    """
+    One response key of a selection set, in response order.
+
+    Fields:
+        response_name (str): Alias or field name in the result.
+        field_nodes (List[FieldNode]): AST nodes merged under the key.
+        read (Optional[Callable[[Any], Any]]): Resolves and serializes the
+            field straight from the source object, or returns ``MISS``.
+    """
+
+    response_name: str
+    field_nodes: List[FieldNode]
+    read: Optional[Callable[[Any], Any]]
+
+
+class ObjectPlan(NamedTuple):
+    """
+    Fields of a selection set on a Django object type.
+
+    Fields:
+        model (type): Model class the readers were compiled for; other
+            sources use the standard executor.
+        fields (List[FieldPlan]): The selection set's fields.
+    """
+
+    model: type
+    fields: List[FieldPlan]
+
+
+def _serialize_datetime(value):
+    # Reason: graphene's DateTime serializes with isoformat() too.
+    return value.isoformat() if value.__class__ is datetime.datetime else MISS
+
+
+SCALAR_SERIALIZERS: Dict[str, Callable[[Any], Any]] = {
+    "String": lambda value: value if value.__class__ is str else MISS,
+    "ID": lambda value: value if value.__class__ is str else MISS,
+    "Boolean": lambda value: value if value.__class__ is bool else MISS,
+    "Int": lambda value: (
+        value
+        if value.__class__ is int and GRAPHQL_MIN_INT <= value <= GRAPHQL_MAX_INT
+        else MISS
+    ),
+    "Float": lambda value: value if value.__class__ is float and isfinite(value) else MISS,
+}
+
+
+def enum_serializer(enum_type: GraphQLEnumType) -> Callable[[Any], Any]:
+    """
+    Serialize string values of ``enum_type``, remembering each distinct one.
+
+    Model choices are stored as plain strings, so a column holds few distinct
+    values and each is converted through the enum once.
+    """
+    memo = {}
+
+    def serialize(value):
+        if value.__class__ is not str:
+            return MISS
+        serialized = memo.get(value)
+        if serialized is None:
+            try:
+                serialized = enum_type.serialize(value)
+            except Exception:
+                return MISS
+            if len(memo) < ENUM_MEMO_SIZE:
+                memo[value] = serialized
+        return serialized
+
+    return serialize
+
+
+def leaf_serializer(leaf_type) -> Optional[Callable[[Any], Any]]:
+    """
+    Return an inlined serializer for a scalar or enum type, if one exists.
+
+    Each serializer accepts only the exact Python types the column produces
+    and returns ``MISS`` for anything else, leaving coercions such as int to
+    String to the type's own ``serialize``.
+    """
+    if isinstance(leaf_type, GraphQLEnumType):
+        return enum_serializer(leaf_type)
+    if is_specified_scalar_type(leaf_type):
+        return SCALAR_SERIALIZERS.get(leaf_type.name)
+    if getattr(leaf_type, "graphene_type", None) is graphene.DateTime:
+        return _serialize_datetime
+    return None
+
+
+def attribute_getter(resolve, type_name: str) -> Optional[Callable[[Any], Any]]:
+    """
+    Replace a graphene-django resolver by the attribute read it amounts to.
+
+    Recognizes the default attribute resolver, optionally wrapped by the
+    ``BlankValueField``/``EnumValueField`` wrappers that turn ``""`` into
+    null, and the relay ``id`` resolver built on ``DjangoObjectType.resolve_id``.
+
+    Returns:
+        Optional[Callable[[Any], Any]]: Getter taking the model instance, or
+        None for any other resolver.
+    """
+    if isinstance(resolve, partial) and resolve.func is GlobalID.id_resolver:
+        parent_resolver, node = resolve.args
+        if parent_resolver is not DjangoObjectType.resolve_id:
+            return None
+        name = resolve.keywords.get("parent_type_name") or type_name
+        to_global_id = node.to_global_id
+        return lambda source: to_global_id(name, source.pk)
+
+    blank = False
+    while hasattr(resolve, "__wrapped__"):
+        if not resolve.__qualname__.startswith(("BlankValueField.", "EnumValueField.")):
+            return None
+        blank = True
+        resolve = resolve.__wrapped__
+    if not (
+        isinstance(resolve, partial)
+        and resolve.func is dict_or_attr_resolver
+        and len(resolve.args) == 2
+        and not resolve.keywords
+    ):
+        return None
+    attname, default = resolve.args
+    if not blank:
+        return lambda source: getattr(source, attname, default)
+
+    def get_blank_as_null(source):
+        value = getattr(source, attname, default)
+        # Reason: choices-backed columns store "" for "no value".
+        return None if value == "" else value
+
+    return get_blank_as_null
+
+
+def leaf_reader(parent_type: GraphQLObjectType, field_def) -> Optional[Callable[[Any], Any]]:
+    """
+    Compile a scalar or enum field into one function of the source object.
+
+    Returns:
+        Optional[Callable[[Any], Any]]: Reader returning the serialized value,
+        or ``MISS`` whenever the standard executor must handle the field: an
+        unexpected value type, null for a non-null field, or an exception.
+    """
+    non_null = is_non_null_type(field_def.type)
+    leaf_type = get_nullable_type(field_def.type)
+    serialize = leaf_serializer(leaf_type) if is_leaf_type(leaf_type) else None
+    get = attribute_getter(field_def.resolve, parent_type.name) if serialize else None
+    if get is None:
+        return None
+
+    def read(source):
+        try:
+            value = get(source)
+        except Exception:
+            return MISS
+        if value is None:
+            return MISS if non_null else None
+        return serialize(value)
+
+    return read
+
+
+def typename_reader(type_name: str) -> Callable[[Any], str]:
+    def read(source):
+        return type_name
+
+    return read
+
+
+class _DirectiveFinder(Visitor):
+    found = False
+
+    def enter_directive(self, *args):
+        self.found = True
+        return BREAK
+
+
+def has_directives(document: DocumentNode) -> bool:
+    finder = _DirectiveFinder()
+    visit(document, finder)
+    return finder.found
+
+
+class ExecutionPlan:
+    """
+    Precomputed execution of one query operation of a validated document.
+
+    Holds every selection set the operation can reach, collected once per
+    runtime type, and a field list with compiled readers for each selection
+    set on a ``DjangoObjectType``. The plan keeps the collected field dicts
+    alive, so their ids identify them while the plan exists.
+    """
+
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode):
+        self.schema = schema
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.subfields: Dict[Tuple, Dict[str, List[FieldNode]]] = {}
+        self.objects: Dict[int, ObjectPlan] = {}
+
+    def add_selection(
+        self, parent_type: GraphQLObjectType, fields: Dict[str, List[FieldNode]]
+    ):
+        """
+        Record the plan for ``fields`` on ``parent_type`` and every selection
+        set below it.
+        """
+        graphene_type = getattr(parent_type, "graphene_type", None)
+        model = None
+        if isinstance(graphene_type, type) and issubclass(graphene_type, DjangoObjectType):
+            model = graphene_type._meta.model
+
+        field_plans = []
+        for response_name, field_nodes in fields.items():
+            field_def = get_field_def(self.schema, parent_type, field_nodes[0])
+            read = None
+            if model is not None and field_nodes[0].name.value == "__typename":
+                read = typename_reader(parent_type.name)
+            elif model is not None:
+                read = leaf_reader(parent_type, field_def)
+            field_plans.append(FieldPlan(response_name, field_nodes, read))
+
+            named_type = get_named_type(field_def.type)
+            if is_abstract_type(named_type):
+                runtime_types = self.schema.get_possible_types(named_type)
+            elif is_object_type(named_type):
+                runtime_types = [named_type]
+            else:
+                runtime_types = []
+            for runtime_type in runtime_types:
+                key = (runtime_type.name, *map(id, field_nodes))
+                if key in self.subfields:
+                    continue
+                subfields = collect_sub_fields(
+                    self.schema, self.fragments, {}, runtime_type, field_nodes
+                )
+                self.subfields[key] = subfields
+                self.add_selection(runtime_type, subfields)
+
+        if model is not None and any(field.read for field in field_plans):
+            self.objects[id(fields)] = ObjectPlan(model, field_plans)
+
+
+def compile_plan(
+    schema: GraphQLSchema, document: DocumentNode, operation: OperationDefinitionNode
+) -> Optional[ExecutionPlan]:
+    """
+    Compile a query operation of a validated document.
+
+    Args:
+        schema (GraphQLSchema): Schema the document was validated against.
+        document (DocumentNode): The validated document.
+        operation (OperationDefinitionNode): Operation to compile.
+    Returns:
+        Optional[ExecutionPlan]: The plan, or None for operations that keep
+        the standard executor: mutations, subscriptions, and documents using
+        directives, whose ``@skip``/``@include`` depend on the variables.
+    """
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+    if has_directives(document):
+        return None
+    plan = ExecutionPlan(schema, document)
+    root_type = schema.query_type
+    plan.add_selection(
+        root_type,
+        collect_fields(schema, plan.fragments, {}, root_type, operation.selection_set),
+    )
+    return plan
+
+
+class CompiledPlanMixin(ExecutionContext):
+    """
+    Execute with the ``ExecutionPlan`` found at ``context_value.graphql_plan``.
+
+    Selection sets come from the plan instead of being collected per request.
+    Compiled fields of Django object types are read and serialized inline,
+    without resolve info, middleware or ``complete_value``; any other field,
+    or a compiled one whose reader returns ``MISS``, runs through
+    ``execute_field`` as usual. Inline reads are only used when every
+    middleware declares ``skips_leaf_fields``, since they bypass middleware.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.plan: Optional[ExecutionPlan] = getattr(self.context_value, "graphql_plan", None)
+        manager = self.middleware_manager
+        self.read_leaves = self.plan is not None and (
+            manager is None
+            or all(getattr(m, "skips_leaf_fields", False) for m in manager.middlewares)
+        )
+
+    def collect_subfields(self, return_type, field_nodes):
+        if self.plan is not None:
+            subfields = self.plan.subfields.get((return_type.name, *map(id, field_nodes)))
+            if subfields is not None:
+                return subfields
+        return super().collect_subfields(return_type, field_nodes)
+
+    def execute_fields(self, parent_type, source_value, path, fields):
+        object_plan = self.plan.objects.get(id(fields)) if self.read_leaves else None
+        if object_plan is None or source_value.__class__ is not object_plan.model:
+            return super().execute_fields(parent_type, source_value, path, fields)
+
+        results = {}
+        is_awaitable = self.is_awaitable
+        awaitable_fields = []
+        for response_name, field_nodes, read in object_plan.fields:
+            if read is not None:
+                value = read(source_value)
+                if value is not MISS:
+                    results[response_name] = value
+                    continue
+            field_path = Path(path, response_name, parent_type.name)
+            result = self.execute_field(parent_type, source_value, field_nodes, field_path)
+            if result is not Undefined:
+                results[response_name] = result
+                if is_awaitable(result):
+                    awaitable_fields.append(response_name)
+        if not awaitable_fields:
+            return results
+
+        async def get_results():
+            results.update(
+                zip(awaitable_fields, await gather(*(results[f] for f in awaitable_fields)))
+            )
+            return results
+
+        return get_results()
+
+
+class CompiledDeferredExecutionContext(DeferredExecutionContext, CompiledPlanMixin):
+    """
+    DeferredExecutionContext running a compiled plan.
+    """
+
+
+class CompiledAsyncExecutionContext(AsyncExecutionContext, CompiledPlanMixin):
+    """
+    AsyncExecutionContext running a compiled plan.
+    """
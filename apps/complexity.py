@@ -0,0 +1,228 @@
+from collections import defaultdict
+from typing import Any, Dict, NamedTuple, Optional
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    IntValueNode,
+    ListValueNode,
+    OperationDefinitionNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_abstract_type,
+    is_list_type,
+    is_object_type,
+)
+
+
+class QueryCost(NamedTuple):
+    """
+    Static cost estimate for one operation.
+
+    Fields:
+        cost (int): Estimated number of resolved objects.
+        depth (int): Deepest field nesting, ignoring introspection fields
+            and Relay ``edges``/``node``/``pageInfo`` wrappers.
+        uses_variables (bool): Whether a list size in the document comes from
+            a variable, so the cost depends on the request's variables.
+    """
+
+    cost: int
+    depth: int
+    uses_variables: bool = False
+
+
+def is_connection_type(graphql_type) -> bool:
+    return (
+        is_object_type(graphql_type)
+        and "edges" in graphql_type.fields
+        and "pageInfo" in graphql_type.fields
+    )
+
+
+def is_edge_type(graphql_type) -> bool:
+    return (
+        is_object_type(graphql_type)
+        and "node" in graphql_type.fields
+        and "cursor" in graphql_type.fields
+    )
+
+
+class QueryCostAnalyzer:
+    """
+    Single-pass AST cost analyzer.
+
+    Every object-returning field costs 1 (leaf fields cost 0) unless
+    overridden in ``field_costs`` by ``"Type.field"``. A list or connection
+    field multiplies the cost of its selection by its ``first``/``last``
+    argument or the length of its ``ids`` list, read from ``variable_values``
+    when given as a variable. When the size is unknown, it is the most the
+    field can return, ``list_sizes["Type.field"]``, or ``default_list_size``
+    for fields without a known cap. Relay ``edges``/``node``/``pageInfo``
+    wrappers add neither cost nor depth, and type-conditioned fragments on
+    abstract types count only their most expensive branch.
+    """
+
+    def __init__(
+        self,
+        schema,
+        field_costs=None,
+        default_list_size: int = 100,
+        list_sizes: Optional[Dict[str, int]] = None,
+    ):
+        self.schema = schema
+        self.field_costs = field_costs or {}
+        self.default_list_size = default_list_size
+        self.list_sizes = list_sizes or {}
+
+    def analyze(
+        self,
+        document,
+        variable_values: Optional[Dict[str, Any]] = None,
+        row_limits: Optional[Dict[str, int]] = None,
+    ) -> Dict[Optional[str], QueryCost]:
+        """
+        Estimate the cost of every operation in a validated document.
+
+        Args:
+            document (DocumentNode): The validated document.
+            variable_values (Optional[Dict[str, Any]]): Request variables.
+                Without them, sizes given by variables take the field's cap,
+                which makes the estimate safe to cache per document.
+            row_limits (Optional[Dict[str, int]]): Rows some fields return
+                at most in this request, by ``"Type.field"``, e.g. a streamed
+                connection's. They replace the field's cap and bound its
+                ``first``/``last``.
+        Returns:
+            Dict[Optional[str], QueryCost]: Costs keyed by operation name.
+        """
+        self._fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self._fragment_costs = {}
+        self._variable_values = variable_values
+        self._row_limits = row_limits or {}
+        self._uses_variables = False
+        costs = {}
+        for definition in document.definitions:
+            if not isinstance(definition, OperationDefinitionNode):
+                continue
+            root_type = self.schema.get_root_type(definition.operation)
+            if root_type is None:
+                continue
+            name = definition.name.value if definition.name else None
+            costs[name] = self._selection_set_cost(
+                root_type, definition.selection_set, set()
+            )
+        # Reason: fragment costs are shared, so variable use is tracked per document.
+        return {
+            name: QueryCost(cost, depth, self._uses_variables)
+            for name, (cost, depth) in costs.items()
+        }
+
+    def _selection_set_cost(self, parent_type, selection_set, visiting):
+        common = 0
+        branches = defaultdict(int)
+        depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost, field_depth = self._field_cost(parent_type, selection, visiting)
+                common += cost
+                depth = max(depth, field_depth)
+                continue
+
+            if isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                if name in visiting or name not in self._fragments:
+                    continue
+                fragment = self._fragments[name]
+                condition = self.schema.get_type(fragment.type_condition.name.value)
+                cached = self._fragment_costs.get(name)
+                if cached is None:
+                    cached = self._fragment_costs[name] = self._selection_set_cost(
+                        condition, fragment.selection_set, visiting | {name}
+                    )
+                cost, fragment_depth = cached
+            elif isinstance(selection, InlineFragmentNode):
+                condition = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition
+                    else parent_type
+                )
+                cost, fragment_depth = self._selection_set_cost(
+                    condition, selection.selection_set, visiting
+                )
+            else:
+                continue
+
+            depth = max(depth, fragment_depth)
+            if condition is parent_type or is_abstract_type(condition):
+                common += cost
+            else:
+                # Reason: only one concrete type matches at runtime.
+                branches[condition.name] += cost
+        return common + max(branches.values(), default=0), depth
+
+    def _field_cost(self, parent_type, node, visiting):
+        name = node.name.value
+        if name.startswith("__"):
+            return 0, 0
+        field_def = getattr(parent_type, "fields", {}).get(name)
+        if field_def is None:
+            return 0, 0
+
+        key = f"{parent_type.name}.{name}"
+        if node.selection_set is None:
+            return self.field_costs.get(key, 0), 1
+
+        is_wrapper = self._is_relay_wrapper(parent_type, name)
+        child_cost, child_depth = self._selection_set_cost(
+            get_named_type(field_def.type), node.selection_set, visiting
+        )
+        own_cost = self.field_costs.get(key, 0 if is_wrapper else 1)
+        multiplier = 1 if is_wrapper else self._multiplier(key, field_def, node)
+        # Reason: Relay wrappers add syntax, not nesting.
+        depth = child_depth if is_wrapper else child_depth + 1
+        return own_cost + multiplier * child_cost, depth
+
+    @staticmethod
+    def _is_relay_wrapper(parent_type, name) -> bool:
+        if is_connection_type(parent_type):
+            return name in ("edges", "pageInfo")
+        return is_edge_type(parent_type) and name == "node"
+
+    def _multiplier(self, key, field_def, node) -> int:
+        size = self._requested_size(key, field_def, node)
+        limit = self._row_limits.get(key)
+        return size if limit is None else min(size, limit)
+
+    def _requested_size(self, key, field_def, node) -> int:
+        for argument in node.arguments:
+            name = argument.name.value
+            if name not in ("first", "last", "ids"):
+                continue
+            value = argument.value
+            if isinstance(value, VariableNode):
+                self._uses_variables = True
+                if self._variable_values is None:
+                    continue
+                value = self._variable_values.get(value.name.value)
+                if name == "ids" and value is not None:
+                    return len(value) if isinstance(value, list) else 1
+                if isinstance(value, int) and not isinstance(value, bool):
+                    return value
+            elif name == "ids" and isinstance(value, ListValueNode):
+                return len(value.values)
+            elif isinstance(value, IntValueNode):
+                return int(value.value)
+        field_type = get_nullable_type(field_def.type)
+        if is_list_type(field_type) or is_connection_type(field_type):
+            if key in self._row_limits:
+                return self._row_limits[key]
+            return self.list_sizes.get(key, self.default_list_size)
+        return 1
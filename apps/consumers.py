@@ -0,0 +1,225 @@
+import inspect
+import json
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from graphql import (
+    ExecutionResult,
+    FieldNode,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+)
+from graphql.execution.values import get_argument_values, get_variable_values
+from apps.dataloaders import aload_entities
+from apps.execution import AsyncExecutionContext
+from apps.replicas import pin_primary
+from apps.schema import LimitedComplexityGraphQLView, decode_relay_id, schema
+from apps.subscriptions import (
+    SUBSCRIPTION_FIELDS,
+    event_renderer,
+    subscription_group,
+    subscription_key,
+)
+
+GRAPHQL_TRANSPORT_WS = "graphql-transport-ws"
+
+
+class ActiveSubscription:
+    """
+    One active ``subscribe`` operation of a socket.
+    """
+
+    def __init__(self, entry, operation_name, variables, group, key):
+        self.entry = entry
+        self.operation_name = operation_name
+        self.variables = variables
+        self.group = group
+        self.key = key
+
+
+class GraphQLSubscriptionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Websocket endpoint speaking the ``graphql-transport-ws`` protocol.
+
+    Each subscription joins the channel layer group of the user it watches.
+    Publishers send one event per group carrying only ids; on delivery the
+    payload is executed and serialized once per distinct document and
+    variables (see ``EventRenderer``) and the same text is written to every
+    matching socket, so listeners are not re-executed one by one.
+    """
+
+    view_class = LimitedComplexityGraphQLView
+
+    async def connect(self):
+        self.view = self.view_class(schema=schema)
+        self.acknowledged = False
+        self.subscriptions = {}
+        if GRAPHQL_TRANSPORT_WS not in self.scope.get("subprotocols", []):
+            await self.close()
+            return
+        await self.accept(GRAPHQL_TRANSPORT_WS)
+
+    async def disconnect(self, code):
+        for operation_id in list(getattr(self, "subscriptions", {})):
+            await self.unsubscribe(operation_id)
+
+    async def receive_json(self, content, **kwargs):
+        message_type = content.get("type") if isinstance(content, dict) else None
+        if message_type == "connection_init":
+            if self.acknowledged:
+                await self.close(code=4429)
+                return
+            self.acknowledged = True
+            await self.send_json({"type": "connection_ack"})
+        elif message_type == "ping":
+            await self.send_json({"type": "pong"})
+        elif message_type == "pong":
+            return
+        elif message_type == "subscribe":
+            if not self.acknowledged:
+                await self.close(code=4401)
+                return
+            await self.subscribe(content.get("id"), content.get("payload") or {})
+        elif message_type == "complete":
+            await self.unsubscribe(content.get("id"))
+        else:
+            await self.close(code=4400)
+
+    async def decode_json(self, text_data):
+        try:
+            return json.loads(text_data)
+        except ValueError:
+            return None
+
+    async def subscribe(self, operation_id, payload):
+        """
+        Validate a ``subscribe`` message and join the group it watches.
+        """
+        if not isinstance(operation_id, str) or not operation_id:
+            await self.close(code=4400)
+            return
+        if operation_id in self.subscriptions:
+            await self.close(code=4409)
+            return
+        try:
+            subscription = self.plan_subscription(payload)
+        except GraphQLError as error:
+            await self.send_json(
+                {"id": operation_id, "type": "error", "payload": [error.formatted]}
+            )
+            return
+        if self.channel_layer is None:
+            await self.send_json(
+                {
+                    "id": operation_id,
+                    "type": "error",
+                    "payload": [{"message": "Subscriptions are not configured."}],
+                }
+            )
+            return
+        self.subscriptions[operation_id] = subscription
+        await self.channel_layer.group_add(subscription.group, self.channel_name)
+
+    async def unsubscribe(self, operation_id):
+        subscription = self.subscriptions.pop(operation_id, None)
+        if subscription is None or self.channel_layer is None:
+            return
+        if not any(s.group == subscription.group for s in self.subscriptions.values()):
+            await self.channel_layer.group_discard(subscription.group, self.channel_name)
+
+    def plan_subscription(self, payload) -> ActiveSubscription:
+        """
+        Resolve a subscribe payload to the group it listens on.
+
+        Raises:
+            GraphQLError: If the document is invalid, too costly, not a single
+                supported subscription field, or names an invalid user ID.
+        """
+        query = payload.get("query")
+        operation_name = payload.get("operationName")
+        variables = payload.get("variables") or {}
+        if not isinstance(query, str) or not query:
+            raise GraphQLError("Must provide query string.")
+        entry = self.view.get_document(query)
+        operation_ast = get_operation_ast(entry.document, operation_name)
+        if operation_ast is None or operation_ast.operation != OperationType.SUBSCRIPTION:
+            raise GraphQLError("Only subscription operations can be subscribed to.")
+        rejected = self.view.check_document(entry, operation_ast, variables)
+        if rejected is not None:
+            raise rejected.errors[0]
+
+        selections = operation_ast.selection_set.selections
+        if len(selections) != 1 or not isinstance(selections[0], FieldNode):
+            raise GraphQLError("Subscriptions must select exactly one root field.")
+        field_node = selections[0]
+        field_name = field_node.name.value
+        if field_name not in SUBSCRIPTION_FIELDS:
+            raise GraphQLError(f"Unknown subscription field '{field_name}'.")
+        argument_name, _ = SUBSCRIPTION_FIELDS[field_name]
+
+        graphql_schema = schema.graphql_schema
+        coerced = get_variable_values(
+            graphql_schema, operation_ast.variable_definitions or (), variables
+        )
+        if isinstance(coerced, list):
+            raise coerced[0]
+        field_def = graphql_schema.subscription_type.fields[field_name]
+        arguments = get_argument_values(field_def, field_node, coerced)
+        type_name, user_id = decode_relay_id(arguments[argument_name])
+        if type_name != "UserNode":
+            raise GraphQLError("Invalid user ID type.")
+
+        return ActiveSubscription(
+            entry,
+            operation_name,
+            variables,
+            subscription_group(field_name, user_id),
+            subscription_key(entry.fingerprint, operation_name, variables),
+        )
+
+    async def graphql_event(self, event):
+        """
+        Deliver a channel layer event to this socket's subscriptions in its group.
+        """
+        for operation_id, subscription in list(self.subscriptions.items()):
+            if subscription.group != event["group"]:
+                continue
+            payload = await event_renderer.render(
+                event["event_id"],
+                subscription.key,
+                lambda: self.render(event, subscription),
+            )
+            # Reason: the payload is shared; only the envelope is encoded per socket.
+            await self.send(
+                text_data='{"id":%s,"type":"next","payload":%s}'
+                % (json.dumps(operation_id), payload)
+            )
+
+    async def render(self, event, subscription) -> str:
+        """
+        Execute a subscription document for one event and serialize the result.
+
+        Reads go to the primary, since events are published as soon as the
+        write commits and a replica may not have the row yet.
+        """
+        _, model = SUBSCRIPTION_FIELDS[event["field"]]
+        with pin_primary():
+            (root,) = await aload_entities(model, [event["pk"]])
+            try:
+                result = execute(
+                    schema.graphql_schema,
+                    subscription.entry.document,
+                    root_value=root,
+                    variable_values=subscription.variables,
+                    operation_name=subscription.operation_name,
+                    execution_context_class=AsyncExecutionContext,
+                )
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                result = ExecutionResult(errors=[e])
+        body = {"data": result.data}
+        if result.errors:
+            body["errors"] = [self.view.format_error(e) for e in result.errors]
+        return json.dumps(body, separators=(",", ":"))
@@ -1,55 +1,598 @@
 import asyncio
-from collections import defaultdict
-from apps.models import User, DeployedApp
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from django.db import router, transaction
+from apps.filters import filter_apps
+from apps.metrics import record_batch, register_cache
+from apps.models import User, DeployedApp, app_counts
+from apps.replicas import current_routing, replica_lag
 from asgiref.sync import sync_to_async
 
 
-class UserLoader:
+class Deferred:
+    """
+    A value that becomes available once its loader batch has been dispatched.
+
+    This is a minimal synchronous promise: callbacks registered with ``then``
+    run as soon as the value is resolved (or immediately if it already is).
+    """
+
+    PENDING = "pending"
+    FULFILLED = "fulfilled"
+    REJECTED = "rejected"
+
+    __slots__ = ("_state", "_value", "_callbacks")
+
     def __init__(self):
-        self._cache = {}
+        self._state = self.PENDING
+        self._value = None
+        self._callbacks = []
 
-    def load_many(self, ids):
-        users = User.objects.filter(id__in=ids)
-        user_map = {user.id: user for user in users}
-        return [user_map.get(i) for i in ids]
+    @classmethod
+    def resolved(cls, value):
+        deferred = cls()
+        deferred.resolve(value)
+        return deferred
+
+    @property
+    def is_pending(self) -> bool:
+        return self._state == self.PENDING
+
+    def resolve(self, value):
+        if self._state != self.PENDING:
+            return
+        if isinstance(value, Deferred):
+            value.then(self.resolve, self.reject)
+            return
+        self._state = self.FULFILLED
+        self._value = value
+        self._run_callbacks()
+
+    def reject(self, error: Exception):
+        if self._state != self.PENDING:
+            return
+        self._state = self.REJECTED
+        self._value = error
+        self._run_callbacks()
+
+    def get(self):
+        """
+        Return the resolved value, raising the rejection error if there is one.
+
+        Raises:
+            RuntimeError: If the value has not been resolved yet.
+        """
+        if self._state == self.PENDING:
+            raise RuntimeError("Deferred value has not been resolved yet.")
+        if self._state == self.REJECTED:
+            raise self._value
+        return self._value
+
+    def then(self, on_fulfilled=None, on_rejected=None) -> "Deferred":
+        """
+        Chain a callback onto this value.
+
+        Returns:
+            Deferred: Resolved with the callback's return value.
+        """
+        child = Deferred()
+
+        def run():
+            try:
+                if self._state == self.FULFILLED:
+                    result = on_fulfilled(self._value) if on_fulfilled else self._value
+                elif on_rejected:
+                    result = on_rejected(self._value)
+                else:
+                    child.reject(self._value)
+                    return
+            except Exception as e:
+                child.reject(e)
+                return
+            child.resolve(result)
+
+        if self._state == self.PENDING:
+            self._callbacks.append(run)
+        else:
+            run()
+        return child
 
+    @classmethod
+    def all(cls, values) -> "Deferred":
+        """
+        Combine a list of plain and deferred values into one deferred list.
+        """
+        values = list(values)
+        combined = cls()
+        pending = [i for i, value in enumerate(values) if isinstance(value, Deferred)]
+        remaining = len(pending)
+        if not remaining:
+            combined.resolve(values)
+            return combined
+
+        def on_item(index):
+            def fulfill(value):
+                nonlocal remaining
+                values[index] = value
+                remaining -= 1
+                if not remaining:
+                    combined.resolve(values)
+
+            return fulfill
+
+        for index in pending:
+            values[index].then(on_item(index), combined.reject)
+        return combined
+
+    def _run_callbacks(self):
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class DataLoader:
+    """
+    Base class for request-scoped, deferred-batching loaders.
+
+    ``load(key)`` queues the key and returns a ``Deferred``. Every key queued
+    before the next ``dispatch()`` is fetched by a single ``load_many`` call.
+    Subclasses implement ``load_many(keys)`` returning values in key order.
+    """
 
-class AppLoader:
     def __init__(self):
         self._cache = {}
+        self._queue = []
+
+    def load_many(self, keys):
+        raise NotImplementedError
+
+    def load(self, key) -> Deferred:
+        deferred = self._cache.get(key)
+        if deferred is None:
+            deferred = self._cache[key] = Deferred()
+            self._queue.append(key)
+        return deferred
+
+    def prime(self, key, value):
+        """
+        Store a known value for ``key`` so later loads skip the database.
+        """
+        deferred = self._cache.get(key)
+        if deferred is None or not deferred.is_pending:
+            self._cache[key] = Deferred.resolved(value)
+        else:
+            deferred.resolve(value)
+
+    def clear(self, key):
+        self._cache.pop(key, None)
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._queue)
+
+    def dispatch(self):
+        """
+        Fetch every queued key with one ``load_many`` call and resolve them.
+        """
+        keys, self._queue = self._queue, []
+        deferreds = [self._cache[key] for key in keys]
+        record_batch(self, len(keys))
+        try:
+            values = self.load_many(keys)
+        except Exception as e:
+            for deferred in deferreds:
+                deferred.reject(e)
+            return
+        for deferred, value in zip(deferreds, values):
+            deferred.resolve(value)
 
-    def load_many(self, ids):
-        apps = DeployedApp.objects.filter(id__in=ids)
-        app_map = {app.id: app for app in apps}
-        return [app_map.get(i) for i in ids]
 
+class LoaderRegistry:
+    """
+    Per-request collection of loaders, one instance per loader class.
+    """
 
-class UserAppsLoader:
     def __init__(self):
-        self._cache = defaultdict(list)
+        self._loaders = {}
+
+    def get(self, loader_class):
+        loader = self._loaders.get(loader_class)
+        if loader is None:
+            loader = self._loaders[loader_class] = loader_class()
+        return loader
+
+    def dispatch(self) -> bool:
+        """
+        Flush every loader that has queued keys.
+
+        Returns:
+            bool: True if at least one batch was dispatched.
+        """
+        pending = [loader for loader in self._loaders.values() if loader.has_pending]
+        for loader in pending:
+            loader.dispatch()
+        return bool(pending)
+
+
+def get_loaders(context, registry_class=LoaderRegistry) -> LoaderRegistry:
+    """
+    Return the loader registry attached to a request context, creating it once.
+    """
+    registry = getattr(context, "loaders", None)
+    if registry is None:
+        registry = registry_class()
+        setattr(context, "loaders", registry)
+    return registry
+
+
+def get_loader(info, loader_class):
+    """
+    Return the request-scoped instance of ``loader_class`` for a resolver.
+    """
+    return get_loaders(info.context).get(loader_class)
+
+
+class EntityCache:
+    """
+    Process-wide, thread-safe LRU+TTL cache of model rows keyed by primary key.
+
+    Rows are stored as tuples of column values and rebuilt into fresh model
+    instances on every read, so requests never share mutable instances. Ids
+    that do not exist are cached for ``negative_ttl`` seconds.
+
+    Every ``invalidate()`` stamps the key with a new version. Callers take a
+    ``snapshot()`` before querying the database and pass it to ``put_many()``,
+    which drops any row whose key was invalidated after the snapshot, so a
+    read racing a write can never store the pre-write row.
+
+    Invalidations only reach the process that made the write. With several
+    worker processes, the others keep serving a changed row until its TTL
+    runs out, which is why the cache is off unless
+    ``GRAPHQL_ENTITY_CACHE["ENABLED"]`` is set.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0, negative_ttl: float = 2.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._version = 0
+        # Reason: versions are bounded too; keys evicted from them fall back to this floor.
+        self._version_floor = 0
+        self._invalidated_floor = float("-inf")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, pk):
+        return (model._meta.label, pk)
+
+    def snapshot(self) -> int:
+        with self._lock:
+            return self._version
+
+    def get_many(self, model, pks):
+        """
+        Return cached instances for ``pks``.
+
+        Returns:
+            Dict[str, Optional[Model]]: Hits keyed by pk; ``None`` for ids
+            cached as non-existent. Misses are left out.
+        """
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for pk in pks:
+                key = self.key(model, pk)
+                entry = self._entries.get(key)
+                if entry is None or entry[1] <= now:
+                    if entry is not None:
+                        del self._entries[key]
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[pk] = entry[0]
+        return {pk: self._build(model, values) for pk, values in found.items()}
+
+    def put_many(self, model, pks, instances, snapshot: int, settle: float = 0.0):
+        """
+        Store fetched rows, caching every pk without a row as non-existent.
+
+        Args:
+            model (Type[Model]): Model the rows belong to.
+            pks (Iterable[str]): Every pk that was queried.
+            instances (Iterable[Model]): Full rows returned by the query.
+            snapshot (int): ``snapshot()`` taken before the query ran.
+            settle (float): Also skip keys invalidated less than this many
+                seconds ago, for rows read from a replica that may lag.
+        """
+        if self.maxsize <= 0:
+            return
+        rows = {
+            instance.pk: tuple(
+                getattr(instance, field.attname) for field in model._meta.concrete_fields
+            )
+            for instance in instances
+        }
+        now = time.monotonic()
+        with self._lock:
+            floor = (self._version_floor, self._invalidated_floor)
+            for pk in pks:
+                key = self.key(model, pk)
+                version, invalidated_at = self._versions.get(key, floor)
+                if version > snapshot or (settle and invalidated_at > now - settle):
+                    continue
+                values = rows.get(pk)
+                ttl = self.ttl if values is not None else self.negative_ttl
+                self._entries[key] = (values, now + ttl)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model, pk):
+        key = self.key(model, pk)
+        with self._lock:
+            self._version += 1
+            self._entries.pop(key, None)
+            self._versions[key] = (self._version, time.monotonic())
+            self._versions.move_to_end(key)
+            while len(self._versions) > self.maxsize:
+                _, (version, invalidated_at) = self._versions.popitem(last=False)
+                self._version_floor = max(self._version_floor, version)
+                self._invalidated_floor = max(self._invalidated_floor, invalidated_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    @staticmethod
+    def _build(model, values):
+        if values is None:
+            return None
+        return model.from_db(
+            router.db_for_read(model),
+            [field.attname for field in model._meta.concrete_fields],
+            values,
+        )
+
+
+def _entity_cache_from_settings() -> EntityCache:
+    config = getattr(settings, "GRAPHQL_ENTITY_CACHE", {})
+    return EntityCache(
+        maxsize=config.get("MAX_SIZE", 10000),
+        ttl=config.get("TTL", 30.0),
+        negative_ttl=config.get("NEGATIVE_TTL", 2.0),
+    )
+
+
+entity_cache = _entity_cache_from_settings()
+register_cache("entity", entity_cache)
 
+
+def entity_cache_enabled() -> bool:
+    return getattr(settings, "GRAPHQL_ENTITY_CACHE", {}).get("ENABLED", False)
+
+
+def reads_entity_cache() -> bool:
+    """
+    Whether loaders in the current context may answer from the entity cache.
+
+    A client pinned to the primary after a write reads the database, since
+    the write may have been invalidated in another worker's cache only.
+    """
+    state = current_routing.get()
+    return entity_cache_enabled() and not (state is not None and state.pinned)
+
+
+def invalidate_entities(model, pks):
+    """
+    Drop rows from the entity cache, now and when the transaction commits.
+    """
+    pks = list(pks)
+    for pk in pks:
+        entity_cache.invalidate(model, pk)
+
+    def on_commit():
+        for pk in pks:
+            entity_cache.invalidate(model, pk)
+
+    # Reason: until the write commits, other connections can still read and cache the old row.
+    transaction.on_commit(on_commit)
+
+
+def invalidate_entity(instance):
+    """
+    Drop a saved or deleted row from the entity cache.
+    """
+    invalidate_entities(type(instance), [instance.pk])
+
+
+def load_entities(model, pks):
+    """
+    Return rows for ``pks`` in order, querying the database only for cache misses.
+    """
+    cached = reads_entity_cache()
+    found = entity_cache.get_many(model, pks) if cached else {}
+    missing = [pk for pk in pks if pk not in found]
+    if missing:
+        snapshot, settle = entity_cache.snapshot(), replica_lag()
+        rows = list(model.objects.filter(pk__in=missing))
+        if cached:
+            entity_cache.put_many(model, missing, rows, snapshot, settle)
+        found.update((row.pk, row) for row in rows)
+    return [found.get(pk) for pk in pks]
+
+
+async def aload_entities(model, pks):
+    """
+    Asyncio counterpart of ``load_entities``.
+    """
+    cached = reads_entity_cache()
+    found = entity_cache.get_many(model, pks) if cached else {}
+    missing = [pk for pk in pks if pk not in found]
+    if missing:
+        snapshot, settle = entity_cache.snapshot(), replica_lag()
+        rows = await sync_to_async(list)(model.objects.filter(pk__in=missing))
+        if cached:
+            entity_cache.put_many(model, missing, rows, snapshot, settle)
+        found.update((row.pk, row) for row in rows)
+    return [found.get(pk) for pk in pks]
+
+
+class UserLoader(DataLoader):
+    def load_many(self, ids):
+        return load_entities(User, ids)
+
+
+class AppLoader(DataLoader):
+    def load_many(self, ids):
+        return load_entities(DeployedApp, ids)
+
+
+class UserAppsLoader(DataLoader):
     def load_many(self, user_ids):
         apps = DeployedApp.objects.filter(owner_id__in=user_ids)
+        apps_by_owner = defaultdict(list)
         for app in apps:
-            self._cache[app.owner_id].append(app)
-        return [self._cache[uid] for uid in user_ids]
+            apps_by_owner[app.owner_id].append(app)
+        return [apps_by_owner[uid] for uid in user_ids]
+
+
+def _group_filtered_keys(keys):
+    groups = defaultdict(list)
+    for user_id, filters in keys:
+        groups[filters].append(user_id)
+    return groups
+
+
+def _filtered_apps_query(filters, user_ids):
+    return filter_apps(DeployedApp.objects.filter(owner_id__in=user_ids), **dict(filters))
+
+
+class FilteredUserAppsLoader(DataLoader):
+    """
+    Loads each user's apps restricted by app filters.
+
+    Keys are ``(user_id, filters)`` where ``filters`` is a sorted tuple of
+    ``(name, value)`` pairs. Keys sharing the same filters are fetched by one
+    ``owner_id__in`` query with the filters applied in SQL.
+    """
 
+    def load_many(self, keys):
+        apps_by_key = defaultdict(list)
+        for filters, user_ids in _group_filtered_keys(keys).items():
+            for app in _filtered_apps_query(filters, user_ids):
+                apps_by_key[(app.owner_id, filters)].append(app)
+        return [apps_by_key[key] for key in keys]
 
-class AsyncUserLoader:
+
+def _counts_by_key(keys, rows):
+    counts = {row["owner_id"]: row for row in rows}
+    return [counts.get(user_id, {}).get(field, 0) for user_id, field in keys]
+
+
+class AppCountsLoader(DataLoader):
+    """
+    Loads per-user app aggregates with one GROUP BY owner_id query.
+
+    Keys are ``(user_id, field)`` with ``field`` either ``"app_count"`` or
+    ``"active_app_count"``, so both fields for every user on a page share
+    the same query.
+    """
+
+    def load_many(self, keys):
+        user_ids = list({user_id for user_id, _ in keys})
+        return _counts_by_key(keys, app_counts(user_ids))
+
+
+class AsyncDataLoader:
+    """
+    Asyncio counterpart of DataLoader.
+
+    ``load(key)`` returns a future; every key requested before the event loop
+    gets back to the scheduled dispatch is fetched by one ``load_many`` call.
+    Running dispatch tasks are kept in ``_dispatches`` until they finish, since
+    the event loop only holds weak references to tasks.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._queue = []
+        self._dispatches = set()
+
+    async def load_many(self, keys):
+        raise NotImplementedError
+
+    def load(self, key) -> asyncio.Future:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # Reason: sibling resolvers run in tasks already queued on the loop,
+                # so dispatching on the next tick lets them all join this batch.
+                loop.call_soon(self._start_dispatch)
+        return future
+
+    def _start_dispatch(self):
+        task = asyncio.get_running_loop().create_task(self.dispatch())
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    def prime(self, key, value):
+        future = self._cache.get(key)
+        if future is None or future.done():
+            future = self._cache[key] = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+
+    def clear(self, key):
+        self._cache.pop(key, None)
+
+    async def dispatch(self):
+        keys, self._queue = self._queue, []
+        futures = [self._cache[key] for key in keys]
+        record_batch(self, len(keys))
+        try:
+            values = await self.load_many(keys)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, value in zip(futures, values):
+            if not future.done():
+                future.set_result(value)
+
+
+class AsyncUserLoader(AsyncDataLoader):
     async def load_many(self, ids):
-        users = await sync_to_async(list)(User.objects.filter(id__in=ids))
-        user_map = {user.id: user for user in users}
-        return [user_map.get(i) for i in ids]
+        return await aload_entities(User, ids)
 
 
-class AsyncAppLoader:
+class AsyncAppLoader(AsyncDataLoader):
     async def load_many(self, ids):
-        apps = await sync_to_async(list)(DeployedApp.objects.filter(id__in=ids))
-        app_map = {app.id: app for app in apps}
-        return [app_map.get(i) for i in ids]
+        return await aload_entities(DeployedApp, ids)
 
 
-class AsyncUserAppsLoader:
+class AsyncUserAppsLoader(AsyncDataLoader):
     async def load_many(self, user_ids):
         apps = await sync_to_async(list)(
             DeployedApp.objects.filter(owner_id__in=user_ids)
@@ -58,3 +601,40 @@ class AsyncUserAppsLoader:
         for app in apps:
             cache[app.owner_id].append(app)
         return [cache[uid] for uid in user_ids]
+
+
+class AsyncFilteredUserAppsLoader(AsyncDataLoader):
+    async def load_many(self, keys):
+        apps_by_key = defaultdict(list)
+        for filters, user_ids in _group_filtered_keys(keys).items():
+            apps = await sync_to_async(list)(_filtered_apps_query(filters, user_ids))
+            for app in apps:
+                apps_by_key[(app.owner_id, filters)].append(app)
+        return [apps_by_key[key] for key in keys]
+
+
+class AsyncAppCountsLoader(AsyncDataLoader):
+    async def load_many(self, keys):
+        user_ids = list({user_id for user_id, _ in keys})
+        rows = await sync_to_async(list)(app_counts(user_ids))
+        return _counts_by_key(keys, rows)
+
+
+class AsyncLoaderRegistry(LoaderRegistry):
+    """
+    Loader registry for the asyncio execution path.
+
+    Resolvers ask for the sync loader classes; this registry hands out their
+    asyncio counterparts so the same resolver code serves both paths.
+    """
+
+    async_loaders = {
+        UserLoader: AsyncUserLoader,
+        AppLoader: AsyncAppLoader,
+        UserAppsLoader: AsyncUserAppsLoader,
+        FilteredUserAppsLoader: AsyncFilteredUserAppsLoader,
+        AppCountsLoader: AsyncAppCountsLoader,
+    }
+
+    def get(self, loader_class):
+        return super().get(self.async_loaders.get(loader_class, loader_class))
@@ -0,0 +1,87 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class CachedDocument(NamedTuple):
+    """
+    Everything the view derives from a query string before executing it.
+
+    Fields:
+        document (DocumentNode): Parsed AST.
+        validation_errors (List[GraphQLError]): Errors from schema validation.
+        complexity (Dict[Optional[str], QueryCost]): Cost of each operation.
+        fingerprint (str): Hash of the printed AST, equal for documents that
+            differ only in whitespace, commas or comments.
+        plans (Optional[Dict[Optional[str], Optional[ExecutionPlan]]]):
+            Compiled execution plans by operation name, filled on first use.
+    """
+
+    document: Any
+    validation_errors: List[Any]
+    complexity: Dict[Optional[str], Any]
+    fingerprint: str = ""
+    plans: Optional[Dict[Optional[str], Any]] = None
+
+
+class DocumentCache:
+    """
+    Thread-safe bounded LRU of parsed and validated GraphQL documents.
+
+    Keys are SHA-256 hashes of the query text, so the same operation sent by
+    many clients is parsed and validated once per process.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(query: str) -> str:
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedDocument):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache counters for sizing the cache.
+
+        Returns:
+            dict: size, maxsize, hits, misses and evictions.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
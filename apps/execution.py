@@ -0,0 +1,179 @@
+from types import SimpleNamespace
+
+import graphene
+from django.db.models import QuerySet
+from graphql import ExecutionContext, GraphQLError, located_error
+from graphql.execution.execute import get_field_def
+from graphql.pyutils import Path, Undefined
+from graphql.type import is_non_null_type
+from apps.dataloaders import AsyncLoaderRegistry, Deferred, get_loaders
+
+
+class DeferredExecutionContext(ExecutionContext):
+    """
+    Execution context that lets resolvers return ``Deferred`` values.
+
+    Deferred fields are completed once their loader batch is dispatched, so
+    every ``load()`` issued while walking one level of the result tree is
+    flushed as a single query before the next level is executed.
+    """
+
+    def __init__(self, schema, fragments, root_value, context_value, *args, **kwargs):
+        if context_value is None:
+            # Reason: loaders live on the context, so it must accept attributes.
+            context_value = SimpleNamespace()
+        super().__init__(schema, fragments, root_value, context_value, *args, **kwargs)
+        self.loaders = get_loaders(context_value)
+
+    def wait(self, value):
+        """
+        Dispatch loader batches until ``value`` is no longer deferred.
+        """
+        while isinstance(value, Deferred) and value.is_pending:
+            if not self.loaders.dispatch():
+                raise GraphQLError("Deferred value was never scheduled for loading.")
+        if isinstance(value, Deferred):
+            return value.get()
+        return value
+
+    def execute_operation(self, operation, root_value):
+        return self.wait(super().execute_operation(operation, root_value))
+
+    def execute_fields_serially(self, parent_type, source_value, path, fields):
+        # Mutations must finish one root field before starting the next.
+        results = {}
+        for response_name, field_nodes in fields.items():
+            field_path = Path(path, response_name, parent_type.name)
+            result = self.execute_field(parent_type, source_value, field_nodes, field_path)
+            if result is Undefined:
+                continue
+            results[response_name] = self.wait(result)
+        return results
+
+    def execute_fields(self, parent_type, source_value, path, fields):
+        results = super().execute_fields(parent_type, source_value, path, fields)
+        deferred_fields = [
+            name for name, value in results.items() if isinstance(value, Deferred)
+        ]
+        if not deferred_fields:
+            return results
+
+        def set_results(values):
+            results.update(zip(deferred_fields, values))
+            return results
+
+        return Deferred.all(results[name] for name in deferred_fields).then(set_results)
+
+    def execute_field(self, parent_type, source, field_nodes, path):
+        result = super().execute_field(parent_type, source, field_nodes, path)
+        if not isinstance(result, Deferred):
+            return result
+        return_type = get_field_def(self.schema, parent_type, field_nodes[0]).type
+
+        def on_error(raw_error):
+            error = located_error(raw_error, field_nodes, path.as_list())
+            self.handle_field_error(error, return_type, path)
+            return None
+
+        return result.then(None, on_error)
+
+    def complete_value(self, return_type, field_nodes, info, path, result):
+        if isinstance(result, Deferred):
+            return result.then(
+                lambda value: self.complete_value(
+                    return_type, field_nodes, info, path, value
+                )
+            )
+        if is_non_null_type(return_type):
+            completed = self.complete_value(
+                return_type.of_type, field_nodes, info, path, result
+            )
+            if isinstance(completed, Deferred):
+                return completed.then(
+                    lambda value: self._ensure_non_null(value, info)
+                )
+            return self._ensure_non_null(completed, info)
+        return super().complete_value(return_type, field_nodes, info, path, result)
+
+    @staticmethod
+    def _ensure_non_null(completed, info):
+        if completed is None:
+            raise TypeError(
+                "Cannot return null for non-nullable field"
+                f" {info.parent_type.name}.{info.field_name}."
+            )
+        return completed
+
+    def complete_list_value(self, return_type, field_nodes, info, path, result):
+        completed_results = super().complete_list_value(
+            return_type, field_nodes, info, path, result
+        )
+        if not isinstance(completed_results, list) or not any(
+            isinstance(item, Deferred) for item in completed_results
+        ):
+            return completed_results
+
+        item_type = return_type.of_type
+
+        def guard(index, item):
+            if not isinstance(item, Deferred):
+                return item
+            item_path = path.add_key(index, None)
+
+            def on_error(raw_error):
+                error = located_error(raw_error, field_nodes, item_path.as_list())
+                self.handle_field_error(error, item_type, item_path)
+                return None
+
+            return item.then(None, on_error)
+
+        return Deferred.all(
+            guard(index, item) for index, item in enumerate(completed_results)
+        )
+
+
+class AsyncExecutionContext(ExecutionContext):
+    """
+    Execution context for the asyncio path.
+
+    Loaders come from an ``AsyncLoaderRegistry`` and return futures, and
+    querysets returned by root resolvers are fetched with Django's async
+    iteration so no ORM call blocks the event loop.
+    """
+
+    def __init__(self, schema, fragments, root_value, context_value, *args, **kwargs):
+        if context_value is None:
+            context_value = SimpleNamespace()
+        super().__init__(schema, fragments, root_value, context_value, *args, **kwargs)
+        self.loaders = get_loaders(context_value, AsyncLoaderRegistry)
+
+    def complete_list_value(self, return_type, field_nodes, info, path, result):
+        if not isinstance(result, QuerySet):
+            return super().complete_list_value(
+                return_type, field_nodes, info, path, result
+            )
+
+        async def fetch_and_complete():
+            items = [item async for item in result]
+            completed = super(AsyncExecutionContext, self).complete_list_value(
+                return_type, field_nodes, info, path, items
+            )
+            if self.is_awaitable(completed):
+                return await completed
+            return completed
+
+        return fetch_and_complete()
+
+
+class Schema(graphene.Schema):
+    """
+    graphene.Schema that executes with the batching contexts by default.
+    """
+
+    def execute(self, *args, **kwargs):
+        kwargs.setdefault("execution_context_class", DeferredExecutionContext)
+        return super().execute(*args, **kwargs)
+
+    async def execute_async(self, *args, **kwargs):
+        kwargs.setdefault("execution_context_class", AsyncExecutionContext)
+        return await super().execute_async(*args, **kwargs)
@@ -0,0 +1,68 @@
+import graphene
+
+APP_FILTER_FIELDS = ("active", "created_after", "created_before", "owner_plan")
+
+
+def app_filter_arguments(plan_enum) -> dict:
+    """
+    Build the filtering arguments shared by every DeployedApp list field.
+
+    Args:
+        plan_enum: GraphQL enum type (or a lambda returning it) for User.plan.
+    Returns:
+        dict: Argument name to graphene.Argument.
+    """
+    return {
+        "active": graphene.Boolean(description="Only apps with this active flag."),
+        "created_after": graphene.DateTime(
+            description="Only apps created strictly after this time."
+        ),
+        "created_before": graphene.DateTime(
+            description="Only apps created strictly before this time."
+        ),
+        "owner_plan": graphene.Argument(
+            plan_enum, description="Only apps whose owner is on this plan."
+        ),
+    }
+
+
+def get_app_filters(arguments: dict) -> dict:
+    """
+    Pick the app filters that were actually given out of resolver arguments.
+
+    Args:
+        arguments (dict): Resolver keyword arguments.
+    Returns:
+        dict: Filter name to plain Python value, without None values.
+    """
+    filters = {}
+    for name in APP_FILTER_FIELDS:
+        value = arguments.get(name)
+        if value is not None:
+            # Reason: graphene hands enum arguments to resolvers as Enum members.
+            filters[name] = getattr(value, "value", value)
+    return filters
+
+
+def filter_apps(queryset, active=None, created_after=None, created_before=None, owner_plan=None):
+    """
+    Apply app filters to a DeployedApp queryset as SQL predicates.
+
+    Args:
+        queryset (QuerySet): DeployedApp queryset.
+        active (Optional[bool]): Required value of ``active``.
+        created_after (Optional[datetime]): Exclusive lower bound on ``created_at``.
+        created_before (Optional[datetime]): Exclusive upper bound on ``created_at``.
+        owner_plan (Optional[str]): Required plan of the owning user.
+    Returns:
+        QuerySet: The filtered queryset.
+    """
+    if active is not None:
+        queryset = queryset.filter(active=active)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gt=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    if owner_plan is not None:
+        queryset = queryset.filter(owner__plan=owner_plan)
+    return queryset
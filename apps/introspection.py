@@ -0,0 +1,104 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from graphql import ExecutionResult, FieldNode, OperationType, execute, print_schema
+
+# Root fields answered from the schema alone, without touching the database.
+INTROSPECTION_FIELDS = frozenset(("__schema", "__type", "__typename"))
+
+
+@lru_cache(maxsize=None)
+def schema_sdl(graphql_schema) -> str:
+    """
+    Print a schema in the GraphQL schema definition language, once per process.
+    """
+    return print_schema(graphql_schema)
+
+
+@lru_cache(maxsize=None)
+def schema_etag(graphql_schema) -> str:
+    """
+    Entity tag of the printed schema; changes whenever the schema does.
+    """
+    return hashlib.sha256(schema_sdl(graphql_schema).encode()).hexdigest()
+
+
+def is_introspection(operation_ast) -> bool:
+    """
+    True if an operation is a query selecting only introspection root fields.
+
+    Root fragments are not followed, so an operation spreading one is never
+    treated as introspection and always executes normally.
+    """
+    if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+        return False
+    selections = operation_ast.selection_set.selections
+    return bool(selections) and all(
+        isinstance(selection, FieldNode) and selection.name.value in INTROSPECTION_FIELDS
+        for selection in selections
+    )
+
+
+class IntrospectionCache:
+    """
+    Bounded, thread-safe store of introspection results.
+
+    The schema never changes while the process runs, so an introspection
+    operation's result depends only on its document, operation name and
+    variables. GraphiQL and code generators send the same large
+    introspection query on every page load or build; each distinct one is
+    executed once per process instead of walking the whole schema every time.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(fingerprint: str, operation_name: Optional[str], variables) -> str:
+        return json.dumps([fingerprint, operation_name, variables or {}], sort_keys=True)
+
+    def execute(self, graphql_schema, document, fingerprint: str, operation_name, variables):
+        """
+        Return an introspection operation's result, executing it on a miss.
+
+        Args:
+            graphql_schema (GraphQLSchema): Schema the document was validated against.
+            document (DocumentNode): Parsed, validated document.
+            fingerprint (str): The document's normalized hash.
+            operation_name (Optional[str]): Operation to run.
+            variables (Optional[dict]): Variable values.
+        Returns:
+            ExecutionResult: A new result object; callers may add extensions to it.
+        """
+        key = self.key(fingerprint, operation_name, variables)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+        if cached is None:
+            cached = execute(
+                graphql_schema,
+                document,
+                variable_values=variables,
+                operation_name=operation_name,
+            )
+            if cached.errors or self.maxsize <= 0:
+                return cached
+            with self._lock:
+                self._results[key] = cached
+                while len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+        return ExecutionResult(data=cached.data)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self) -> int:
+        return len(self._results)
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.synthetic import SYNTHETIC_BATCH_SIZE, generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Bulk-create synthetic users and apps for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--apps-per-user", type=int, default=3)
+        parser.add_argument("--batch-size", type=int, default=SYNTHETIC_BATCH_SIZE)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="bench")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(users, apps):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{users} users, {apps} apps ({(users + apps) / elapsed:,.0f} rows/s)"
+            )
+
+        users, apps = generate_dataset(
+            options["users"],
+            apps_per_user=options["apps_per_user"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {users} users and {apps} apps in {elapsed:.1f}s "
+                f"({(users + apps) / elapsed:,.0f} rows/s)."
+            )
+        )
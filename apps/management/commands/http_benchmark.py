@@ -0,0 +1,74 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.benchmarks import NESTED_QUERY, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Send GraphQL requests to a running server from concurrent clients and "
+        "report requests/sec and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000/graphql/")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--query", default=NESTED_QUERY)
+        parser.add_argument("--variables", default='{"first": 10}', help="JSON object.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("--url must be an http:// URL.")
+        try:
+            variables = json.loads(options["variables"])
+        except ValueError as error:
+            raise CommandError(f"--variables is not JSON: {error}") from error
+        body = json.dumps({"query": options["query"], "variables": variables})
+        headers = {"Content-Type": "application/json"}
+        remaining = iter(range(options["requests"]))
+        lock = threading.Lock()
+        timings, failures = [], []
+
+        def client():
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                started = time.perf_counter()
+                try:
+                    connection.request("POST", url.path or "/", body, headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    (timings if ok else failures).append(elapsed)
+            connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(options["concurrency"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if not timings:
+            raise CommandError(f"All {len(failures)} requests failed.")
+
+        self.stdout.write(
+            f"{len(timings)} ok, {len(failures)} failed in {elapsed:.2f}s: "
+            f"{len(timings) / elapsed:,.1f} req/s, "
+            f"p50 {percentile(timings, 50) * 1000:.1f} ms, "
+            f"p95 {percentile(timings, 95) * 1000:.1f} ms, "
+            f"p99 {percentile(timings, 99) * 1000:.1f} ms"
+        )
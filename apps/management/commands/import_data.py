@@ -0,0 +1,70 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+from apps.bulk_import import IMPORT_BATCH_SIZE, BulkImportError, import_records, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream JSON or NDJSON fixtures into the database in batches, using COPY on "
+        "PostgreSQL and bulk_create elsewhere. Use '-' to read from stdin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help="Drop secondary indexes during the load and rebuild them afterwards.",
+        )
+        parser.add_argument(
+            "--ignore-conflicts",
+            action="store_true",
+            help="Skip rows whose key already exists instead of failing.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        def progress(rows, elapsed):
+            rate = rows / elapsed if elapsed else 0.0
+            self.stdout.write(f"{rows} rows ({rate:,.0f} rows/s)")
+
+        def records():
+            for path in options["files"]:
+                if path == "-":
+                    yield from iter_records(sys.stdin)
+                    continue
+                with open(path, encoding="utf-8") as stream:
+                    yield from iter_records(stream)
+
+        started = time.perf_counter()
+        try:
+            counts = import_records(
+                records(),
+                batch_size=options["batch_size"],
+                using=options["database"],
+                defer_indexes=options["defer_indexes"],
+                ignore_conflicts=options["ignore_conflicts"],
+                progress=progress,
+            )
+        except (BulkImportError, OSError) as error:
+            raise CommandError(str(error)) from error
+        except IntegrityError as error:
+            raise CommandError(
+                f"{error}. Rows already present can be skipped with --ignore-conflicts."
+            ) from error
+        elapsed = time.perf_counter() - started
+        rows = sum(counts.values())
+        summary = ", ".join(f"{count} {label}" for label, count in counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {rows} rows ({summary or 'nothing'}) in {elapsed:.1f}s "
+                f"({rows / elapsed if elapsed else 0.0:,.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.startup import profile_startup, time_by_package
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the project in a fresh interpreter and report time per startup "
+        "phase, per package and per module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20, help="Modules to list.")
+        parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative")
+        parser.add_argument(
+            "--query", default="{ __typename }", help="GraphQL query sent as the first request."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            profile = profile_startup(options["query"])
+        except RuntimeError as error:
+            raise CommandError(f"Startup failed:\n{error}") from error
+
+        self.stdout.write("phase                       ms")
+        for name, seconds in profile.phases.items():
+            self.stdout.write(f"{name:<20}{seconds * 1000:>10.1f}")
+        self.stdout.write(f"{'total':<20}{profile.total * 1000:>10.1f}")
+        self.stdout.write(f"first request: {', '.join(profile.status)}")
+
+        self.stdout.write("\npackage                self ms")
+        for package, self_us in time_by_package(profile.imports)[: options["top"]]:
+            self.stdout.write(f"{package:<20}{self_us / 1000:>10.1f}")
+
+        key = "cumulative_us" if options["sort"] == "cumulative" else "self_us"
+        slowest = sorted(profile.imports, key=lambda timing: getattr(timing, key), reverse=True)
+        self.stdout.write(f"\n{'module':<50}{'self ms':>10}{'cumul. ms':>10}")
+        for timing in slowest[: options["top"]]:
+            self.stdout.write(
+                f"{timing.module:<50}{timing.self_us / 1000:>10.1f}"
+                f"{timing.cumulative_us / 1000:>10.1f}"
+            )
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.benchmarks import QueryBudgetExceeded, build_scenarios, check_budgets, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        "Time loaders, root resolvers, queries and mutations against the current "
+        "database and fail if any scenario exceeds its query budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--sample", type=int, default=100, help="Rows per scenario.")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            help="Only run scenarios whose name starts with this; repeatable.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        prefixes = tuple(options["scenario"] or ("",))
+        scenarios = [
+            scenario
+            for scenario in build_scenarios(options["sample"])
+            if scenario.name.startswith(prefixes)
+        ]
+        if not scenarios:
+            raise CommandError("No scenario matches --scenario.")
+
+        results = [
+            run_scenario(scenario, options["iterations"], options["warmup"])
+            for scenario in scenarios
+        ]
+        if options["json"]:
+            self.stdout.write(
+                json.dumps(
+                    [{**result._asdict(), "within_budget": result.within_budget} for result in results],
+                    indent=2,
+                )
+            )
+        else:
+            self.stdout.write(
+                f"{'scenario':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                f"{'rows/s':>12}{'queries':>10}"
+            )
+            for result in results:
+                self.stdout.write(
+                    f"{result.name:<28}{result.p50:>10.2f}{result.p95:>10.2f}"
+                    f"{result.p99:>10.2f}{result.rows_per_second:>12,.0f}"
+                    f"{f'{result.queries}/{result.query_budget}':>10}"
+                )
+        try:
+            check_budgets(results)
+        except QueryBudgetExceeded as e:
+            raise CommandError(f"Query budget exceeded: {e}")
@@ -0,0 +1,98 @@
+import logging
+import os
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.metrics import metrics_enabled, prepare_multiprocess_dir
+from apps.server import (
+    LISTEN_FD_ENV,
+    PreforkMaster,
+    get_server_settings,
+    inherited_workers,
+    listen,
+    preload,
+    serve_asgi,
+    serve_wsgi,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the project from preloaded, pre-warmed worker processes. Send SIGHUP "
+        "to reload code without dropping connections, SIGTTIN/SIGTTOU to add or "
+        "remove a worker."
+    )
+
+    def add_arguments(self, parser):
+        config = get_server_settings()
+        parser.add_argument("--bind", default="127.0.0.1:8000", help="host:port to listen on.")
+        parser.add_argument("--workers", type=int, default=config["WORKERS"])
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=config["THREADS"],
+            help="Request threads per worker (sync threads per worker for ASGI).",
+        )
+        parser.add_argument(
+            "--interface",
+            choices=("asgi", "wsgi"),
+            default=config["INTERFACE"],
+            help="asgi runs uvicorn (HTTP/1.1, websockets); wsgi is a threaded fallback.",
+        )
+        parser.add_argument(
+            "--graceful-timeout", type=float, default=config["GRACEFUL_TIMEOUT"]
+        )
+        parser.add_argument(
+            "--no-warmup", action="store_true", help="Skip the warm-up queries."
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["threads"] < 1:
+            raise CommandError("--workers and --threads must be positive.")
+        serve = serve_wsgi
+        if options["interface"] == "asgi":
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError as error:
+                raise CommandError("--interface asgi requires uvicorn.") from error
+            serve = serve_asgi
+
+        metrics_dir, temporary_metrics_dir = None, False
+        if metrics_enabled():
+            # Reason: without a shared directory each scrape reports one worker.
+            metrics_dir, temporary_metrics_dir = prepare_multiprocess_dir(
+                reloading=LISTEN_FD_ENV in os.environ
+            )
+
+        old_workers = inherited_workers()
+        try:
+            application = preload(
+                options["interface"], [] if options["no_warmup"] else None
+            )
+        except Exception:
+            if not old_workers:
+                raise
+            # Reason: exiting here would orphan the workers still serving the old code.
+            logger.exception("reload failed; the previous workers keep serving")
+            application = None
+        try:
+            sock = listen(options["bind"], get_server_settings()["BACKLOG"])
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot listen on {options['bind']}: {error}") from error
+        self.stdout.write(
+            f"Serving {options['interface'].upper()} on {options['bind']} with "
+            f"{options['workers']} workers x {options['threads']} threads."
+        )
+        self.stdout.flush()
+        PreforkMaster(
+            sock,
+            application,
+            serve,
+            workers=options["workers"],
+            threads=options["threads"],
+            graceful_timeout=options["graceful_timeout"],
+        ).run(old_workers)
+        if temporary_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
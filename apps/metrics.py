@@ -0,0 +1,604 @@
+import asyncio
+import glob
+import inspect
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from graphql import get_named_type, is_leaf_type
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Operation name label used once MAX_OPERATION_NAMES distinct names were seen.
+OTHER_OPERATION = "other"
+
+# Environment variable read by settings for MULTIPROCESS_DIR; `serve` sets it
+# so a master re-executed on SIGHUP keeps the same directory.
+METRICS_DIR_ENV = "GRAPHQL_METRICS_DIR"
+# Set when `serve` created the directory itself and removes it on exit.
+METRICS_DIR_TEMPORARY_ENV = "GRAPHQL_METRICS_DIR_TEMPORARY"
+
+# Series of exited worker processes, merged by the master that reaped them.
+ARCHIVE_FILE = "metrics-archive.json"
+
+
+class Histogram:
+    """
+    Definition of a histogram family: name, help text, label names and buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...], buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+
+
+class Counter:
+    """
+    Definition of a counter family.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+
+class Gauge(Counter):
+    """
+    Definition of a gauge family. Gauges of exited processes are not archived.
+    """
+
+    kind = "gauge"
+
+
+FIELD_DURATION = Histogram(
+    "graphql_field_duration_seconds",
+    "Time from calling a field resolver until its value, including batched loads, "
+    "is ready.",
+    ("type", "field"),
+    LATENCY_BUCKETS,
+)
+FIELD_ERRORS = Counter(
+    "graphql_field_errors_total",
+    "Field resolvers that raised or rejected.",
+    ("type", "field"),
+)
+OPERATION_DURATION = Histogram(
+    "graphql_operation_duration_seconds",
+    "Execution time of GraphQL operations.",
+    ("operation", "operation_type"),
+    LATENCY_BUCKETS,
+)
+OPERATION_ERRORS = Counter(
+    "graphql_operation_errors_total",
+    "GraphQL operations whose result contained errors.",
+    ("operation", "operation_type"),
+)
+LOADER_BATCH_SIZE = Histogram(
+    "graphql_loader_batch_size",
+    "Keys fetched per DataLoader dispatch.",
+    ("loader",),
+    BATCH_SIZE_BUCKETS,
+)
+CACHE_HITS = Counter(
+    "graphql_cache_hits_total",
+    "Lookups answered by an in-process cache.",
+    ("cache",),
+)
+CACHE_MISSES = Counter(
+    "graphql_cache_misses_total",
+    "Lookups an in-process cache could not answer.",
+    ("cache",),
+)
+CACHE_EVICTIONS = Counter(
+    "graphql_cache_evictions_total",
+    "Entries an in-process cache dropped to stay within its size bound.",
+    ("cache",),
+)
+CACHE_ENTRIES = Gauge(
+    "graphql_cache_entries",
+    "Entries held by an in-process cache, summed over live workers.",
+    ("cache",),
+)
+CACHE_MAX_ENTRIES = Gauge(
+    "graphql_cache_max_entries",
+    "Size bound of an in-process cache, summed over live workers.",
+    ("cache",),
+)
+
+METRICS = (
+    FIELD_DURATION,
+    FIELD_ERRORS,
+    OPERATION_DURATION,
+    OPERATION_ERRORS,
+    LOADER_BATCH_SIZE,
+    CACHE_HITS,
+    CACHE_MISSES,
+    CACHE_EVICTIONS,
+    CACHE_ENTRIES,
+    CACHE_MAX_ENTRIES,
+)
+
+GAUGE_NAMES = frozenset(metric.name for metric in METRICS if metric.kind == "gauge")
+
+# Keys of a cache's stats() and the metric each one is exported as.
+CACHE_STATS = (
+    ("hits", CACHE_HITS),
+    ("misses", CACHE_MISSES),
+    ("evictions", CACHE_EVICTIONS),
+    ("size", CACHE_ENTRIES),
+    ("maxsize", CACHE_MAX_ENTRIES),
+)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metric storage with per-thread shards.
+
+    Every thread writes to its own shard, so recording takes no lock; a lock
+    is only taken the first time a thread records anything. Scrapes add the
+    shards together. Shards of finished threads are kept, so counters never
+    go backwards.
+
+    Series are stored as ``{(metric name, label values): value}`` where a
+    counter's value is a number and a histogram's is
+    ``[bucket counts..., +Inf count, sum]``.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, histogram: Histogram, labels: Tuple[str, ...], value: float):
+        shard = self._shard()
+        key = (histogram.name, labels)
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = [0] * (len(histogram.buckets) + 1) + [0.0]
+        for index, bound in enumerate(histogram.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        else:
+            series[len(histogram.buckets)] += 1
+        series[-1] += value
+
+    def inc(self, counter: Counter, labels: Tuple[str, ...], amount: float = 1):
+        shard = self._shard()
+        key = (counter.name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self) -> Dict[Tuple[str, Tuple[str, ...]], object]:
+        """
+        Return this process's series, summed over all thread shards.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        return merge_series(dict(shard) for shard in shards)
+
+    def clear(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+def merge_series(snapshots: Iterable[dict]) -> dict:
+    """
+    Add series from several shards or processes together.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for key, value in snapshot.items():
+            if isinstance(value, list):
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = list(value)
+                else:
+                    merged[key] = [a + b for a, b in zip(total, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+registry = MetricsRegistry()
+
+# Caches whose stats() are exported, by ``cache`` label value.
+_caches = {}
+
+
+def register_cache(name: str, cache):
+    """
+    Export ``cache.stats()`` with the label ``cache="<name>"`` on every scrape.
+
+    Args:
+        name (str): Label value, e.g. ``document`` or ``entity``.
+        cache: Object whose ``stats()`` returns a dict with any of the keys
+            in ``CACHE_STATS``.
+    """
+    _caches[name] = cache
+
+
+def cache_series() -> dict:
+    """
+    Return the current stats of every registered cache as series.
+    """
+    series = {}
+    for name, cache in list(_caches.items()):
+        stats = cache.stats()
+        for key, metric in CACHE_STATS:
+            if key in stats:
+                series[(metric.name, (name,))] = stats[key]
+    return series
+
+
+def process_series() -> dict:
+    """
+    Return this process's recorded series together with its cache stats.
+    """
+    return merge_series([registry.collect(), cache_series()])
+
+
+def get_metrics_settings() -> dict:
+    config = {
+        "ENABLED": True,
+        "MULTIPROCESS_DIR": None,
+        "FLUSH_INTERVAL": 5.0,
+        "MAX_OPERATION_NAMES": 200,
+    }
+    config.update(getattr(settings, "GRAPHQL_METRICS", {}))
+    return config
+
+
+def metrics_enabled() -> bool:
+    return get_metrics_settings()["ENABLED"]
+
+
+class ProcessSnapshots:
+    """
+    Shares series between worker processes through one JSON file per process.
+
+    Each process rewrites ``<dir>/metrics-<pid>.json`` at most every
+    ``FLUSH_INTERVAL`` seconds as it records operations, before it answers
+    a scrape, and when it exits. The scraped process merges every file in
+    the directory, so any worker can answer for all of them.
+
+    When a worker exits, the master folds its file into ``ARCHIVE_FILE`` and
+    removes it. Exited workers stay in the totals, and a later process
+    reusing the pid starts a new file instead of overwriting their counts.
+    """
+
+    def __init__(self):
+        self._flushed_at = 0.0
+        self._lock = threading.Lock()
+
+    def path(self, directory: str, pid: Optional[int] = None) -> str:
+        return os.path.join(directory, f"metrics-{pid or os.getpid()}.json")
+
+    def flush(self, directory: str, force: bool = False):
+        interval = get_metrics_settings()["FLUSH_INTERVAL"]
+        now = time.monotonic()
+        if not force and now - self._flushed_at < interval:
+            return
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            self._flushed_at = now
+            self._write(self.path(directory), process_series())
+        finally:
+            self._lock.release()
+
+    def load(self, directory: str) -> dict:
+        return merge_series(
+            filter(
+                None,
+                map(self._read, glob.glob(os.path.join(directory, "metrics-*.json"))),
+            )
+        )
+
+    def archive(self, directory: str, pid: int):
+        """
+        Fold an exited process's file into the archive and remove it.
+
+        Only the master calls this, so the archive has a single writer.
+        Gauges are dropped: they describe the process, which is gone.
+        """
+        path = self.path(directory, pid)
+        series = self._read(path)
+        if series is None:
+            return
+        series = {key: value for key, value in series.items() if key[0] not in GAUGE_NAMES}
+        archive = os.path.join(directory, ARCHIVE_FILE)
+        self._write(archive, merge_series([self._read(archive) or {}, series]))
+        os.remove(path)
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path) as f:
+                series = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {(name, tuple(labels)): value for name, labels, value in series}
+
+    @staticmethod
+    def _write(path: str, series: dict):
+        rows = [[name, list(labels), value] for (name, labels), value in series.items()]
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(rows, f)
+        # Reason: readers never see a partly written file.
+        os.replace(temporary, path)
+
+
+process_snapshots = ProcessSnapshots()
+
+
+def collect_all() -> dict:
+    """
+    Return the series of every worker process, or of this one when metrics
+    are not shared through a directory.
+    """
+    directory = get_metrics_settings()["MULTIPROCESS_DIR"]
+    if not directory:
+        return process_series()
+    process_snapshots.flush(directory, force=True)
+    return process_snapshots.load(directory)
+
+
+def prepare_multiprocess_dir(reloading: bool = False) -> Tuple[str, bool]:
+    """
+    Give the worker processes of a server a shared metrics directory.
+
+    Uses ``MULTIPROCESS_DIR`` when set and creates a temporary directory
+    otherwise. A fresh start empties it, like a restarted Prometheus
+    target; a reload keeps it, so counters continue across code reloads.
+
+    Args:
+        reloading (bool): Whether the calling master replaces a running one.
+    Returns:
+        Tuple[str, bool]: The directory, also stored in settings and
+        ``METRICS_DIR_ENV``, and whether it is a temporary one to remove
+        when the server stops.
+    """
+    directory = get_metrics_settings()["MULTIPROCESS_DIR"]
+    temporary = os.environ.get(METRICS_DIR_TEMPORARY_ENV) == "1" and bool(directory)
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="graphql-metrics-")
+        temporary = True
+        os.environ[METRICS_DIR_TEMPORARY_ENV] = "1"
+    os.makedirs(directory, exist_ok=True)
+    if not reloading:
+        for path in glob.glob(os.path.join(directory, "metrics-*.json*")):
+            os.remove(path)
+    settings.GRAPHQL_METRICS = {
+        **getattr(settings, "GRAPHQL_METRICS", {}),
+        "MULTIPROCESS_DIR": directory,
+    }
+    os.environ[METRICS_DIR_ENV] = directory
+    return directory, temporary
+
+
+def process_exiting():
+    """
+    Write this process's final series, so the last flush interval is kept.
+    """
+    directory = get_metrics_settings()["MULTIPROCESS_DIR"]
+    if directory:
+        process_snapshots.flush(directory, force=True)
+
+
+def process_exited(pid: int):
+    """
+    Move an exited worker's series into the archive.
+    """
+    directory = get_metrics_settings()["MULTIPROCESS_DIR"]
+    if directory:
+        process_snapshots.archive(directory, pid)
+
+
+def operation_finished():
+    """
+    Give other processes a recent copy of this process's series.
+    """
+    directory = get_metrics_settings()["MULTIPROCESS_DIR"]
+    if directory:
+        process_snapshots.flush(directory)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_bound(bound) -> str:
+    return repr(float(bound))
+
+
+def render_prometheus(series: dict) -> str:
+    """
+    Render series in the Prometheus text exposition format.
+    """
+    by_metric = defaultdict(list)
+    for (name, labels), value in series.items():
+        by_metric[name].append((labels, value))
+
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in sorted(by_metric.get(metric.name, ())):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(metric.labels, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, value):
+                cumulative += count
+                le = ("le", _format_bound(bound))
+                lines.append(
+                    f"{metric.name}_bucket{_labels(metric.labels, labels, le)} {cumulative}"
+                )
+            count = cumulative + value[len(metric.buckets)]
+            lines.append(
+                f"{metric.name}_bucket{_labels(metric.labels, labels, ('le', '+Inf'))} {count}"
+            )
+            lines.append(f"{metric.name}_sum{_labels(metric.labels, labels)} {value[-1]}")
+            lines.append(f"{metric.name}_count{_labels(metric.labels, labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Serve every worker's metrics in the Prometheus text format.
+    """
+    return HttpResponse(
+        render_prometheus(collect_all()), content_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+def record_batch(loader, size: int):
+    """
+    Record the number of keys a loader fetched in one dispatch.
+    """
+    if metrics_enabled():
+        registry.observe(LOADER_BATCH_SIZE, (type(loader).__name__,), size)
+
+
+class OperationNames:
+    """
+    Bounded set of operation names used as label values.
+
+    Operation names come from clients; past ``MAX_OPERATION_NAMES`` distinct
+    names, new ones are reported as ``other`` to bound the series count.
+    """
+
+    def __init__(self):
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def label(self, name: Optional[str]) -> str:
+        name = name or "anonymous"
+        if name in self._names:
+            return name
+        with self._lock:
+            if len(self._names) >= get_metrics_settings()["MAX_OPERATION_NAMES"]:
+                return OTHER_OPERATION
+            self._names.add(name)
+        return name
+
+
+operation_names = OperationNames()
+
+
+def record_operation(operation_ast, duration: float, result):
+    """
+    Record an executed operation's latency and whether it produced errors.
+    """
+    name = operation_ast.name.value if operation_ast.name else None
+    labels = (operation_names.label(name), operation_ast.operation.value)
+    registry.observe(OPERATION_DURATION, labels, duration)
+    if result is not None and result.errors:
+        registry.inc(OPERATION_ERRORS, labels)
+    operation_finished()
+
+
+class MetricsMiddleware:
+    """
+    Graphene middleware recording latency and errors of non-scalar fields.
+
+    Scalar fields are plain attribute reads and are skipped. The latency of
+    a field runs until its value is ready, so a field resolved through a
+    loader includes the wait for its batch.
+    """
+
+    # Reason: compiled plans may read leaf fields without calling middleware.
+    skips_leaf_fields = True
+
+    def __init__(self):
+        self._timed = {}
+
+    def is_timed(self, info) -> bool:
+        key = (info.parent_type.name, info.field_name)
+        timed = self._timed.get(key)
+        if timed is None:
+            timed = self._timed[key] = not is_leaf_type(get_named_type(info.return_type))
+        return timed
+
+    def resolve(self, next, root, info, **args):
+        if not self.is_timed(info):
+            return next(root, info, **args)
+        labels = (info.parent_type.name, info.field_name)
+        started = time.perf_counter()
+
+        def done(failed: bool):
+            registry.observe(FIELD_DURATION, labels, time.perf_counter() - started)
+            if failed:
+                registry.inc(FIELD_ERRORS, labels)
+
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            done(True)
+            raise
+        # Reason: a Deferred from apps.dataloaders; checked by shape because the
+        # loaders import this module to record their batch sizes.
+        if hasattr(result, "then"):
+
+            def fulfilled(value):
+                done(False)
+                return value
+
+            def rejected(error):
+                done(True)
+                raise error
+
+            return result.then(fulfilled, rejected)
+        if isinstance(result, asyncio.Future):
+            result.add_done_callback(
+                lambda future: done(future.cancelled() or future.exception() is not None)
+            )
+            return result
+        if inspect.isawaitable(result):
+            return self.await_result(result, done)
+        done(False)
+        return result
+
+    async def await_result(self, awaitable, done):
+        try:
+            value = await awaitable
+        except Exception:
+            done(True)
+            raise
+        done(False)
+        return value
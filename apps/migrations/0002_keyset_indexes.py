@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apps", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="deployedapp",
+            index=models.Index(fields=["created_at", "id"], name="app_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["created_at", "id"], name="user_created_id_idx"),
+        ),
+    ]
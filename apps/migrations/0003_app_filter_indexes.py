@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apps", "0002_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="deployedapp",
+            index=models.Index(
+                fields=["owner", "active", "created_at"],
+                name="app_owner_active_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deployedapp",
+            index=models.Index(
+                condition=models.Q(("active", True)),
+                fields=["created_at", "id"],
+                name="app_active_created_id_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-18 06:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_app_counters(apps, schema_editor):
+    User = apps.get_model("apps", "User")
+    DeployedApp = apps.get_model("apps", "DeployedApp")
+    counts = (
+        DeployedApp.objects.filter(owner_id=OuterRef("pk"))
+        .values("owner_id")
+        .annotate(
+            app_count=Count("pk"),
+            active_app_count=Count("pk", filter=Q(active=True)),
+        )
+        .order_by()
+    )
+    User.objects.update(
+        app_count=Coalesce(Subquery(counts.values("app_count")), 0),
+        active_app_count=Coalesce(Subquery(counts.values("active_app_count")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apps", "0003_app_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="active_app_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="app_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_app_counters, migrations.RunPython.noop),
+    ]
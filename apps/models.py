@@ -1,31 +1,121 @@
-import string
-import random
-from django.db import models
+from collections import defaultdict
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from typing import List, Tuple
+from apps.ids import allocate_ids
+
+USER_ID_PREFIX = "u_"
+APP_ID_PREFIX = "app_"
+
+# Attempts at inserting a row before an id collision is reported.
+ID_COLLISION_RETRIES = 3
+
+# Ids per query when checking a bulk insert for taken ids.
+ID_CHECK_BATCH_SIZE = 500
+
+
+def app_counters_enabled() -> bool:
+    """
+    Whether ``User.app_count``/``active_app_count`` are maintained and read.
+    """
+    return getattr(settings, "GRAPHQL_APP_COUNTERS", False)
 
 
 def generate_user_id() -> str:
     """
-    Generate a custom user ID in the format u_[a-Z0-9]+.
+    Generate a time-ordered user ID in the format u_[0-9a-z]{16}.
 
     Returns:
         str: Generated user ID.
     """
-    chars = string.ascii_letters + string.digits
-    return "u_" + "".join(random.choices(chars, k=10))
+    return allocate_ids(USER_ID_PREFIX, 1)[0]
 
 
 def generate_app_id() -> str:
     """
-    Generate a custom app ID in the format app_[a-Z0-9]+.
+    Generate a time-ordered app ID in the format app_[0-9a-z]{16}.
 
     Returns:
         str: Generated app ID.
     """
-    chars = string.ascii_letters + string.digits
-    return "app_" + "".join(random.choices(chars, k=10))
+    return allocate_ids(APP_ID_PREFIX, 1)[0]
+
+
+def taken_ids(model, ids, using=None) -> set:
+    """
+    Return which of ``ids`` are already primary keys of ``model``.
+    """
+    ids = list(ids)
+    taken = set()
+    for start in range(0, len(ids), ID_CHECK_BATCH_SIZE):
+        taken.update(
+            model._base_manager.using(using)
+            .filter(pk__in=ids[start:start + ID_CHECK_BATCH_SIZE])
+            .values_list("pk", flat=True)
+        )
+    return taken
+
+
+def insert_with_fresh_id(instance, save, *args, **kwargs):
+    """
+    Insert a row whose id was just generated, moving it to a new id if taken.
+
+    The insert is forced, so a colliding id fails instead of turning into an
+    UPDATE of the row that already holds it.
+
+    Args:
+        instance (Model): Unsaved instance with a generated id.
+        save (Callable): The model's ``Model.save``, bound to ``instance``.
+    Raises:
+        IntegrityError: If the insert fails for another reason, or the id
+            still collides after ID_COLLISION_RETRIES attempts.
+    """
+    kwargs["force_insert"] = True
+    using = kwargs.get("using")
+    for attempt in range(ID_COLLISION_RETRIES):
+        try:
+            with transaction.atomic(using=using):
+                return save(*args, **kwargs)
+        except IntegrityError:
+            if attempt == ID_COLLISION_RETRIES - 1 or not taken_ids(
+                type(instance), [instance.pk], using
+            ):
+                raise
+            instance.pk = allocate_ids(instance.ID_PREFIX, 1)[0]
+
+
+class TimeOrderedIdQuerySet(models.QuerySet):
+    """
+    QuerySet whose ``bulk_create`` assigns ids to rows that have none.
+
+    Missing ids are allocated in one batch, so the rows are inserted in id
+    order and append to the primary key index. Rows that collide with an
+    existing id get new ids and the insert is retried; ids set by the caller
+    are never changed.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        missing = [obj for obj in objs if not obj.pk]
+        if not missing:
+            return super().bulk_create(objs, *args, **kwargs)
+        for obj, object_id in zip(missing, allocate_ids(self.model.ID_PREFIX, len(missing))):
+            obj.pk = object_id
+        for attempt in range(ID_COLLISION_RETRIES):
+            try:
+                with transaction.atomic(using=self.db):
+                    return super().bulk_create(objs, *args, **kwargs)
+            except IntegrityError:
+                taken = taken_ids(self.model, [obj.pk for obj in missing], self.db)
+                if attempt == ID_COLLISION_RETRIES - 1 or not taken:
+                    raise
+                moved = [obj for obj in missing if obj.pk in taken]
+                for obj, object_id in zip(moved, allocate_ids(self.model.ID_PREFIX, len(moved))):
+                    obj.pk = object_id
 
 
 class User(models.Model):
@@ -33,11 +123,14 @@ class User(models.Model):
     Represents a system user who can own applications.
 
     Fields:
-        id (str): Custom user ID (primary key).
+        id (str): Time-ordered user ID (primary key); ids issued before
+            time-ordered ids keep working.
         username (str): Unique username.
         plan (str): Account plan, either 'HOBBY' or 'PRO'.
         created_at (datetime): Creation timestamp.
         updated_at (datetime): Last update timestamp.
+        app_count (int): Number of apps owned, maintained by DeployedApp writes.
+        active_app_count (int): Number of active apps owned.
     """
 
     PLAN_CHOICES = [
@@ -50,10 +143,43 @@ class User(models.Model):
     plan = models.CharField(max_length=10, choices=PLAN_CHOICES)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    app_count = models.IntegerField(default=0, editable=False)
+    active_app_count = models.IntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ("app_count", "active_app_count")
+    ID_PREFIX = USER_ID_PREFIX
+
+    objects = TimeOrderedIdQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Reason: keyset pagination seeks on (created_at, id).
+            models.Index(fields=["created_at", "id"], name="user_created_id_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "plan" in field_names:
+            instance._loaded_plan = instance.plan
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.id:
             self.id = generate_user_id()
+            return insert_with_fresh_id(self, super().save, *args, **kwargs)
+        if (
+            app_counters_enabled()
+            and not self._state.adding
+            and kwargs.get("update_fields") is None
+        ):
+            # Reason: counters are changed with F() updates by app writes; saving the
+            # loaded values back would undo concurrent increments.
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def clean(self):
@@ -71,7 +197,8 @@ class DeployedApp(models.Model):
     Represents an application owned by a user.
 
     Fields:
-        id (str): Custom app ID (primary key).
+        id (str): Time-ordered app ID (primary key); ids issued before
+            time-ordered ids keep working.
         active (bool): Whether the app is active.
         owner (User): Foreign key to the owning user.
         created_at (datetime): Creation timestamp.
@@ -84,10 +211,63 @@ class DeployedApp(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    ID_PREFIX = APP_ID_PREFIX
+
+    objects = TimeOrderedIdQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="app_created_id_idx"),
+            # Reason: serves UserNode.apps filtered by active and a created_at range.
+            models.Index(
+                fields=["owner", "active", "created_at"],
+                name="app_owner_active_created_idx",
+            ),
+            # Reason: allApps(active: true) pages through active apps only; backends
+            # without partial index support skip this index.
+            models.Index(
+                fields=["created_at", "id"],
+                name="app_active_created_id_idx",
+                condition=models.Q(active=True),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "owner_id" in field_names and "active" in field_names:
+            instance._counted_as = (instance.owner_id, instance.active)
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.id:
+        """
+        Save the app and, with ``GRAPHQL_APP_COUNTERS`` enabled, move its
+        owner's counters in the same transaction.
+        """
+        generated = not self.id
+        if generated:
             self.id = generate_app_id()
-        super().save(*args, **kwargs)
+        if not app_counters_enabled():
+            if generated:
+                insert_with_fresh_id(self, super().save, *args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
+            self._counted_as = (self.owner_id, self.active)
+            return
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get("using")):
+            if generated:
+                insert_with_fresh_id(self, super().save, *args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
+            if adding:
+                adjust_app_counters(None, (self.owner_id, self.active))
+            elif getattr(self, "_counted_as", None) is not None:
+                adjust_app_counters(self._counted_as, (self.owner_id, self.active))
+            else:
+                # Reason: the previous owner/active values are unknown, so recount.
+                refresh_app_counters([self.owner_id])
+        self._counted_as = (self.owner_id, self.active)
 
     def clean(self):
         if not self.owner_id:
@@ -95,3 +275,69 @@ class DeployedApp(models.Model):
 
     def __str__(self):
         return f"App {self.id} (Owner: {self.owner.username})"
+
+
+def adjust_app_counters(previous, current):
+    """
+    Apply the counter change for one app moving between (owner_id, active) states.
+
+    Args:
+        previous (Optional[Tuple[str, bool]]): State before the write, None on insert.
+        current (Optional[Tuple[str, bool]]): State after the write, None on delete.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for state, sign in ((previous, -1), (current, 1)):
+        if state is None:
+            continue
+        owner_id, active = state
+        deltas[owner_id][0] += sign
+        if active:
+            deltas[owner_id][1] += sign
+    for owner_id, (total, active) in deltas.items():
+        if total or active:
+            User.objects.filter(id=owner_id).update(
+                app_count=F("app_count") + total,
+                active_app_count=F("active_app_count") + active,
+            )
+
+
+def refresh_app_counters(user_ids=None):
+    """
+    Recompute counter columns from the apps table in one UPDATE.
+
+    Use this after bulk writes that bypass DeployedApp.save(), such as
+    queryset.update() or bulk_create(), and after enabling
+    ``GRAPHQL_APP_COUNTERS``, since the columns are not maintained without it.
+
+    Args:
+        user_ids (Optional[Iterable[str]]): Users to recount; all users if None.
+    """
+    users = User.objects.all() if user_ids is None else User.objects.filter(id__in=user_ids)
+    counts = app_counts(OuterRef("pk"))
+    users.update(
+        app_count=Coalesce(Subquery(counts.values("app_count")), 0),
+        active_app_count=Coalesce(Subquery(counts.values("active_app_count")), 0),
+    )
+
+
+def app_counts(owner_ids):
+    """
+    Return a GROUP BY owner_id queryset of total and active app counts.
+
+    Args:
+        owner_ids: Owner ids, or an OuterRef to correlate with a User subquery.
+    Returns:
+        QuerySet: Rows with owner_id, app_count and active_app_count.
+    """
+    if isinstance(owner_ids, OuterRef):
+        apps = DeployedApp.objects.filter(owner_id=owner_ids)
+    else:
+        apps = DeployedApp.objects.filter(owner_id__in=owner_ids)
+    return (
+        apps.values("owner_id")
+        .annotate(
+            app_count=Count("pk"),
+            active_app_count=Count("pk", filter=Q(active=True)),
+        )
+        .order_by()
+    )
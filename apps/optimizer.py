@@ -0,0 +1,198 @@
+from typing import Any, List, NamedTuple, Set, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    get_named_type,
+    is_abstract_type,
+)
+from apps.complexity import is_connection_type, is_edge_type
+
+PAGINATION_ARGUMENTS = {"first", "last", "after", "before", "offset"}
+
+
+class QueryPlan(NamedTuple):
+    """
+    ORM loading plan for one model in a selection set.
+
+    Fields:
+        model (Type[Model]): The model being loaded.
+        only (Set[str]): Concrete columns the selection reads.
+        select (List[Tuple[str, QueryPlan]]): Forward relations to join.
+        prefetch (List[Tuple[str, QueryPlan]]): Reverse relations to prefetch.
+    """
+
+    model: Any
+    only: Set[str]
+    select: List[Tuple[str, "QueryPlan"]]
+    prefetch: List[Tuple[str, "QueryPlan"]]
+
+
+class QueryOptimizer:
+    """
+    Derive only()/select_related()/prefetch_related() from a resolver's selection set.
+
+    The optimizer follows fragment spreads and inline fragments, unwraps Relay
+    connections to their node selection, joins forward foreign keys that are
+    selected and prefetches selected reverse relations with their own
+    column-limited querysets.
+    """
+
+    def __init__(self, info):
+        self.schema = info.schema
+        self.fragments = info.fragments
+
+    def optimize(self, queryset, field_nodes, return_type, always=()):
+        graphql_type, selection_sets = self._unwrap_connection(
+            get_named_type(return_type),
+            [node.selection_set for node in field_nodes if node.selection_set],
+        )
+        plan = self.plan(queryset.model, graphql_type, selection_sets)
+        plan.only.update(always)
+        return self.apply(queryset, plan)
+
+    def plan(self, model, graphql_type, selection_sets) -> QueryPlan:
+        """
+        Build the loading plan for ``model`` from the selections on ``graphql_type``.
+        """
+        plan = QueryPlan(model, {model._meta.pk.name}, [], [])
+        fields = self._collect_fields(graphql_type, selection_sets)
+        for name, nodes in fields.items():
+            field_def = graphql_type.fields.get(name)
+            model_field = self._get_model_field(model, name)
+            if field_def is None or model_field is None:
+                continue
+
+            if not model_field.is_relation:
+                plan.only.add(model_field.attname)
+                continue
+
+            child_type, child_sets = self._unwrap_connection(
+                get_named_type(field_def.type),
+                [node.selection_set for node in nodes if node.selection_set],
+            )
+            if model_field.concrete and (
+                model_field.many_to_one or model_field.one_to_one
+            ):
+                plan.only.add(model_field.name)
+                if child_sets:
+                    child = self.plan(model_field.related_model, child_type, child_sets)
+                    plan.select.append((model_field.name, child))
+            elif model_field.one_to_many and self._only_pages(nodes):
+                child = self.plan(model_field.related_model, child_type, child_sets)
+                # Reason: prefetch_related matches rows back to parents by the FK column.
+                child.only.add(model_field.field.name)
+                plan.prefetch.append((model_field.get_accessor_name(), child))
+        return plan
+
+    def apply(self, queryset, plan: QueryPlan):
+        only, select, prefetch = self._flatten(plan, "")
+        queryset = queryset.only(*sorted(only))
+        if select:
+            queryset = queryset.select_related(*select)
+        for lookup, child in prefetch:
+            child_queryset = self.apply(child.model.objects.all(), child)
+            queryset = queryset.prefetch_related(
+                Prefetch(lookup, queryset=child_queryset)
+            )
+        return queryset
+
+    def _flatten(self, plan: QueryPlan, prefix: str):
+        only = {prefix + name for name in plan.only}
+        select = []
+        prefetch = []
+        for relation, child in plan.select:
+            select.append(prefix + relation)
+            child_only, child_select, child_prefetch = self._flatten(
+                child, f"{prefix}{relation}__"
+            )
+            only |= child_only
+            select.extend(child_select)
+            prefetch.extend(child_prefetch)
+        for accessor, child in plan.prefetch:
+            prefetch.append((prefix + accessor, child))
+        return only, select, prefetch
+
+    @staticmethod
+    def _only_pages(nodes) -> bool:
+        # Reason: filtering arguments change the rows, so those fields keep their own loader.
+        return all(
+            argument.name.value in PAGINATION_ARGUMENTS
+            for node in nodes
+            for argument in node.arguments
+        )
+
+    def _collect_fields(self, graphql_type, selection_sets):
+        fields = {}
+        for selection_set in selection_sets:
+            self._collect_into(fields, graphql_type, selection_set, set())
+        return fields
+
+    def _collect_into(self, fields, graphql_type, selection_set, visited):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                if self._applies(selection.type_condition, graphql_type):
+                    self._collect_into(
+                        fields, graphql_type, selection.selection_set, visited
+                    )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if name in visited or fragment is None:
+                    continue
+                if self._applies(fragment.type_condition, graphql_type):
+                    self._collect_into(
+                        fields, graphql_type, fragment.selection_set, visited | {name}
+                    )
+
+    def _applies(self, type_condition, graphql_type) -> bool:
+        if type_condition is None:
+            return True
+        condition = self.schema.get_type(type_condition.name.value)
+        if condition is graphql_type:
+            return True
+        return is_abstract_type(condition) and self.schema.is_sub_type(
+            condition, graphql_type
+        )
+
+    def _unwrap_connection(self, graphql_type, selection_sets):
+        if not is_connection_type(graphql_type):
+            return graphql_type, selection_sets
+        edge_type = get_named_type(graphql_type.fields["edges"].type)
+        edges = self._collect_fields(graphql_type, selection_sets).get("edges", [])
+        edge_sets = [node.selection_set for node in edges if node.selection_set]
+        if not is_edge_type(edge_type):
+            return graphql_type, []
+        node_type = get_named_type(edge_type.fields["node"].type)
+        nodes = self._collect_fields(edge_type, edge_sets).get("node", [])
+        node_sets = [node.selection_set for node in nodes if node.selection_set]
+        return node_type, node_sets
+
+    @staticmethod
+    def _get_model_field(model, graphql_name):
+        try:
+            return model._meta.get_field(to_snake_case(graphql_name))
+        except FieldDoesNotExist:
+            return None
+
+
+def optimize_queryset(queryset, info, always=()):
+    """
+    Restrict columns and add joins/prefetches to a root queryset for ``info``.
+
+    Args:
+        queryset (QuerySet): Base queryset returned by a root resolver.
+        info: GraphQL resolve info for the field returning the queryset.
+        always (Iterable[str]): Columns to load regardless of the selection.
+    Returns:
+        QuerySet: The optimized queryset.
+    """
+    return QueryOptimizer(info).optimize(
+        queryset, info.field_nodes, info.return_type, always=always
+    )
@@ -0,0 +1,188 @@
+import asyncio
+import base64
+from datetime import datetime
+from functools import partial
+
+from django.db.models import Q
+from graphene import relay
+from graphene.relay.connection import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+KEYSET_FIELDS = ("created_at", "id")
+
+
+def encode_cursor(created_at: datetime, pk: str) -> str:
+    """
+    Encode a row's (created_at, id) sort key into an opaque cursor.
+
+    Args:
+        created_at (datetime): The row's creation timestamp.
+        pk (str): The row's primary key.
+    Returns:
+        str: URL-safe base64 cursor.
+    """
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode an opaque cursor back into its (created_at, id) sort key.
+
+    Args:
+        cursor (str): Cursor produced by encode_cursor.
+    Returns:
+        Tuple[datetime, str]: (created_at, id)
+    Raises:
+        GraphQLError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, pk = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), pk
+    except Exception:
+        raise GraphQLError("Invalid cursor.")
+
+
+def _seek(queryset, cursor: str, forward: bool):
+    created_at, pk = decode_cursor(cursor)
+    if forward:
+        return queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+    return queryset.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+    )
+
+
+class KeysetPage:
+    """
+    One page of a keyset (seek) paginated queryset ordered by (created_at, id).
+
+    The page is located with range predicates on the sort key instead of an
+    OFFSET, so fetching page 50,000 costs the same index seek as page 1.
+    """
+
+    def __init__(self, queryset, first=None, after=None, last=None, before=None):
+        if first is not None and first < 0:
+            raise GraphQLError("Argument `first` must be a non-negative integer.")
+        if last is not None and last < 0:
+            raise GraphQLError("Argument `last` must be a non-negative integer.")
+
+        if after:
+            queryset = _seek(queryset, after, forward=True)
+        if before:
+            queryset = _seek(queryset, before, forward=False)
+
+        self.first = first
+        self.last = last
+        self.after = after
+        self.before = before
+        # Reason: fetch one extra row to learn whether another page exists.
+        if first is not None:
+            self.backwards = False
+            self.queryset = queryset.order_by(*KEYSET_FIELDS)[: first + 1]
+        else:
+            self.backwards = True
+            descending = [f"-{field}" for field in KEYSET_FIELDS]
+            self.queryset = queryset.order_by(*descending)[: last + 1]
+
+    def build(self, connection_type, rows):
+        """
+        Turn the fetched rows into a Relay connection instance.
+        """
+        rows = list(rows)
+        if self.backwards:
+            has_more = len(rows) > self.last
+            rows = rows[: self.last][::-1]
+            has_next_page = bool(self.before)
+            has_previous_page = has_more
+        else:
+            has_more = len(rows) > self.first
+            rows = rows[: self.first]
+            if self.last is not None:
+                has_previous_page = len(rows) > self.last
+                rows = rows[len(rows) - self.last :] if self.last else []
+            else:
+                has_previous_page = bool(self.after)
+            has_next_page = has_more
+
+        return build_connection(connection_type, rows, has_previous_page, has_next_page)
+
+
+def build_connection(connection_type, rows, has_previous_page: bool, has_next_page: bool):
+    """
+    Wrap rows ordered by (created_at, id) in a Relay connection instance.
+    """
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(row.created_at, row.pk))
+        for row in rows
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
+
+
+class KeysetConnectionField(relay.ConnectionField):
+    """
+    Relay connection over a queryset, paginated by keyset on (created_at, id).
+
+    The field's resolver returns the base queryset; this field applies the
+    cursor predicates, ordering and page limit. ``first`` defaults to, and is
+    capped by, ``RELAY_CONNECTION_MAX_LIMIT``, except when the request streams
+    the connection through a ``ConnectionStream`` on the context.
+    """
+
+    def __init__(self, node_type, *args, **kwargs):
+        self.max_limit = kwargs.pop(
+            "max_limit", graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        )
+        super().__init__(node_type._meta.connection, *args, **kwargs)
+
+    @classmethod
+    def connection_resolver(
+        cls, resolver, connection_type, max_limit, root, info, **args
+    ):
+        stream = getattr(info.context, "connection_stream", None)
+        if stream is not None and stream.applies_to(info):
+            return stream.resolve(connection_type, resolver, root, info, args)
+
+        first, last = args.get("first"), args.get("last")
+        for name, value in (("first", first), ("last", last)):
+            if max_limit and value is not None and value > max_limit:
+                raise GraphQLError(
+                    f"Requesting {value} records on the `{info.field_name}` "
+                    f"connection exceeds the `{name}` limit of {max_limit} records."
+                )
+        if first is None and last is None:
+            first = max_limit
+
+        page = KeysetPage(
+            resolver(root, info, **args),
+            first=first,
+            after=args.get("after"),
+            last=last,
+            before=args.get("before"),
+        )
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return page.build(connection_type, page.queryset)
+
+        async def build_async():
+            rows = [row async for row in page.queryset]
+            return page.build(connection_type, rows)
+
+        return build_async()
+
+    def wrap_resolve(self, parent_resolver):
+        resolver = super(relay.ConnectionField, self).wrap_resolve(parent_resolver)
+        return partial(self.connection_resolver, resolver, self.type, self.max_limit)
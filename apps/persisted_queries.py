@@ -0,0 +1,121 @@
+import hashlib
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseBadRequest
+from graphene_django.views import HttpError
+from graphql import GraphQLError
+
+PERSISTED_QUERY_NOT_FOUND = "PERSISTED_QUERY_NOT_FOUND"
+PERSISTED_QUERY_NOT_SUPPORTED = "PERSISTED_QUERY_NOT_SUPPORTED"
+
+
+def get_persisted_query_settings() -> dict:
+    config = {
+        "ENABLED": True,
+        "CACHE_ALIAS": "default",
+        "TIMEOUT": 86400,
+        "KEY_PREFIX": "graphql",
+    }
+    config.update(getattr(settings, "GRAPHQL_PERSISTED_QUERIES", {}))
+    return config
+
+
+class PersistedQueryError(HttpError):
+    """
+    Request error answered with a GraphQL error carrying an ``extensions.code``.
+
+    Clients following the automatic persisted query protocol look for the
+    code: on ``PERSISTED_QUERY_NOT_FOUND`` they resend the hash together with
+    the full query.
+    """
+
+    def __init__(self, message: str, code: Optional[str] = None, status: int = 200):
+        super().__init__(HttpResponse(status=status), message)
+        self.formatted = GraphQLError(
+            message, extensions={"code": code} if code else None
+        ).formatted
+
+
+def persisted_query_hash(extensions) -> Optional[str]:
+    """
+    Return the SHA-256 hash a request sent in ``extensions.persistedQuery``.
+
+    Args:
+        extensions (Optional[Union[dict, str]]): The request's ``extensions``,
+            JSON-encoded when sent as a GET parameter.
+    Returns:
+        Optional[str]: Lowercase hex digest, or None if no hash was sent.
+    Raises:
+        HttpError: If ``extensions`` or the persisted query entry is malformed.
+    """
+    if not extensions:
+        return None
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+    persisted = extensions.get("persistedQuery") if isinstance(extensions, dict) else None
+    if persisted is None:
+        return None
+    if (
+        not isinstance(persisted, dict)
+        or persisted.get("version", 1) != 1
+        or not isinstance(persisted.get("sha256Hash"), str)
+    ):
+        raise HttpError(HttpResponseBadRequest("Unsupported persistedQuery extension."))
+    return persisted["sha256Hash"].lower()
+
+
+class PersistedQueryStore:
+    """
+    Documents registered by clients, keyed by the SHA-256 of their text.
+
+    Backed by a Django cache so every worker sharing the cache can answer a
+    hash registered through any of them. A worker that has not seen a hash
+    answers ``PERSISTED_QUERY_NOT_FOUND`` and the client registers it again.
+    """
+
+    def __init__(
+        self, alias: str = "default", timeout: Optional[int] = 86400, key_prefix: str = "graphql"
+    ):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, sha256: str) -> str:
+        return f"{self.key_prefix}:apq:{sha256}"
+
+    @staticmethod
+    def hash(query: str) -> str:
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    def get(self, sha256: str) -> Optional[str]:
+        return self.cache.get(self._key(sha256))
+
+    def add(self, sha256: str, query: str):
+        """
+        Register ``query`` under its hash, keeping an existing registration.
+        """
+        self.cache.add(self._key(sha256), query, self.timeout)
+
+
+def get_persisted_query_store() -> Optional[PersistedQueryStore]:
+    """
+    Return the configured store, or None when persisted queries are disabled.
+    """
+    config = get_persisted_query_settings()
+    if not config["ENABLED"]:
+        return None
+    return PersistedQueryStore(
+        alias=config["CACHE_ALIAS"],
+        timeout=config["TIMEOUT"],
+        key_prefix=config["KEY_PREFIX"],
+    )
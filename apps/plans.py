@@ -0,0 +1,104 @@
+from typing import Dict, Iterable
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from apps.dataloaders import invalidate_entities
+from apps.models import User
+from apps.replicas import record_write
+from apps.response_cache import invalidate_updated_rows
+from apps.subscriptions import publish_plan_changes
+
+CHANGED = "CHANGED"
+UNCHANGED = "UNCHANGED"
+NOT_FOUND = "NOT_FOUND"
+
+# Reason: stays well under SQLite's bound-parameter limit with room for the SET values.
+PLAN_CHANGE_CHUNK_SIZE = 500
+
+
+def change_plans(
+    user_ids: Iterable[str], plan: str, chunk_size: int = PLAN_CHANGE_CHUNK_SIZE
+) -> Dict[str, str]:
+    """
+    Move users to ``plan`` with one conditional UPDATE per chunk of ids.
+
+    Each chunk runs ``UPDATE ... SET plan = %s WHERE id IN (...) AND plan <> %s``,
+    so the check and the write are a single atomic statement and no row is
+    read first. Ids the update did not touch are looked up once per chunk to
+    tell users already on ``plan`` from ids that do not exist. Changed users
+    are announced to ``planChanged`` subscribers when the transaction commits.
+
+    Args:
+        user_ids (Iterable[str]): Database ids of the users to change.
+        plan (str): Target plan, one of ``User.PLAN_CHOICES``.
+        chunk_size (int): Maximum ids per statement.
+    Returns:
+        Dict[str, str]: ``CHANGED``, ``UNCHANGED`` or ``NOT_FOUND`` per id.
+    """
+    ids = list(dict.fromkeys(user_ids))
+    using = router.db_for_write(User)
+    results = {}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start : start + chunk_size]
+        changed = _update_plans(chunk, plan, using)
+        if changed:
+            record_write()
+            invalidate_entities(User, changed)
+            invalidate_updated_rows(User, changed)
+            publish_plan_changes(changed)
+        untouched = [pk for pk in chunk if pk not in changed]
+        existing = set()
+        if untouched:
+            existing = set(
+                User.objects.using(using)
+                .filter(id__in=untouched)
+                .values_list("id", flat=True)
+            )
+        for pk in chunk:
+            if pk in changed:
+                results[pk] = CHANGED
+            elif pk in existing:
+                results[pk] = UNCHANGED
+            else:
+                results[pk] = NOT_FOUND
+    return results
+
+
+def _update_plans(ids, plan, using):
+    """
+    Run the conditional update for one chunk and return the ids it changed.
+    """
+    connection = connections[using]
+    now = timezone.now()
+    # Reason: backends that can return columns from INSERT also support UPDATE ... RETURNING.
+    if connection.features.can_return_columns_from_insert:
+        meta = User._meta
+        qn = connection.ops.quote_name
+        id_column = qn(meta.pk.column)
+        plan_column = qn(meta.get_field("plan").column)
+        updated_field = meta.get_field("updated_at")
+        sql = (
+            f"UPDATE {qn(meta.db_table)} "
+            f"SET {plan_column} = %s, {qn(updated_field.column)} = %s "
+            f"WHERE {id_column} IN ({', '.join(['%s'] * len(ids))}) "
+            f"AND {plan_column} <> %s "
+            f"RETURNING {id_column}"
+        )
+        params = [
+            plan,
+            updated_field.get_db_prep_value(now, connection),
+            *ids,
+            plan,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return {row[0] for row in cursor.fetchall()}
+
+    with transaction.atomic(using=using):
+        queryset = User.objects.using(using).filter(id__in=ids).exclude(plan=plan)
+        changed = set(queryset.select_for_update().values_list("id", flat=True))
+        if changed:
+            User.objects.using(using).filter(id__in=changed).update(
+                plan=plan, updated_at=now
+            )
+        return changed
@@ -0,0 +1,193 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+
+class RoutingState:
+    """
+    Routing decisions for the request executing in the current context.
+
+    Attributes:
+        pinned (bool): Whether reads go to the primary.
+        wrote (bool): Whether anything was written to the primary, in which
+            case the client is pinned to it for ``STICKY_SECONDS``.
+    """
+
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+current_routing: ContextVar = ContextVar("graphql_routing", default=None)
+
+
+def get_replica_settings() -> dict:
+    config = {
+        "ALIASES": [],
+        "STICKY_SECONDS": 5.0,
+        "COOKIE": "graphql_primary_until",
+    }
+    config.update(getattr(settings, "GRAPHQL_REPLICAS", {}))
+    return config
+
+
+def replica_aliases() -> List[str]:
+    return [alias for alias in get_replica_settings()["ALIASES"] if alias in connections]
+
+
+def reads_primary() -> bool:
+    """
+    Whether reads in the current context must see the primary's latest writes.
+    """
+    state = current_routing.get()
+    return (
+        # Reason: the router only sends reads issued by a request to replicas.
+        state is None
+        or state.pinned
+        or not replica_aliases()
+        # Reason: reads inside a transaction must see its uncommitted writes.
+        or connections[PRIMARY].in_atomic_block
+    )
+
+
+def replica_lag() -> float:
+    """
+    Seconds a read in the current context may lag behind the primary.
+
+    Caches filled from replica reads refuse rows written within this window,
+    which could have been read before they reached the replica.
+    """
+    return 0.0 if reads_primary() else get_replica_settings()["STICKY_SECONDS"]
+
+
+def record_write():
+    """
+    Pin the current request to the primary after a write reached it.
+
+    Call this once the statement ran, not before, so requests whose writes
+    turn out to be no-ops keep reading from replicas.
+    """
+    state = current_routing.get()
+    if state is not None:
+        state.pinned = state.wrote = True
+
+
+@contextmanager
+def pin_primary(pinned: bool = True):
+    """
+    Send reads to the primary while the block runs, e.g. for a mutation.
+    """
+    if not pinned:
+        yield
+        return
+    state = current_routing.get()
+    if state is not None:
+        previous = state.pinned
+        state.pinned = True
+        try:
+            yield
+        finally:
+            # Reason: a write pins the rest of the request regardless of the block.
+            state.pinned = previous or state.wrote
+        return
+    token = current_routing.set(RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        current_routing.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending reads to replicas and writes to the primary.
+
+    Reads of ``apps`` models made while a request is routed go to a random
+    alias from ``GRAPHQL_REPLICAS["ALIASES"]`` unless the request is pinned
+    to the primary or a transaction is open on it; every other read is left
+    to the default database. A write recorded with ``record_write()`` pins
+    the rest of the request, and ``PrimaryStickinessMiddleware`` pins the
+    client's following requests for ``STICKY_SECONDS``, so clients read their
+    own writes while replicas catch up.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        # Reason: sessions, auth and admin tables are not replicated with the app data.
+        if model._meta.app_label != "apps" or current_routing.get() is None:
+            return None
+        if reads_primary():
+            return PRIMARY
+        return random.choice(replica_aliases())
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # Reason: replicas hold the same rows as the primary.
+        return True
+
+
+@sync_and_async_middleware
+def PrimaryStickinessMiddleware(get_response):
+    """
+    Pin clients that recently wrote to the primary.
+
+    A request carrying an unexpired stickiness cookie reads from the primary.
+    A response to a request that wrote sets the cookie to expire
+    ``STICKY_SECONDS`` from now.
+    """
+
+    def start(request) -> RoutingState:
+        config = get_replica_settings()
+        try:
+            pinned_until = float(request.COOKIES.get(config["COOKIE"], 0))
+        except ValueError:
+            pinned_until = 0.0
+        return RoutingState(pinned=pinned_until > time.time())
+
+    def finish(state: RoutingState, response):
+        if state.wrote:
+            config = get_replica_settings()
+            sticky = config["STICKY_SECONDS"]
+            response.set_cookie(
+                config["COOKIE"],
+                f"{time.time() + sticky:.3f}",
+                max_age=sticky,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            state = start(request)
+            token = current_routing.set(state)
+            try:
+                response = await get_response(request)
+            finally:
+                current_routing.reset(token)
+            return finish(state, response)
+
+    else:
+
+        def middleware(request):
+            state = start(request)
+            token = current_routing.set(state)
+            try:
+                response = get_response(request)
+            finally:
+                current_routing.reset(token)
+            return finish(state, response)
+
+    return middleware
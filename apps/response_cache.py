@@ -0,0 +1,348 @@
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Model
+from graphene.utils.str_converters import to_snake_case
+from graphql import get_named_type, get_nullable_type, is_list_type
+from apps.complexity import is_connection_type, is_edge_type
+from apps.optimizer import PAGINATION_ARGUMENTS
+
+
+def instance_tag(model, pk) -> str:
+    """
+    Tag for responses that read one row.
+    """
+    return f"{model._meta.label}:{pk}"
+
+
+def collection_tag(model) -> str:
+    """
+    Tag for responses that list rows of a model from the query root.
+    """
+    return model._meta.label
+
+
+def filtered_collection_tag(model) -> str:
+    """
+    Tag for responses that list rows of a model from the query root with
+    filtering arguments, whose membership can change on any update.
+    """
+    return f"{model._meta.label}:filtered"
+
+
+def filtered_tags_for_update(model):
+    """
+    Return the filtered-collection tags an update of ``model`` rows can affect.
+
+    Filters may follow a foreign key (``ownerPlan`` reads ``owner__plan``), so
+    the filtered lists of every model pointing at ``model`` are included.
+    """
+    tags = [filtered_collection_tag(model)]
+    for relation in model._meta.related_objects:
+        if relation.one_to_many:
+            tags.append(filtered_collection_tag(relation.related_model))
+    return tags
+
+
+def relation_tag(model, pk, accessor: str) -> str:
+    """
+    Tag for responses that list the rows related to one parent row.
+    """
+    return f"{model._meta.label}:{pk}:{accessor}"
+
+
+def tags_for_write(instance: Model, created: bool = False, deleted: bool = False):
+    """
+    Return the tags a saved or deleted row makes stale.
+
+    Every write touches the row itself, the reverse-relation lists of the
+    rows it points at and the filtered root lists that may include or exclude
+    it. Inserts and deletes also change the unfiltered root collections.
+
+    Args:
+        instance (Model): The written row.
+        created (bool): Whether the row was inserted.
+        deleted (bool): Whether the row was deleted.
+    Returns:
+        List[str]: Tags to invalidate.
+    """
+    model = type(instance)
+    tags = [instance_tag(model, instance.pk), *filtered_tags_for_update(model)]
+    if created or deleted:
+        tags.append(collection_tag(model))
+    for field in model._meta.concrete_fields:
+        if not field.many_to_one:
+            continue
+        parent_pk = getattr(instance, field.attname)
+        accessor = field.remote_field.get_accessor_name()
+        if parent_pk is not None and accessor:
+            tags.append(relation_tag(field.related_model, parent_pk, accessor))
+    return tags
+
+
+class ResponseCache:
+    """
+    Whole-response cache for query operations backed by a Django cache.
+
+    Each entry stores the encoded response together with the version of every
+    tag it read. A tag version is the time of the last write that touched it,
+    so invalidating a tag is a single cache write and stale entries are
+    detected on read instead of being searched for and deleted.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        timeout: int = 60,
+        key_prefix: str = "graphql",
+        etag_timeout: int = 86400,
+    ):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.etag_timeout = etag_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(
+        self, fingerprint: str, operation_name: Optional[str], variables, kind: str = "response"
+    ) -> str:
+        """
+        Build the cache key for one execution of a normalized document.
+
+        Args:
+            fingerprint (str): Hash of the normalized document.
+            operation_name (Optional[str]): Operation selected from the document.
+            variables (Optional[dict]): Variable values sent with the request.
+            kind (str): ``response`` for bodies, ``etag`` for entity tags.
+        Returns:
+            str: Cache key.
+        """
+        encoded = json.dumps(variables or {}, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(
+            f"{fingerprint}:{operation_name or ''}:{encoded}".encode()
+        ).hexdigest()
+        return f"{self.key_prefix}:{kind}:{digest}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}:tag:{tag}"
+
+    @staticmethod
+    def now() -> int:
+        return time.time_ns()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return a cached response body, or None if missing or invalidated.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        versions = entry["tags"]
+        if versions:
+            current = self.cache.get_many([self._tag_key(tag) for tag in versions])
+            for tag, version in versions.items():
+                # Reason: an evicted tag version may hide an invalidation, so it counts as stale.
+                if current.get(self._tag_key(tag)) != version:
+                    return None
+        return entry["body"]
+
+    def versions(self, tags: Iterable[str], started_at: int) -> Optional[Dict[str, int]]:
+        """
+        Return the current version of every tag a response read.
+
+        Tags never invalidated so far are given version ``started_at``.
+
+        Args:
+            tags (Iterable[str]): Tags the response read.
+            started_at (int): ``now()`` before execution began.
+        Returns:
+            Optional[Dict[str, int]]: Versions by tag, or None if any tag was
+            invalidated after ``started_at``, because the response may have
+            read rows from before the write.
+        """
+        tag_keys = {tag: self._tag_key(tag) for tag in tags}
+        current = self.cache.get_many(list(tag_keys.values()))
+        versions = {}
+        missing = {}
+        for tag, tag_key in tag_keys.items():
+            version = current.get(tag_key)
+            if version is None:
+                version = missing[tag_key] = started_at
+            elif version >= started_at:
+                return None
+            versions[tag] = version
+        if missing:
+            self.cache.set_many(missing, timeout=None)
+        return versions
+
+    def set(self, key: str, body: str, tags: Iterable[str], started_at: int):
+        """
+        Store a response body read under ``tags``.
+
+        Args:
+            key (str): Cache key from ``key()``.
+            body (str): Encoded response.
+            tags (Iterable[str]): Tags the response read.
+            started_at (int): ``now()`` before execution began; see ``versions()``.
+        """
+        versions = self.versions(tags, started_at)
+        if versions is not None:
+            self.cache.set(key, {"tags": versions, "body": body}, self.timeout)
+
+    def set_etag(self, key: str, tags: Iterable[str], started_at: int) -> Optional[str]:
+        """
+        Derive an entity tag from the versions of the tags a response read.
+
+        The ETag is stored under ``key`` with those versions, so ``get(key)``
+        returns it for as long as none of the rows involved is written.
+
+        Args:
+            key (str): Cache key from ``key(..., kind="etag")``.
+            tags (Iterable[str]): Tags the response read.
+            started_at (int): ``now()`` before execution began; see ``versions()``.
+        Returns:
+            Optional[str]: Quoted ETag, or None if a tag changed during execution.
+        """
+        versions = self.versions(tags, started_at)
+        if versions is None:
+            return None
+        encoded = json.dumps(versions, sort_keys=True, separators=(",", ":"))
+        etag = '"{}"'.format(hashlib.sha256(f"{key}:{encoded}".encode()).hexdigest()[:32])
+        self.cache.set(key, {"tags": versions, "body": etag}, self.etag_timeout)
+        return etag
+
+    def invalidate(self, tags: Iterable[str]):
+        """
+        Mark every entry that read any of ``tags`` as stale.
+        """
+        version = self.now()
+        self.cache.set_many(
+            {self._tag_key(tag): version for tag in tags}, timeout=None
+        )
+
+
+def _configured_cache(*features: str) -> Optional[ResponseCache]:
+    config = getattr(settings, "GRAPHQL_RESPONSE_CACHE", {})
+    if not any(config.get(feature, False) for feature in features):
+        return None
+    return ResponseCache(
+        alias=config.get("CACHE_ALIAS", "default"),
+        timeout=config.get("TIMEOUT", 60),
+        key_prefix=config.get("KEY_PREFIX", "graphql"),
+        etag_timeout=config.get("ETAG_TIMEOUT", 86400),
+    )
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the configured response cache, or None when it is disabled.
+
+    Returns:
+        Optional[ResponseCache]: Cache built from ``GRAPHQL_RESPONSE_CACHE``.
+    """
+    return _configured_cache("ENABLED")
+
+
+def get_etag_cache() -> Optional[ResponseCache]:
+    """
+    Return the cache of response ETags, or None unless ``ETAGS`` is set.
+    """
+    return _configured_cache("ETAGS")
+
+
+def invalidate_tags(tags):
+    """
+    Invalidate ``tags`` now and again when the surrounding transaction commits.
+
+    Repeating the invalidation on commit keeps a concurrent read that cached
+    the pre-commit rows in between from surviving the commit. Tag versions
+    are kept while either cached responses or ETags depend on them.
+    """
+    response_cache = _configured_cache("ENABLED", "ETAGS")
+    if response_cache is None:
+        return
+    tags = list(tags)
+    response_cache.invalidate(tags)
+    transaction.on_commit(lambda: response_cache.invalidate(tags))
+
+
+def invalidate_write(instance: Model, created: bool = False, deleted: bool = False):
+    """
+    Invalidate cached responses that read a saved or deleted row.
+    """
+    invalidate_tags(tags_for_write(instance, created=created, deleted=deleted))
+
+
+def invalidate_updated_rows(model, pks):
+    """
+    Invalidate cached responses that read rows changed by a queryset update.
+
+    Only use this for updates that leave foreign keys untouched; the tags of
+    related rows' lists are not invalidated.
+    """
+    tags = [instance_tag(model, pk) for pk in pks]
+    invalidate_tags([*tags, *filtered_tags_for_update(model)])
+
+
+class CacheTagMiddleware:
+    """
+    Graphene middleware recording the tags a response reads.
+
+    Every model row whose fields are resolved adds its instance tag. A list or
+    connection of model rows adds a collection tag when it is selected from the
+    query root (plus a filtered-collection tag when it has filtering
+    arguments), or a relation tag when it is selected from another row. Tags
+    are collected on ``info.context.response_cache_tags`` and the middleware
+    does nothing when that attribute is missing.
+    """
+
+    def __init__(self):
+        self._list_models = {}
+
+    def resolve(self, next, root, info, **args):
+        tags = getattr(info.context, "response_cache_tags", None)
+        if tags is not None:
+            if isinstance(root, Model):
+                tags.add(instance_tag(type(root), root.pk))
+            model = self._list_model(info)
+            if model is not None:
+                if isinstance(root, Model):
+                    tags.add(
+                        relation_tag(type(root), root.pk, to_snake_case(info.field_name))
+                    )
+                elif root is None:
+                    tags.add(collection_tag(model))
+                    if any(
+                        value is not None and name not in PAGINATION_ARGUMENTS
+                        for name, value in args.items()
+                    ):
+                        tags.add(filtered_collection_tag(model))
+        return next(root, info, **args)
+
+    def _list_model(self, info):
+        key = (info.parent_type.name, info.field_name)
+        if key not in self._list_models:
+            self._list_models[key] = self._find_list_model(info.return_type)
+        return self._list_models[key]
+
+    @staticmethod
+    def _find_list_model(return_type):
+        nullable = get_nullable_type(return_type)
+        named = get_named_type(return_type)
+        if is_connection_type(named):
+            edge_type = get_named_type(named.fields["edges"].type)
+            if not is_edge_type(edge_type):
+                return None
+            named = get_named_type(edge_type.fields["node"].type)
+        elif not is_list_type(nullable):
+            return None
+        meta = getattr(getattr(named, "graphene_type", None), "_meta", None)
+        return getattr(meta, "model", None)
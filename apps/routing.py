@@ -0,0 +1,6 @@
+from django.urls import path
+from apps.consumers import GraphQLSubscriptionConsumer
+
+websocket_urlpatterns = [
+    path("graphql/", GraphQLSubscriptionConsumer.as_asgi()),
+]
@@ -1,12 +1,84 @@
+import inspect
+import time
+from collections import defaultdict
+from functools import lru_cache
 import graphene
 from graphene import relay
-from graphene_django import DjangoObjectType
-from apps.models import User, DeployedApp
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType, DjangoConnectionField
+from apps.models import User, DeployedApp, app_counters_enabled
 from graphql import GraphQLError
-import base64
-from graphene_django.views import GraphQLView
+import binascii
+from typing import Dict, List, Optional, Tuple
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    FieldNode,
+    OperationType,
+    execute,
+    get_operation_ast,
+    parse,
+    print_ast,
+)
+from graphql.validation import validate
 from django.conf import settings
-from apps.dataloaders import UserLoader, AppLoader, UserAppsLoader
+from django.db import connection, transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import parse_etags
+from django.http.response import HttpResponseBadRequest
+from apps.batching import ResolvedOperation, encode_batch, operation_request, parse_batch
+from apps.dataloaders import (
+    Deferred,
+    LoaderRegistry,
+    UserLoader,
+    AppLoader,
+    UserAppsLoader,
+    FilteredUserAppsLoader,
+    AppCountsLoader,
+    get_loader,
+)
+from apps.filters import app_filter_arguments, filter_apps, get_app_filters
+from apps.compiler import CompiledDeferredExecutionContext, compile_plan
+from apps.complexity import QueryCostAnalyzer
+from apps.document_cache import CachedDocument, DocumentCache
+from apps.execution import DeferredExecutionContext, Schema
+from apps.introspection import IntrospectionCache, is_introspection
+from apps.metrics import MetricsMiddleware, metrics_enabled, record_operation, register_cache
+from apps.optimizer import optimize_queryset
+from apps.pagination import KEYSET_FIELDS, KeysetConnectionField
+from apps.plans import CHANGED, NOT_FOUND, UNCHANGED, change_plans
+from apps.replicas import current_routing, pin_primary, replica_lag
+from apps.persisted_queries import (
+    PERSISTED_QUERY_NOT_FOUND,
+    PERSISTED_QUERY_NOT_SUPPORTED,
+    PersistedQueryError,
+    get_persisted_query_store,
+    persisted_query_hash,
+)
+from apps.response_cache import CacheTagMiddleware, get_etag_cache, get_response_cache
+from apps.streaming import STREAM_CONTENT_TYPE, ConnectionStream
+from apps.tracing import (
+    TracingMiddleware,
+    activate,
+    report_trace,
+    sample_trace,
+    trace_requested,
+)
+
+
+# Largest userIds list accepted by the bulk plan mutations.
+MAX_BULK_PLAN_CHANGE = 10000
+
+# Largest ids list accepted by the nodes root field.
+MAX_NODE_IDS = 500
 
 
 # Utility functions for encoding/decoding custom IDs
@@ -21,7 +93,22 @@ def encode_relay_id(type_name: str, db_id: str) -> str:
         str: Base64-encoded global ID.
     """
     raw = f"{type_name}:{db_id}"
-    return base64.b64encode(raw.encode()).decode()
+    return binascii.b2a_base64(raw.encode(), newline=False).decode("ascii")
+
+
+def encode_relay_ids(type_name: str, db_ids) -> List[str]:
+    """
+    Encode many database IDs of one type into Relay global IDs.
+
+    Args:
+        type_name (str): The GraphQL type name.
+        db_ids (Iterable[str]): The database IDs.
+    Returns:
+        List[str]: Base64-encoded global IDs in input order.
+    """
+    prefix = f"{type_name}:".encode()
+    b2a = binascii.b2a_base64
+    return [b2a(prefix + db_id.encode(), newline=False).decode("ascii") for db_id in db_ids]
 
 
 def decode_relay_id(global_id: str):
@@ -35,12 +122,61 @@ def decode_relay_id(global_id: str):
     Raises:
         GraphQLError: If the ID format is invalid.
     """
-    try:
-        decoded = base64.b64decode(global_id).decode()
-        type_name, db_id = decoded.split(":", 1)
-        return type_name, db_id
-    except Exception:
+    decoded = decode_relay_ids([global_id])[0]
+    if decoded is None:
         raise GraphQLError("Invalid global ID format.")
+    return decoded
+
+
+def decode_relay_ids(global_ids) -> List[Optional[Tuple[str, str]]]:
+    """
+    Decode many Relay global IDs in one pass.
+
+    Malformed IDs decode to None instead of raising, so one bad ID does not
+    cost the rest of the batch.
+
+    Args:
+        global_ids (Iterable[str]): The Relay global IDs.
+    Returns:
+        List[Optional[Tuple[str, str]]]: (type_name, db_id) per ID, in input order.
+    """
+    a2b = binascii.a2b_base64
+    decoded = []
+    for global_id in global_ids:
+        try:
+            type_name, sep, db_id = a2b(global_id).decode().partition(":")
+        except (binascii.Error, TypeError, ValueError):
+            decoded.append(None)
+            continue
+        decoded.append((type_name, db_id) if sep else None)
+    return decoded
+
+
+class BatchedConnectionField(DjangoConnectionField):
+    """
+    DjangoConnectionField whose resolver may return a Deferred or awaitable list.
+
+    The connection is sliced once the loader batch holding the list resolves.
+    """
+
+    @classmethod
+    def connection_resolver(cls, resolver, *args, **kwargs):
+        root, info = args[-2:]
+        iterable = resolver(root, info, **kwargs)
+        parent = super(BatchedConnectionField, cls).connection_resolver
+
+        def build(items):
+            return parent(lambda *_args, **_kwargs: items, *args, **kwargs)
+
+        if isinstance(iterable, Deferred):
+            return iterable.then(build)
+        if inspect.isawaitable(iterable):
+
+            async def build_async():
+                return build(await iterable)
+
+            return build_async()
+        return build(iterable)
 
 
 class UserNode(DjangoObjectType):
@@ -54,19 +190,70 @@ class UserNode(DjangoObjectType):
         interfaces = (relay.Node,)
         fields = ("id", "username", "plan", "created_at", "updated_at", "apps")
 
-    def resolve_apps(self, info):
+    apps = BatchedConnectionField(
+        lambda: DeployedAppNode, **app_filter_arguments(lambda: UserPlan)
+    )
+    app_count = graphene.Int(required=True, description="Number of apps the user owns.")
+    active_app_count = graphene.Int(
+        required=True, description="Number of active apps the user owns."
+    )
+
+    @classmethod
+    def get_node(cls, info, id):
+        return get_loader(info, UserLoader).load(id)
+
+    def resolve_apps(self, info, **kwargs):
         """
         Batch-load all apps for this user using UserAppsLoader to prevent N+1 queries.
 
+        Filtered selections go through FilteredUserAppsLoader, which applies
+        the filters in SQL for every user on the page at once.
+
         Args:
             info: GraphQL resolve info context.
+            **kwargs: Connection and filter arguments.
 
         Returns:
-            List[DeployedApp]: List of apps owned by this user.
+            Deferred[List[DeployedApp]]: List of apps owned by this user.
         """
-        loader = UserAppsLoader()
-        # Reason: Efficiently batch loads all apps for a set of users in one query.
-        return loader.load_many([self.id])[0]
+        filters = get_app_filters(kwargs)
+        if filters:
+            key = (self.id, tuple(sorted(filters.items())))
+            return get_loader(info, FilteredUserAppsLoader).load(key)
+        if "apps" in getattr(self, "_prefetched_objects_cache", {}):
+            return list(self.apps.all())
+        # Reason: every user on the page queues its id; one owner_id__in query serves them all.
+        return get_loader(info, UserAppsLoader).load(self.id)
+
+    def resolve_app_count(self, info):
+        return resolve_app_aggregate(self, info, "app_count")
+
+    def resolve_active_app_count(self, info):
+        return resolve_app_aggregate(self, info, "active_app_count")
+
+
+def resolve_app_aggregate(user: User, info, field: str):
+    """
+    Resolve a per-user app aggregate.
+
+    With ``GRAPHQL_APP_COUNTERS`` enabled the maintained counter column is
+    read from the row. Otherwise the value comes from AppCountsLoader, which
+    counts apps for every user on the page with one GROUP BY query.
+
+    Args:
+        user (User): The user being resolved.
+        info: GraphQL resolve info context.
+        field (str): ``"app_count"`` or ``"active_app_count"``.
+    Returns:
+        Union[int, Deferred[int]]: The aggregate.
+    """
+    if app_counters_enabled():
+        return getattr(user, field)
+    return get_loader(info, AppCountsLoader).load((user.id, field))
+
+
+# Reason: reuse the enum graphene-django generated for User.plan so the filter accepts the same values.
+UserPlan = UserNode._meta.fields["plan"].type.of_type
 
 
 class DeployedAppNode(DjangoObjectType):
@@ -80,6 +267,21 @@ class DeployedAppNode(DjangoObjectType):
         interfaces = (relay.Node,)
         fields = ("id", "active", "owner", "created_at", "updated_at")
 
+    @classmethod
+    def get_node(cls, info, id):
+        return get_loader(info, AppLoader).load(id)
+
+    def resolve_owner(self, info):
+        if DeployedApp.owner.is_cached(self):
+            return self.owner
+        return get_loader(info, UserLoader).load(self.owner_id)
+
+
+NODE_LOADERS = {
+    "UserNode": UserLoader,
+    "DeployedAppNode": AppLoader,
+}
+
 
 class Query(graphene.ObjectType):
     """
@@ -90,14 +292,45 @@ class Query(graphene.ObjectType):
     node = relay.Node.Field(
         description="Relay Node interface for fetching any object by global ID."
     )
-    all_users = graphene.List(UserNode, description="List all users in the system.")
-    all_apps = graphene.List(DeployedAppNode, description="List all deployed applications.")
+    nodes = graphene.List(
+        relay.Node,
+        required=True,
+        ids=graphene.List(graphene.NonNull(graphene.ID), required=True),
+        description="Fetch many objects by global ID, in input order, with null for misses.",
+    )
+    all_users = KeysetConnectionField(
+        UserNode, description="Page through all users in the system."
+    )
+    all_apps = KeysetConnectionField(
+        DeployedAppNode,
+        description="Page through all deployed applications.",
+        **app_filter_arguments(lambda: UserPlan),
+    )
+
+    def resolve_all_users(root, info, **kwargs):
+        return optimize_queryset(User.objects.all(), info, always=KEYSET_FIELDS)
 
-    def resolve_all_users(root, info):
-        return User.objects.all()
+    def resolve_all_apps(root, info, **kwargs):
+        queryset = optimize_queryset(
+            DeployedApp.objects.all(), info, always=KEYSET_FIELDS
+        )
+        return filter_apps(queryset, **get_app_filters(kwargs))
 
-    def resolve_all_apps(root, info):
-        return DeployedApp.objects.all()
+    def resolve_nodes(root, info, ids):
+        if len(ids) > MAX_NODE_IDS:
+            raise GraphQLError(f"At most {MAX_NODE_IDS} IDs can be fetched at once.")
+        groups = defaultdict(list)
+        for position, decoded in enumerate(decode_relay_ids(ids)):
+            if decoded is not None and decoded[0] in NODE_LOADERS:
+                groups[decoded[0]].append((position, decoded[1]))
+
+        results = [None] * len(ids)
+        for type_name, members in groups.items():
+            # Reason: one loader per type queues the whole group into a single id__in batch.
+            loader = get_loader(info, NODE_LOADERS[type_name])
+            for position, db_id in members:
+                results[position] = loader.load(db_id)
+        return results
 
     def resolve_node(self, info, id):
         try:
@@ -113,8 +346,35 @@ class Query(graphene.ObjectType):
 
     def resolve_user_apps(self, info, **kwargs):
         user_ids = kwargs.get("user_ids", [])
-        loader = UserAppsLoader()
-        return loader.load_many(user_ids)
+        loader = get_loader(info, UserAppsLoader)
+        return Deferred.all(loader.load(user_id) for user_id in user_ids)
+
+
+def change_user_plan(info, user_id: str, plan: str):
+    """
+    Move one user to ``plan`` with a single conditional UPDATE.
+
+    Args:
+        info: GraphQL resolve info of the mutation.
+        user_id (str): Relay global ID of the user.
+        plan (str): Target plan.
+    Returns:
+        Deferred: The updated user, loaded after the write.
+    Raises:
+        GraphQLError: If the ID is invalid, the user does not exist or is
+            already on ``plan``.
+    """
+    type_name, db_id = decode_relay_id(user_id)
+    if type_name != "UserNode":
+        raise GraphQLError("Invalid user ID type.")
+    status = change_plans([db_id], plan)[db_id]
+    if status == NOT_FOUND:
+        raise GraphQLError("User not found.")
+    if status == UNCHANGED:
+        raise GraphQLError(f"User is already {plan}.")
+    loader = get_loader(info, UserLoader)
+    loader.clear(db_id)
+    return loader.load(db_id)
 
 
 class UpgradeAccount(graphene.Mutation):
@@ -130,17 +390,7 @@ class UpgradeAccount(graphene.Mutation):
     ok = graphene.Boolean()
 
     def mutate(self, info, user_id):
-        type_name, db_id = decode_relay_id(user_id)
-        if type_name != "UserNode":
-            raise GraphQLError("Invalid user ID type.")
-        user = User.objects.filter(id=db_id).first()
-        if not user:
-            raise GraphQLError("User not found.")
-        if user.plan == "PRO":
-            raise GraphQLError("User is already PRO.")
-        user.plan = "PRO"
-        user.save()
-        return UpgradeAccount(user=user, ok=True)
+        return UpgradeAccount(user=change_user_plan(info, user_id, "PRO"), ok=True)
 
 
 class DowngradeAccount(graphene.Mutation):
@@ -156,17 +406,99 @@ class DowngradeAccount(graphene.Mutation):
     ok = graphene.Boolean()
 
     def mutate(self, info, user_id):
-        type_name, db_id = decode_relay_id(user_id)
-        if type_name != "UserNode":
-            raise GraphQLError("Invalid user ID type.")
-        user = User.objects.filter(id=db_id).first()
-        if not user:
-            raise GraphQLError("User not found.")
-        if user.plan == "HOBBY":
-            raise GraphQLError("User is already HOBBY.")
-        user.plan = "HOBBY"
-        user.save()
-        return DowngradeAccount(user=user, ok=True)
+        return DowngradeAccount(user=change_user_plan(info, user_id, "HOBBY"), ok=True)
+
+
+class PlanChangeStatus(graphene.Enum):
+    CHANGED = CHANGED
+    UNCHANGED = UNCHANGED
+    NOT_FOUND = NOT_FOUND
+    INVALID_ID = "INVALID_ID"
+
+
+class PlanChangeResult(graphene.ObjectType):
+    """
+    Outcome of a bulk plan change for one requested user ID.
+    """
+
+    user_id = graphene.ID(required=True)
+    status = graphene.Field(PlanChangeStatus, required=True)
+    ok = graphene.Boolean(required=True)
+    user = graphene.Field(lambda: UserNode)
+
+    def resolve_user(self, info):
+        if self.status == "INVALID_ID":
+            return None
+        _, db_id = decode_relay_id(self.user_id)
+        return get_loader(info, UserLoader).load(db_id)
+
+
+class BulkPlanChange(graphene.Mutation):
+    """
+    Base for mutations that move many users to one plan.
+
+    Subclasses set ``plan``. IDs that are malformed, missing or already on the
+    plan are reported per ID instead of failing the whole mutation.
+    """
+
+    class Meta:
+        abstract = True
+
+    results = graphene.List(graphene.NonNull(PlanChangeResult), required=True)
+    changed_count = graphene.Int(required=True)
+
+    plan = None
+
+    @classmethod
+    def mutate(cls, root, info, user_ids):
+        if len(user_ids) > MAX_BULK_PLAN_CHANGE:
+            raise GraphQLError(
+                f"At most {MAX_BULK_PLAN_CHANGE} user IDs can be changed at once."
+            )
+        db_ids = {}
+        for user_id in user_ids:
+            try:
+                type_name, db_id = decode_relay_id(user_id)
+            except GraphQLError:
+                continue
+            if type_name == "UserNode":
+                db_ids[user_id] = db_id
+
+        statuses = change_plans(db_ids.values(), cls.plan)
+        loader = get_loader(info, UserLoader)
+        results = []
+        for user_id in user_ids:
+            db_id = db_ids.get(user_id)
+            status = statuses[db_id] if db_id is not None else "INVALID_ID"
+            if status == CHANGED:
+                loader.clear(db_id)
+            results.append(
+                PlanChangeResult(user_id=user_id, status=status, ok=status == CHANGED)
+            )
+        changed_count = sum(1 for status in statuses.values() if status == CHANGED)
+        return cls(results=results, changed_count=changed_count)
+
+
+class UpgradeAccounts(BulkPlanChange):
+    """
+    Mutation to upgrade many users to PRO in chunked single-statement updates.
+    """
+
+    class Arguments:
+        user_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    plan = "PRO"
+
+
+class DowngradeAccounts(BulkPlanChange):
+    """
+    Mutation to downgrade many users to HOBBY in chunked single-statement updates.
+    """
+
+    class Arguments:
+        user_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    plan = "HOBBY"
 
 
 class Mutation(graphene.ObjectType):
@@ -177,25 +509,847 @@ class Mutation(graphene.ObjectType):
 
     upgrade_account = UpgradeAccount.Field(description="Upgrade a user's plan to PRO.")
     downgrade_account = DowngradeAccount.Field(description="Downgrade a user's plan to HOBBY.")
+    upgrade_accounts = UpgradeAccounts.Field(description="Upgrade many users' plans to PRO.")
+    downgrade_accounts = DowngradeAccounts.Field(
+        description="Downgrade many users' plans to HOBBY."
+    )
 
 
-# Add a custom GraphQLView with a simple query complexity limit
+class Subscription(graphene.ObjectType):
+    """
+    Root GraphQL subscription object, served over the websocket endpoint.
+    Each event resolves with the changed row as the root value.
+    """
+
+    plan_changed = graphene.Field(
+        UserNode,
+        user_id=graphene.ID(required=True),
+        description="Emit the user whenever their plan changes.",
+    )
+    app_changed = graphene.Field(
+        DeployedAppNode,
+        owner_id=graphene.ID(required=True),
+        description="Emit an app whenever one owned by the user is created or saved.",
+    )
+
+    def resolve_plan_changed(root, info, user_id):
+        return root
+
+    def resolve_app_changed(root, info, owner_id):
+        return root
+
+
+@lru_cache(maxsize=None)
+def list_size_limits(graphql_schema) -> Dict[str, int]:
+    """
+    Most items each capped list field can return, keyed by ``"Type.field"``.
+
+    Connection fields return at most their ``max_limit`` and ``nodes`` at most
+    ``MAX_NODE_IDS``, so a size the cost analysis cannot read is priced at the
+    field's real cap.
+    """
+    limits = {f"{graphql_schema.query_type.name}.nodes": MAX_NODE_IDS}
+    for graphql_type in graphql_schema.type_map.values():
+        graphene_type = getattr(graphql_type, "graphene_type", None)
+        fields = getattr(getattr(graphene_type, "_meta", None), "fields", None) or {}
+        for name, field in fields.items():
+            max_limit = getattr(field, "max_limit", None)
+            if max_limit:
+                field_name = getattr(field, "name", None) or to_camel_case(name)
+                limits[f"{graphql_type.name}.{field_name}"] = max_limit
+    return limits
+
+
+# Add a custom GraphQLView with cost-based query complexity and depth limits
 class LimitedComplexityGraphQLView(GraphQLView):
-    def execute_graphql_request(self, *args, **kwargs):
-        document = args[0]
-        # Simple limit: max 10 fields per query
-        if document and hasattr(document, "definitions"):
-            field_count = 0
-            for op in document.definitions:
-                if hasattr(op, "selection_set") and op.selection_set:
-                    field_count += len(op.selection_set.selections)
-            if field_count > 10:
-                from graphql import GraphQLError
-
-                return None, [
-                    GraphQLError("Query too complex: too many fields requested.")
-                ]
-        return super().execute_graphql_request(*args, **kwargs)
+    execution_context_class = DeferredExecutionContext
+    compiled_execution_context_class = CompiledDeferredExecutionContext
+
+    # Reason: as_view() builds a view instance per request, so the cache lives on the class.
+    document_cache = DocumentCache(getattr(settings, "GRAPHQL_DOCUMENT_CACHE_SIZE", 512))
+    introspection_cache = IntrospectionCache()
+    cache_tag_middleware = CacheTagMiddleware()
+    tracing_middleware = TracingMiddleware()
+    metrics_middleware = MetricsMiddleware()
+
+    def get_complexity_settings(self) -> dict:
+        complexity = {
+            "MAX_COST": 50000,
+            "MAX_DEPTH": 10,
+            "DEFAULT_LIST_SIZE": graphene_settings.RELAY_CONNECTION_MAX_LIMIT,
+            "FIELD_COSTS": {},
+        }
+        complexity.update(getattr(settings, "GRAPHQL_COMPLEXITY", {}))
+        return complexity
+
+    def measure_complexity(self, document, variables=None, row_limits=None):
+        """
+        Estimate the cost and depth of every operation in a validated document.
+
+        Args:
+            document (DocumentNode): The validated document.
+            variables (Optional[dict]): Request variables; without them, list
+                sizes given by variables are priced at the field's cap.
+            row_limits (Optional[Dict[str, int]]): Rows fields return at most
+                in this request, by ``"Type.field"``, overriding their caps.
+        Returns:
+            Dict[Optional[str], QueryCost]: Costs keyed by operation name.
+        """
+        complexity = self.get_complexity_settings()
+        analyzer = QueryCostAnalyzer(
+            self.schema.graphql_schema,
+            field_costs=complexity["FIELD_COSTS"],
+            default_list_size=complexity["DEFAULT_LIST_SIZE"],
+            list_sizes=list_size_limits(self.schema.graphql_schema),
+        )
+        return analyzer.analyze(document, variables, row_limits)
+
+    def get_document(self, query: str) -> CachedDocument:
+        """
+        Parse, validate and measure a query, reusing the result for repeated text.
+
+        Args:
+            query (str): GraphQL document source.
+        Returns:
+            CachedDocument: Parsed AST, validation errors and complexity.
+        Raises:
+            GraphQLError: If the query cannot be parsed.
+        """
+        key = self.document_cache.key(query)
+        entry = self.document_cache.get(key)
+        if entry is None:
+            document = parse(query)
+            validation_errors = validate(
+                self.schema.graphql_schema,
+                document,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+            complexity = {} if validation_errors else self.measure_complexity(document)
+            fingerprint = self.document_cache.key(print_ast(document))
+            entry = CachedDocument(document, validation_errors, complexity, fingerprint, {})
+            self.document_cache.put(key, entry)
+        return entry
+
+    def get_execution_plan(self, entry: CachedDocument, operation_ast):
+        """
+        Return the compiled plan of an operation, compiling it on first use.
+
+        Plans live on the document cache entry, so only documents the cache
+        keeps, the ones clients keep sending, hold a plan.
+
+        Returns:
+            Optional[ExecutionPlan]: None when ``GRAPHQL_COMPILED_PLANS`` is off
+            or the operation needs the standard executor.
+        """
+        if (
+            not getattr(settings, "GRAPHQL_COMPILED_PLANS", False)
+            or entry.plans is None
+            or operation_ast is None
+        ):
+            return None
+        name = operation_ast.name.value if operation_ast.name else None
+        if name not in entry.plans:
+            # Reason: concurrent first requests may both compile; either plan is fine.
+            entry.plans[name] = compile_plan(
+                self.schema.graphql_schema, entry.document, operation_ast
+            )
+        return entry.plans[name]
+
+    def get_query_cost(
+        self, entry: CachedDocument, operation_ast, variables=None, row_limits=None
+    ):
+        """
+        Return an operation's cost, priced with the request's variables when
+        a list size depends on them and with ``row_limits`` when given.
+        """
+        if operation_ast is None:
+            return None
+        name = operation_ast.name.value if operation_ast.name else None
+        cost = entry.complexity.get(name)
+        if cost is not None and (row_limits or (cost.uses_variables and variables)):
+            cost = self.measure_complexity(entry.document, variables, row_limits)[name]
+        return cost
+
+    def get_cost_extensions(self, cost) -> dict:
+        complexity = self.get_complexity_settings()
+        return {
+            "cost": {
+                "requestedQueryCost": cost.cost,
+                "maximumAvailable": complexity["MAX_COST"],
+                "depth": cost.depth,
+                "maximumDepth": complexity["MAX_DEPTH"],
+            }
+        }
+
+    def check_document(
+        self, entry: CachedDocument, operation_ast, variables=None, row_limits=None
+    ):
+        """
+        Return an error result if a document must not be executed, else None.
+        """
+        if entry.validation_errors:
+            return ExecutionResult(data=None, errors=entry.validation_errors)
+        cost = self.get_query_cost(entry, operation_ast, variables, row_limits)
+        if cost is None:
+            return None
+        complexity = self.get_complexity_settings()
+        errors = []
+        if cost.depth > complexity["MAX_DEPTH"]:
+            errors.append(
+                GraphQLError(
+                    f"Query too deep: depth {cost.depth} exceeds the maximum of "
+                    f"{complexity['MAX_DEPTH']}."
+                )
+            )
+        if cost.cost > complexity["MAX_COST"]:
+            errors.append(
+                GraphQLError(
+                    f"Query too complex: cost {cost.cost} exceeds the maximum of "
+                    f"{complexity['MAX_COST']}."
+                )
+            )
+        if errors:
+            return ExecutionResult(
+                data=None, errors=errors, extensions=self.get_cost_extensions(cost)
+            )
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.wants_stream(request):
+            plan = self.start_stream(request)
+            if isinstance(plan, ExecutionResult):
+                return self.rejected_stream_response(request, plan)
+            if plan is not None:
+                return StreamingHttpResponse(
+                    self.stream_payloads(request, *plan),
+                    content_type=STREAM_CONTENT_TYPE,
+                )
+        return self.add_etag(request, super().dispatch(request, *args, **kwargs))
+
+    def rejected_stream_response(self, request, result: ExecutionResult) -> HttpResponse:
+        """
+        Answer a stream the cost check refused with its errors, as JSON.
+        """
+        payload = {"errors": [self.format_error(e) for e in result.errors]}
+        if result.extensions:
+            payload["extensions"] = result.extensions
+        return HttpResponse(
+            self.json_encode(request, payload),
+            status=400,
+            content_type="application/json",
+        )
+
+    def wants_stream(self, request) -> bool:
+        return request.method.lower() in ("get", "post") and (
+            STREAM_CONTENT_TYPE in request.headers.get("Accept", "")
+        )
+
+    def start_stream(self, request):
+        """
+        Plan chunked delivery of a request's root connection.
+
+        A request is streamed when it asks for ``application/x-ndjson`` and
+        runs a valid query operation whose only root field is a keyset
+        connection paged with ``first``/``after``. Anything else returns None
+        and is answered as a normal JSON response, errors included.
+
+        A stream returns at most ``GRAPHQL_STREAM_MAX_ROWS`` rows, and its cost
+        is checked with the connection returning that many rows, or ``first``
+        if smaller, instead of the connection's page cap.
+
+        Returns:
+            Union[tuple, ExecutionResult, None]: Arguments for
+            ``stream_payloads``; the errors of a stream over the cost or depth
+            limit; or None to answer normally.
+        """
+        try:
+            data = self.parse_body(request)
+        except HttpError:
+            return None
+        if self.batch or isinstance(data, list):
+            return None
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        if not query:
+            return None
+        try:
+            entry = self.get_document(query)
+        except Exception:
+            return None
+        operation_ast = get_operation_ast(entry.document, operation_name)
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None
+        selections = operation_ast.selection_set.selections
+        if len(selections) != 1 or not isinstance(selections[0], FieldNode):
+            return None
+        if entry.validation_errors:
+            return None
+
+        field_node = selections[0]
+        max_rows = getattr(settings, "GRAPHQL_STREAM_MAX_ROWS", 10000)
+        query_type = self.schema.graphql_schema.query_type
+        row_limits = {f"{query_type.name}.{field_node.name.value}": max_rows}
+        rejected = self.check_document(entry, operation_ast, variables, row_limits)
+        if rejected is not None:
+            return rejected
+        stream = ConnectionStream(
+            (field_node.alias or field_node.name).value,
+            getattr(settings, "GRAPHQL_STREAM_CHUNK_SIZE", 500),
+            max_rows,
+        )
+        request.connection_stream = stream
+        result = self.execute_document(
+            request, entry.document, operation_ast, variables, operation_name
+        )
+        if result.errors or stream.queryset is None:
+            request.connection_stream = None
+            return None
+        # Reason: chunks run after PrimaryStickinessMiddleware has reset the routing.
+        routing = current_routing.get()
+        return entry, operation_ast, variables, operation_name, stream, routing
+
+    def stream_payloads(
+        self, request, entry, operation_ast, variables, operation_name, stream, routing
+    ):
+        """
+        Execute the document once per chunk and yield one JSON line per chunk.
+
+        Every line is a complete GraphQL response for that slice of the
+        connection plus ``hasNext``; clients concatenate the edges. Each chunk
+        reads under the request's ``routing`` state, so a client pinned to the
+        primary keeps reading from it.
+        """
+        chunks = stream.chunks()
+        while True:
+            # Reason: a context variable set across a yield would leak into the server.
+            token = current_routing.set(routing)
+            try:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                rows, has_next, has_next_page = chunk
+                stream.rows = rows
+                stream.has_next_page = has_next_page
+                # Reason: fresh loaders per chunk keep their caches bounded by the chunk.
+                request.loaders = None
+                result = self.execute_document(
+                    request, entry.document, operation_ast, variables, operation_name
+                )
+            finally:
+                current_routing.reset(token)
+            payload = {}
+            if result.errors:
+                payload["errors"] = [self.format_error(e) for e in result.errors]
+            payload["data"] = result.data
+            payload["hasNext"] = has_next
+            yield self.json_encode(request, payload) + "\n"
+            stream.has_previous_page = True
+        request.connection_stream = None
+
+    def parse_body(self, request):
+        if not self.batch and self.get_content_type(request) == "application/json":
+            operations = parse_batch(request.body)
+            if operations is not None:
+                return operations
+        return super().parse_body(request)
+
+    def get_graphql_params(self, request, data):
+        """
+        Read the operation from a request, resolving automatic persisted queries.
+
+        A request with ``extensions.persistedQuery`` and a query registers the
+        query under its hash; one with the hash alone runs the registered
+        query, so repeated operations, GETs included, need not resend it.
+
+        Raises:
+            PersistedQueryError: If the hash is unknown or does not match the
+                query, or persisted queries are disabled.
+        """
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        sha256 = persisted_query_hash(
+            request.GET.get("extensions") or data.get("extensions")
+        )
+        if sha256 is None:
+            return query, variables, operation_name, id
+        store = get_persisted_query_store()
+        if store is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotSupported", PERSISTED_QUERY_NOT_SUPPORTED
+            )
+        if not query:
+            query = store.get(sha256)
+            if query is None:
+                raise PersistedQueryError("PersistedQueryNotFound", PERSISTED_QUERY_NOT_FOUND)
+        elif store.hash(query) != sha256:
+            raise PersistedQueryError("provided sha does not match query", status=400)
+        else:
+            try:
+                valid = not self.get_document(query).validation_errors
+            except Exception:
+                valid = False
+            # Reason: only documents that can run are worth a cache entry.
+            if valid:
+                store.add(sha256, query)
+        return query, variables, operation_name, id
+
+    @staticmethod
+    def format_error(error):
+        if isinstance(error, PersistedQueryError):
+            return error.formatted
+        return GraphQLView.format_error(error)
+
+    def check_etag(self, request, data, query, variables, operation_name) -> bool:
+        """
+        Prepare a GET query's ETag and tell whether the client's copy is current.
+
+        A stored ETag stays valid until a row the response read is written.
+        Without one, the request collects the cache tags of the rows it reads
+        so ``store_etag()`` can derive one after execution.
+
+        Returns:
+            bool: True if ``If-None-Match`` names the current ETag, so the
+            response is ``304 Not Modified``.
+        """
+        etag_cache = get_etag_cache()
+        if (
+            etag_cache is None
+            or request.method != "GET"
+            or not query
+            or trace_requested(request, data)
+        ):
+            return False
+        try:
+            entry = self.get_document(query)
+        except Exception:
+            return False
+        operation_ast = get_operation_ast(entry.document, operation_name)
+        if (
+            entry.validation_errors
+            or operation_ast is None
+            or operation_ast.operation != OperationType.QUERY
+        ):
+            return False
+        key = etag_cache.key(entry.fingerprint, operation_name, variables, kind="etag")
+        request.graphql_etag = etag_cache.get(key)
+        if request.graphql_etag is not None:
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            return request.graphql_etag in if_none_match
+        request.graphql_etag_key = key
+        request.graphql_etag_started = self.start_response_cache(request, etag_cache)
+        return False
+
+    def store_etag(self, request, execution_result):
+        """
+        Derive and store the ETag of a GET query from the rows it read.
+        """
+        key = getattr(request, "graphql_etag_key", None)
+        if key is None or not execution_result or execution_result.errors:
+            return
+        request.graphql_etag = get_etag_cache().set_etag(
+            key, request.response_cache_tags, request.graphql_etag_started
+        )
+
+    def add_etag(self, request, response):
+        """
+        Send the ETag of a GET query, replacing the response with a 304 if
+        the client's copy is current.
+        """
+        etag = getattr(request, "graphql_etag", None)
+        if etag is None or response.status_code not in (200, 304):
+            return response
+        if response.status_code == 304:
+            response = HttpResponseNotModified()
+        response["ETag"] = etag
+        # Reason: shared caches may keep the response but must revalidate it first.
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    def resolve_operation(self, request, data) -> ResolvedOperation:
+        """
+        Read a request body's parameters and look up its document.
+
+        Returns:
+            ResolvedOperation: Parameters, document and operation, passed on
+            so later steps need not resolve them again.
+        Raises:
+            HttpError: If the parameters cannot be read, e.g. an unknown
+                persisted query.
+        """
+        params = self.get_graphql_params(request, data)
+        query, _, operation_name, _ = params
+        try:
+            entry = self.get_document(query) if query else None
+        except Exception:
+            entry = None
+        operation_ast = entry and get_operation_ast(entry.document, operation_name)
+        return ResolvedOperation(params, entry, operation_ast)
+
+    def get_operation_response(self, request, data, params=None) -> str:
+        """
+        Answer one operation of a batch, reporting request errors in its result.
+        """
+        try:
+            result, _ = self.get_response(request, data, params=params)
+        except HttpError as e:
+            result = self.json_encode(request, {"errors": [self.format_error(e)]})
+        return result
+
+    def get_batch_response(self, request, operations) -> str:
+        """
+        Execute the operations of a batched request in order.
+
+        Consecutive queries share one loader registry, so rows one of them
+        loaded are not fetched again by the next. A mutation gets its own
+        registry and ends the run: queries after it never see rows loaded
+        before the write.
+
+        Returns:
+            str: JSON array of the operations' results, in input order.
+        """
+        results, loaders = [], LoaderRegistry()
+        for data in operations:
+            try:
+                resolved = self.resolve_operation(request, data)
+            except HttpError as e:
+                results.append(self.json_encode(request, {"errors": [self.format_error(e)]}))
+                continue
+            if resolved.is_query:
+                results.append(
+                    self.get_operation_response(
+                        operation_request(request, loaders), data, resolved.params
+                    )
+                )
+                continue
+            results.append(
+                self.get_operation_response(
+                    operation_request(request, None), data, resolved.params
+                )
+            )
+            loaders = LoaderRegistry()
+        return encode_batch(results)
+
+    def get_response(self, request, data, show_graphiql=False, params=None):
+        """
+        Execute a request body and encode its response.
+
+        Args:
+            params (Optional[Tuple]): Parameters already read with
+                ``get_graphql_params``, so they are not resolved again.
+        Returns:
+            Tuple[str, int]: Encoded JSON response and HTTP status code.
+        """
+        if isinstance(data, list):
+            return self.get_batch_response(request, data), 200
+        query, variables, operation_name, id = params or self.get_graphql_params(
+            request, data
+        )
+        if self.check_etag(request, data, query, variables, operation_name):
+            return "", 304
+        trace = self.start_trace(request, data)
+
+        response_cache, cache_key = self.get_response_cache_key(
+            query, variables, operation_name, show_graphiql
+        )
+        if trace is not None and trace.requested:
+            cache_key = None
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached, 200
+            started_at = self.start_response_cache(request, response_cache)
+
+        with activate(trace):
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        execution_result = self.add_trace_extensions(
+            execution_result, trace, operation_name
+        )
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+        if execution_result and execution_result.errors:
+            set_rollback()
+        result, status_code = self.encode_execution_result(
+            request, execution_result, id, show_graphiql
+        )
+        self.store_etag(request, execution_result)
+        if cache_key is not None:
+            self.store_response(
+                request, response_cache, cache_key, execution_result, result, started_at
+            )
+        return result, status_code
+
+    def get_middleware(self, request):
+        middleware = list(super().get_middleware(request) or ())
+        if metrics_enabled():
+            middleware.append(self.metrics_middleware)
+        if getattr(request, "response_cache_tags", None) is not None:
+            middleware.append(self.cache_tag_middleware)
+        if getattr(request, "graphql_trace", None) is not None:
+            middleware.append(self.tracing_middleware)
+        return middleware or None
+
+    def start_trace(self, request, data):
+        """
+        Sample the request for tracing and remember the trace on it.
+
+        Returns:
+            Optional[Trace]: The trace, or None when the request is not traced.
+        """
+        request.graphql_trace = sample_trace(request, data)
+        return request.graphql_trace
+
+    def add_trace_extensions(self, execution_result, trace, operation_name):
+        """
+        Report a finished trace: in ``extensions`` if requested, else to the log.
+        """
+        if trace is None or not execution_result:
+            return execution_result
+        report_trace(trace, operation_name)
+        if trace.requested:
+            execution_result.extensions = {
+                **(execution_result.extensions or {}),
+                "tracing": trace.as_extension(),
+            }
+        return execution_result
+
+    def get_response_cache_key(self, query, variables, operation_name, show_graphiql=False):
+        """
+        Return the response cache and key for a cacheable request.
+
+        Only valid query operations are cached, and only when
+        ``GRAPHQL_RESPONSE_CACHE["ENABLED"]`` is set. Batched and GraphiQL
+        responses are never cached because their encoding differs per request.
+
+        Returns:
+            Tuple[Optional[ResponseCache], Optional[str]]: The cache and key,
+            or ``(None, None)`` when the response must not be cached.
+        """
+        response_cache = get_response_cache()
+        if response_cache is None or not query or self.batch or show_graphiql:
+            return None, None
+        try:
+            entry = self.get_document(query)
+        except Exception:
+            return None, None
+        operation_ast = get_operation_ast(entry.document, operation_name)
+        if (
+            entry.validation_errors
+            or operation_ast is None
+            or operation_ast.operation != OperationType.QUERY
+        ):
+            return None, None
+        return response_cache, response_cache.key(
+            entry.fingerprint, operation_name, variables
+        )
+
+    def start_response_cache(self, request, response_cache) -> int:
+        """
+        Start collecting cache tags for the request and return the start time.
+
+        When reads may go to a replica, the start is moved back by the
+        replica lag, so writes the replica may not have yet still prevent
+        the response from being cached.
+        """
+        request.response_cache_tags = set()
+        return response_cache.now() - int(replica_lag() * 1_000_000_000)
+
+    def store_response(
+        self, request, response_cache, cache_key, execution_result, result, started_at
+    ):
+        """
+        Cache an encoded response if it executed without errors.
+        """
+        tags = request.response_cache_tags
+        request.response_cache_tags = None
+        if execution_result is None or execution_result.errors or result is None:
+            return
+        response_cache.set(cache_key, result, tags, started_at)
+
+    def encode_execution_result(
+        self, request, execution_result, id=None, show_graphiql=False
+    ):
+        """
+        Serialize an ExecutionResult, including its extensions, for the response.
+
+        Returns:
+            Tuple[Optional[str], int]: Encoded JSON body and HTTP status code.
+        """
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(
+            not getattr(e, "path", None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        try:
+            entry = self.get_document(query)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(entry.document, operation_name)
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.SUBSCRIPTION
+        ):
+            return ExecutionResult(
+                errors=[GraphQLError("Subscriptions are only served over websockets.")]
+            )
+
+        rejected = self.check_document(entry, operation_ast, variables)
+        if rejected:
+            return rejected
+
+        if is_introspection(operation_ast):
+            result = self.execute_introspection(
+                entry, operation_ast, variables, operation_name
+            )
+        else:
+            result = self.execute_document(
+                request,
+                entry.document,
+                operation_ast,
+                variables,
+                operation_name,
+                plan=self.get_execution_plan(entry, operation_ast),
+            )
+        return self.add_cost_extensions(result, entry, operation_ast, variables)
+
+    def add_cost_extensions(
+        self, result, entry: CachedDocument, operation_ast, variables=None
+    ):
+        """
+        Report the operation's computed cost in the result's extensions.
+        """
+        cost = self.get_query_cost(entry, operation_ast, variables)
+        if cost is not None:
+            result.extensions = {
+                **(result.extensions or {}),
+                **self.get_cost_extensions(cost),
+            }
+        return result
+
+    def execute_document(
+        self, request, document, operation_ast, variables, operation_name, plan=None
+    ):
+        """
+        Execute a parsed and validated document, wrapping mutations in a transaction.
+
+        Args:
+            plan (Optional[ExecutionPlan]): Compiled plan of the operation, run
+                with ``compiled_execution_context_class``.
+        Returns:
+            ExecutionResult: The result of executing the document.
+        """
+        started = time.perf_counter()
+        is_mutation = (
+            operation_ast is not None and operation_ast.operation == OperationType.MUTATION
+        )
+        execution_context_class = self.execution_context_class
+        if plan is not None:
+            request.graphql_plan = plan
+            execution_context_class = self.compiled_execution_context_class
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+                "execution_context_class": execution_context_class,
+            }
+            if is_mutation and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+            ):
+                with pin_primary(), transaction.atomic():
+                    result = execute(
+                        self.schema.graphql_schema, document, **execute_options
+                    )
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+            else:
+                # Reason: a mutation's reads must see the primary, e.g. its own writes.
+                with pin_primary(is_mutation):
+                    result = execute(
+                        self.schema.graphql_schema, document, **execute_options
+                    )
+        except Exception as e:
+            result = ExecutionResult(errors=[e])
+        self.record_operation(operation_ast, started, result)
+        return result
+
+    def execute_introspection(
+        self, entry: CachedDocument, operation_ast, variables, operation_name
+    ):
+        """
+        Answer an introspection-only query, executing each distinct one once.
+
+        Returns:
+            ExecutionResult: The result of the introspection query.
+        """
+        started = time.perf_counter()
+        result = self.introspection_cache.execute(
+            self.schema.graphql_schema,
+            entry.document,
+            entry.fingerprint,
+            operation_name,
+            variables,
+        )
+        self.record_operation(operation_ast, started, result)
+        return result
+
+    def record_operation(self, operation_ast, started: float, result):
+        """
+        Record an execution's latency and errors when metrics are enabled.
+        """
+        if operation_ast is not None and metrics_enabled():
+            record_operation(operation_ast, time.perf_counter() - started, result)
+
+
+register_cache("document", LimitedComplexityGraphQLView.document_cache)
 
 
 # Instruct user to update urls.py to use LimitedComplexityGraphQLView if needed
@@ -204,4 +1358,4 @@ class LimitedComplexityGraphQLView(GraphQLView):
 # path('graphql/', csrf_exempt(LimitedComplexityGraphQLView.as_view(graphiql=True))),
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+schema = Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -0,0 +1,462 @@
+import gc
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from graphql import get_introspection_query
+from apps.metrics import process_exited, process_exiting
+
+logger = logging.getLogger(__name__)
+
+# Environment passed to a re-executed master: the listening socket's file
+# descriptor and the pids of the previous generation of workers.
+LISTEN_FD_ENV = "GRAPHQL_SERVER_FD"
+OLD_WORKERS_ENV = "GRAPHQL_SERVER_OLD_WORKERS"
+
+DEFAULT_WARMUP_QUERIES = [
+    "{ allUsers(first: 1) { edges { node { id username plan appCount } } } }",
+    "{ allApps(first: 1) { edges { node { id active owner { id username } } } } }",
+    # Reason: tooling sends the standard introspection query; workers answer it from cache.
+    get_introspection_query(descriptions=True),
+]
+
+
+def get_server_settings() -> dict:
+    config = {
+        "INTERFACE": "asgi",
+        "WORKERS": os.cpu_count() or 1,
+        "THREADS": 4,
+        "BACKLOG": 2048,
+        "GRACEFUL_TIMEOUT": 30.0,
+        "KEEPALIVE_TIMEOUT": 5.0,
+        "TIMEOUT": 30.0,
+        "MAX_QUEUED": 64,
+        "WARMUP_QUERIES": DEFAULT_WARMUP_QUERIES,
+    }
+    config.update(getattr(settings, "GRAPHQL_SERVER", {}))
+    return config
+
+
+def warm_up(application, queries: Iterable[str], path: str = "/graphql/") -> List[str]:
+    """
+    Send GraphQL queries through a WSGI application in this process.
+
+    Runs every layer a real request runs, so URL resolution, middleware,
+    the parsed-document cache and lazily built state are ready before the
+    first client arrives.
+
+    Returns:
+        List[str]: The HTTP status of each request.
+    """
+    statuses = []
+    for query in queries:
+        body = json.dumps({"query": query}).encode()
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "PATH_INFO": path,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        chunks = application(
+            environ, lambda status, headers, exc_info=None: statuses.append(status)
+        )
+        try:
+            b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+    return statuses
+
+
+def forget_process_state():
+    """
+    Drop per-process state the parent built while warming up.
+
+    Workers would otherwise each report the parent's warm-up metrics, and
+    share its database connections.
+    """
+    from apps.dataloaders import entity_cache
+    from apps.metrics import get_metrics_settings, process_snapshots, registry
+
+    connections.close_all()
+    entity_cache.clear()
+    registry.clear()
+    directory = get_metrics_settings()["MULTIPROCESS_DIR"]
+    if directory:
+        try:
+            os.remove(process_snapshots.path(directory))
+        except FileNotFoundError:
+            pass
+
+
+def preload(interface: str = "wsgi", warmup_queries: Optional[Iterable[str]] = None):
+    """
+    Import and build everything workers share, then freeze it for forking.
+
+    Loads the URLconf (and with it ``apps.schema`` and the graphene schema),
+    builds the middleware chain, configures every database alias, prints the
+    schema SDL and runs the warm-up queries. Objects created so far are moved out of the
+    garbage collector's reach with ``gc.freeze()``, so collections in the
+    workers do not write to, and thereby copy, the pages they share with
+    the parent.
+
+    Args:
+        interface (str): ``wsgi`` or ``asgi``.
+        warmup_queries (Optional[Iterable[str]]): Queries to send; defaults
+            to ``WARMUP_QUERIES``.
+    Returns:
+        The WSGI or ASGI application.
+    """
+    from django.core.wsgi import get_wsgi_application
+    from apps.introspection import schema_etag
+    from apps.schema import schema
+
+    wsgi_application = get_wsgi_application()
+    get_resolver().url_patterns
+    connections.all(initialized_only=False)
+    schema_etag(schema.graphql_schema)
+    if warmup_queries is None:
+        warmup_queries = get_server_settings()["WARMUP_QUERIES"]
+    statuses = warm_up(wsgi_application, warmup_queries)
+    failed = [status for status in statuses if not status.startswith("200")]
+    if failed:
+        logger.warning("warm-up requests failed: %s", ", ".join(failed))
+
+    application = wsgi_application
+    if interface == "asgi":
+        from backend_challenge.asgi import application
+    forget_process_state()
+    gc.collect()
+    gc.freeze()
+    return application
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """
+    Request handler logging through ``logging`` instead of writing every
+    request to stderr, with the server's per-connection socket timeout.
+    """
+
+    def setup(self):
+        # Reason: StreamRequestHandler applies ``timeout`` to the socket in setup().
+        self.timeout = self.server.connection_timeout
+        super().setup()
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+SERVICE_UNAVAILABLE = (
+    b"HTTP/1.0 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+)
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGI server on an already listening socket, handling connections on a
+    fixed pool of threads.
+
+    A fixed pool bounds the threads, and with them the database connections,
+    a worker opens, unlike a thread per connection. At most ``max_queued``
+    accepted connections wait for a thread; more are answered with 503 at
+    once, and a client that stops sending is dropped after ``timeout``
+    seconds, so slow clients cannot pile up connections without bound.
+
+    The handler speaks HTTP/1.0 without keep-alive; it is the fallback for
+    ``--interface wsgi``, the default interface being uvicorn.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        application,
+        threads: int,
+        timeout: Optional[float] = 30.0,
+        max_queued: int = 64,
+    ):
+        host, port = sock.getsockname()[:2]
+        super().__init__((host, port), QuietRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.server_name = host
+        self.server_port = port
+        self.setup_environ()
+        self.set_app(application)
+        self.connection_timeout = timeout
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="graphql-worker")
+        self.max_connections = threads + max_queued
+        self.slots = threading.BoundedSemaphore(self.max_connections)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self.reject(request)
+            return
+        self.pool.submit(self.handle_in_thread, request, client_address)
+
+    def reject(self, request):
+        logger.warning("%d connections in progress; answering 503", self.max_connections)
+        try:
+            request.settimeout(1)
+            request.sendall(SERVICE_UNAVAILABLE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def handle_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except TimeoutError:
+            logger.debug("%s timed out after %ss", client_address, self.connection_timeout)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        # Reason: the listening socket belongs to the master and the other workers.
+        self.pool.shutdown(wait=True)
+
+
+def serve_wsgi(sock: socket.socket, application, threads: int):
+    """
+    Serve until SIGTERM, then finish requests in flight and return.
+    """
+    config = get_server_settings()
+    server = PooledWSGIServer(
+        sock,
+        application,
+        threads,
+        timeout=config["TIMEOUT"],
+        max_queued=config["MAX_QUEUED"],
+    )
+
+    def stop(signum, frame):
+        # Reason: shutdown() waits for serve_forever(), so it cannot run on this thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+        connections.close_all()
+
+
+def serve_asgi(sock: socket.socket, application, threads: int):
+    """
+    Serve an ASGI application with uvicorn until SIGTERM.
+
+    uvicorn speaks HTTP/1.1 with keep-alive and websockets, and on SIGTERM
+    stops accepting and lets requests in flight finish.
+
+    Raises:
+        ImportError: If uvicorn is not installed.
+    """
+    import uvicorn
+
+    server_settings = get_server_settings()
+    # Reason: asgiref sizes the executor running sync code from this variable.
+    os.environ.setdefault("ASGI_THREADS", str(threads))
+    config = uvicorn.Config(
+        application,
+        lifespan="off",
+        access_log=False,
+        timeout_keep_alive=server_settings["KEEPALIVE_TIMEOUT"],
+        timeout_graceful_shutdown=server_settings["GRACEFUL_TIMEOUT"],
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def exit_worker(signum, frame):
+    raise SystemExit(0)
+
+
+class PreforkMaster:
+    """
+    Parent process that forks workers sharing one listening socket.
+
+    Workers inherit the preloaded application copy-on-write. The master
+    replaces workers that die and handles these signals:
+
+    - SIGTERM, SIGINT: stop workers gracefully and exit.
+    - SIGHUP: re-execute itself to load new code. The new master preloads
+      and starts its workers on the same socket before the old workers are
+      stopped, so no connection is refused during a reload. If the new code
+      fails to preload, the master runs without an application and keeps
+      supervising the old workers until the next SIGHUP or SIGTERM.
+    - SIGTTIN, SIGTTOU: add or remove one worker.
+
+    Workers still running ``GRACEFUL_TIMEOUT`` seconds after being asked to
+    stop are killed.
+    """
+
+    def __init__(self, sock, application, serve, workers: int, threads: int, graceful_timeout: float):
+        self.sock = sock
+        self.application = application
+        self.serve = serve
+        self.worker_count = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.workers: Dict[int, float] = {}
+        self.retiring: Dict[int, float] = {}
+        self.signals: List[int] = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        status = 0
+        try:
+            for signum in (signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+                signal.signal(signum, signal.SIG_IGN)
+            # Reason: uvicorn re-raises SIGTERM after shutting down; exit through finally.
+            signal.signal(signal.SIGTERM, exit_worker)
+            self.serve(self.sock, self.application, self.threads)
+        except SystemExit as exit:
+            status = exit.code if isinstance(exit.code, int) else 0
+        except BaseException:
+            logger.exception("worker %d crashed", os.getpid())
+            status = 1
+        finally:
+            try:
+                process_exiting()
+            except Exception:
+                logger.exception("worker %d could not flush its metrics", os.getpid())
+            os._exit(status)
+
+    def retire(self, pids: Iterable[int]):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.retiring[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.retiring.pop(pid)
+
+    def reap(self):
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            process_exited(pid)
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            started = self.workers.pop(pid, None)
+            if started is not None:
+                logger.warning("worker %d exited; starting a replacement", pid)
+                # Reason: a worker failing at startup would otherwise respawn in a tight loop.
+                if time.monotonic() - started < 1:
+                    time.sleep(1)
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if deadline <= now:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    self.retiring.pop(pid)
+
+    def reexec(self):
+        """
+        Replace this process with a fresh master inheriting socket and workers.
+        """
+        os.set_inheritable(self.sock.fileno(), True)
+        environ = dict(os.environ)
+        environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        environ[OLD_WORKERS_ENV] = ",".join(map(str, [*self.workers, *self.retiring]))
+        os.execve(sys.executable, [sys.executable, *sys.orig_argv[1:]], environ)
+
+    def run(self, old_workers: Iterable[int] = ()):
+        """
+        Start the workers and supervise them until asked to stop.
+        """
+        for signum in (
+            signal.SIGTERM,
+            signal.SIGINT,
+            signal.SIGHUP,
+            signal.SIGTTIN,
+            signal.SIGTTOU,
+        ):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+        if self.application is None:
+            # Reason: the reload failed to preload; the previous generation keeps serving.
+            now = time.monotonic()
+            self.workers.update((pid, now) for pid in old_workers)
+        else:
+            for _ in range(self.worker_count):
+                self.spawn()
+            self.retire(old_workers)
+        logger.info(
+            "master %d serving with %d workers x %d threads",
+            os.getpid(),
+            self.worker_count,
+            self.threads,
+        )
+
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.retire(list(self.workers))
+                    while self.retiring:
+                        self.reap()
+                        time.sleep(0.1)
+                    return
+                if signum == signal.SIGHUP:
+                    logger.info("reloading")
+                    self.reexec()
+                if signum == signal.SIGTTIN:
+                    self.worker_count += 1
+                elif signum == signal.SIGTTOU and self.worker_count > 1:
+                    self.worker_count -= 1
+            self.reap()
+            while self.application is not None and len(self.workers) < self.worker_count:
+                self.spawn()
+            if self.application is not None and len(self.workers) > self.worker_count:
+                self.retire([max(self.workers, key=self.workers.get)])
+            time.sleep(0.1)
+
+
+def listen(address: str, backlog: int) -> socket.socket:
+    """
+    Open the listening socket, or adopt the one a reloading master passed on.
+    """
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        return socket.socket(fileno=int(inherited))
+    host, _, port = address.rpartition(":")
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host.strip("[]") or "0.0.0.0", int(port)))
+    sock.listen(backlog)
+    return sock
+
+
+def inherited_workers() -> List[int]:
+    """
+    Return the workers of the master this process replaced, if reloading.
+    """
+    pids = os.environ.pop(OLD_WORKERS_ENV, "")
+    return [int(pid) for pid in pids.split(",") if pid]
@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.dataloaders import invalidate_entities, invalidate_entity
+from apps.models import DeployedApp, User, adjust_app_counters, app_counters_enabled
+from apps.replicas import record_write
+from apps.response_cache import invalidate_updated_rows, invalidate_write
+from apps.subscriptions import publish_app_change, publish_plan_changes
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=DeployedApp)
+def invalidate_saved_row(sender, instance, created, **kwargs):
+    record_write()
+    invalidate_entity(instance)
+    invalidate_write(instance, created=created)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=DeployedApp)
+def invalidate_deleted_row(sender, instance, **kwargs):
+    record_write()
+    invalidate_entity(instance)
+    invalidate_write(instance, deleted=True)
+
+
+@receiver(post_save, sender=DeployedApp)
+def invalidate_saved_app_owner(sender, instance, **kwargs):
+    # Reason: post_save runs before save() records the new state, so this is the old owner.
+    counted = getattr(instance, "_counted_as", None)
+    owner_ids = {instance.owner_id}
+    if counted is not None:
+        owner_ids.add(counted[0])
+    invalidate_owners(owner_ids)
+    publish_app_change(instance, owner_ids)
+
+
+@receiver(post_save, sender=User)
+def publish_saved_plan(sender, instance, created, **kwargs):
+    # Reason: users not loaded from the database have no known previous plan.
+    loaded_plan = getattr(instance, "_loaded_plan", None)
+    if not created and loaded_plan is not None and loaded_plan != instance.plan:
+        publish_plan_changes([instance.pk])
+    instance._loaded_plan = instance.plan
+
+
+@receiver(post_delete, sender=DeployedApp)
+def uncount_deleted_app(sender, instance, origin=None, **kwargs):
+    """
+    Decrement the owner's counters inside the deleting transaction.
+
+    Deletions cascading from a User skip the update, since the owner row is
+    deleted in the same transaction.
+    """
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return
+    if app_counters_enabled():
+        adjust_app_counters((instance.owner_id, instance.active), None)
+    invalidate_owners([instance.owner_id])
+
+
+def invalidate_owners(owner_ids):
+    # Reason: counter columns change through F() updates, which send no signals.
+    invalidate_entities(User, owner_ids)
+    invalidate_updated_rows(User, owner_ids)
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+# Run in a fresh interpreter: boots Django the way a worker does and prints
+# the time each phase took, in seconds, as JSON.
+BOOT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+phases = {}
+
+def phase(name):
+    global started
+    now = time.perf_counter()
+    phases[name] = now - started
+    started = now
+
+import django
+django.setup()
+phase("django.setup")
+from django.urls import get_resolver
+get_resolver().url_patterns
+phase("urlconf")
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+phase("wsgi handler")
+from apps.server import warm_up
+status = warm_up(application, [sys.argv[1]])
+phase("first request")
+print(json.dumps({"phases": phases, "status": status}))
+"""
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+class ImportTiming(NamedTuple):
+    """
+    One module's line of ``python -X importtime`` output.
+
+    Fields:
+        module (str): Dotted module name.
+        self_us (int): Microseconds spent executing the module itself.
+        cumulative_us (int): Microseconds including the modules it imported.
+        depth (int): Nesting level; 0 for modules imported by the boot code.
+    """
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+class StartupProfile(NamedTuple):
+    """
+    Where a worker's startup time goes.
+
+    Fields:
+        total (float): Wall-clock seconds from launching the interpreter to
+            the end of the first request.
+        phases (Dict[str, float]): Seconds spent in each boot phase.
+        imports (List[ImportTiming]): Every module imported while booting.
+        status (List[str]): HTTP status of the first request.
+    """
+
+    total: float
+    phases: Dict[str, float]
+    imports: List[ImportTiming]
+    status: List[str]
+
+
+def parse_importtime(lines: Iterable[str]) -> List[ImportTiming]:
+    """
+    Parse ``python -X importtime`` output, skipping lines that are not timings.
+    """
+    timings = []
+    for line in lines:
+        match = IMPORT_TIME_LINE.match(line.rstrip())
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(
+                ImportTiming(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+            )
+    return timings
+
+
+def time_by_package(imports: Iterable[ImportTiming]) -> List[Tuple[str, int]]:
+    """
+    Sum the self time of modules by top-level package, slowest first.
+
+    Returns:
+        List[Tuple[str, int]]: (package, microseconds) pairs.
+    """
+    totals = defaultdict(int)
+    for timing in imports:
+        totals[timing.module.partition(".")[0]] += timing.self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_startup(
+    query: str = "{ __typename }", env: Optional[Dict[str, str]] = None
+) -> StartupProfile:
+    """
+    Boot the project in a new interpreter and measure each step.
+
+    Args:
+        query (str): GraphQL query sent as the first request.
+        env (Optional[Dict[str, str]]): Environment variables added to this
+            process's, e.g. to profile another settings module.
+    Returns:
+        StartupProfile: Phase timings and per-module import times.
+    Raises:
+        RuntimeError: If the interpreter exits with an error.
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT, query],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+    )
+    total = time.perf_counter() - started
+    if completed.returncode:
+        errors = [line for line in completed.stderr.splitlines() if not IMPORT_TIME_LINE.match(line)]
+        raise RuntimeError("\n".join(errors[-20:]))
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    return StartupProfile(
+        total,
+        report["phases"],
+        parse_importtime(completed.stderr.splitlines()),
+        report["status"],
+    )
@@ -0,0 +1,106 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from graphql import GraphQLError
+from apps.pagination import KEYSET_FIELDS, _seek, build_connection
+
+STREAM_CONTENT_TYPE = "application/x-ndjson"
+
+
+class ConnectionStream:
+    """
+    Request state for delivering one root keyset connection in chunks.
+
+    The view executes the document once in planning mode, where the
+    connection field hands its ordered queryset to the stream and resolves to
+    an empty connection. The view then reads the queryset through
+    ``iterator(chunk_size=...)`` and executes the document again for every
+    chunk, with the connection resolving to just that chunk's rows. Peak
+    memory is bounded by two chunks (the current one and a one-chunk
+    lookahead for ``hasNextPage``) instead of the whole result.
+
+    A stream delivers at most ``max_rows`` rows, or ``first`` if smaller. When
+    rows remain past that, the last chunk reports ``hasNextPage`` and clients
+    continue from its last cursor with ``after``.
+    """
+
+    def __init__(self, field_name: str, chunk_size: int, max_rows: int):
+        self.field_name = field_name
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.queryset = None
+        self.after = None
+        self.limit = None
+        self.rows = None
+        self.has_previous_page = False
+        self.has_next_page = False
+
+    def applies_to(self, info) -> bool:
+        return info.path.prev is None and info.path.key == self.field_name
+
+    def resolve(self, connection_type, resolver, root, info, args):
+        """
+        Resolve the streamed connection for the current execution.
+
+        Raises:
+            GraphQLError: If ``last`` or ``before`` is used, since a stream
+                always runs forwards.
+        """
+        if self.rows is not None:
+            return build_connection(
+                connection_type, self.rows, self.has_previous_page, self.has_next_page
+            )
+
+        if args.get("last") is not None or args.get("before"):
+            raise GraphQLError("Streamed connections only support `first` and `after`.")
+        first = args.get("first")
+        if first is not None and first < 0:
+            raise GraphQLError("Argument `first` must be a non-negative integer.")
+        queryset = resolver(root, info, **args)
+        self.after = args.get("after")
+        if self.after:
+            queryset = _seek(queryset, self.after, forward=True)
+        self.queryset = queryset.order_by(*KEYSET_FIELDS)
+        self.limit = self.max_rows if first is None else min(first, self.max_rows)
+        self.has_previous_page = bool(self.after)
+        return build_connection(connection_type, [], bool(self.after), False)
+
+    def chunks(self):
+        """
+        Yield ``(rows, has_next, has_next_page)`` for each chunk read from the
+        server-side cursor: whether another chunk follows, and whether rows
+        remain past the stream's limit.
+        """
+        # Reason: the row after the limit tells whether the connection has a next page.
+        rows = islice(self.queryset.iterator(chunk_size=self.chunk_size), self.limit + 1)
+        sent = 0
+        chunk = list(islice(rows, self.chunk_size))
+        while True:
+            following = list(islice(rows, self.chunk_size)) if chunk else []
+            if sent + len(chunk) > self.limit:
+                yield chunk[: self.limit - sent], False, True
+                return
+            sent += len(chunk)
+            if sent == self.limit and following:
+                yield chunk, False, True
+                return
+            yield chunk, bool(following), bool(following)
+            if not following:
+                return
+            chunk = following
+
+
+async def iterate_in_thread(iterator):
+    """
+    Yield from a synchronous iterator without blocking the event loop.
+
+    Each step runs through thread-sensitive ``sync_to_async``, so the server-side
+    cursor is always advanced on the same thread as the request's ORM work.
+    """
+    done = object()
+    advance = sync_to_async(next, thread_sensitive=True)
+    while True:
+        item = await advance(iterator, done)
+        if item is done:
+            return
+        yield item
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from apps.models import DeployedApp, User
+
+# Root subscription field -> (resolver argument naming the watched user, root model).
+SUBSCRIPTION_FIELDS = {
+    "planChanged": ("user_id", User),
+    "appChanged": ("owner_id", DeployedApp),
+}
+
+EVENT_MESSAGE_TYPE = "graphql.event"
+
+
+def subscription_group(field_name: str, user_id: str) -> str:
+    """
+    Channel layer group of the sockets watching ``field_name`` for one user.
+    """
+    return f"graphql.{field_name}.{user_id}"
+
+
+def publish(field_name: str, user_ids, pk: str):
+    """
+    Announce a change to the subscribers of ``field_name`` once the transaction commits.
+
+    Only ids travel through the channel layer; subscribers load the row after
+    commit, so no listener can see a change that was rolled back.
+
+    Args:
+        field_name (str): Root subscription field, a key of ``SUBSCRIPTION_FIELDS``.
+        user_ids (Iterable[str]): Users whose subscribers are notified.
+        pk (str): Primary key of the changed row sent as the subscription root.
+    """
+    publish_many([(field_name, user_ids, pk)])
+
+
+def publish_many(changes):
+    """
+    Announce several changes with one commit callback and one event loop hop.
+
+    Args:
+        changes (Iterable[Tuple[str, Iterable[str], str]]): ``publish()``
+            arguments, one tuple per change.
+    """
+    # Reason: WSGI workers never serve websockets; channels loads on the first write.
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    events = [
+        (
+            {"type": EVENT_MESSAGE_TYPE, "field": field_name, "pk": pk},
+            [subscription_group(field_name, user_id) for user_id in set(user_ids)],
+        )
+        for field_name, user_ids, pk in changes
+    ]
+    if not events:
+        return
+
+    async def send():
+        for message, groups in events:
+            # Reason: the event id lets sockets in one process share a single rendering.
+            event = {**message, "event_id": uuid.uuid4().hex}
+            for group in groups:
+                await channel_layer.group_send(group, {**event, "group": group})
+
+    transaction.on_commit(async_to_sync(send))
+
+
+def publish_plan_changes(user_ids):
+    """
+    Notify ``planChanged`` subscribers of the given users.
+    """
+    publish_many(("planChanged", [user_id], user_id) for user_id in user_ids)
+
+
+def publish_app_change(app: DeployedApp, owner_ids):
+    """
+    Notify ``appChanged`` subscribers of every owner the app belonged to.
+    """
+    publish("appChanged", owner_ids, app.pk)
+
+
+class EventRenderer:
+    """
+    Process-wide memo of rendered subscription payloads.
+
+    Every socket subscribed to a group receives the same channel layer event.
+    Sockets whose subscriptions share a document, operation and variables ask
+    for the same key, so the first one executes and serializes the payload
+    and the rest await its result instead of executing again.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._renders = OrderedDict()
+
+    def render(self, event_id: str, key, render):
+        """
+        Return the serialized payload for ``key`` in event ``event_id``.
+
+        Args:
+            event_id (str): Id of the channel layer event.
+            key (Hashable): Identity of the subscription's document and variables.
+            render (Callable[[], Awaitable[str]]): Produces the payload on a miss.
+        Returns:
+            asyncio.Future: Resolves to the serialized payload.
+        """
+        cache_key = (event_id, key)
+        task = self._renders.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(render())
+            self._renders[cache_key] = task
+            while len(self._renders) > self.maxsize:
+                self._renders.popitem(last=False)
+        return task
+
+    def clear(self):
+        self._renders.clear()
+
+
+event_renderer = EventRenderer()
+
+
+def subscription_key(fingerprint: str, operation_name, variables) -> str:
+    """
+    Key identifying subscriptions that render identical payloads.
+    """
+    return json.dumps([fingerprint, operation_name, variables], sort_keys=True)
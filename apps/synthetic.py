@@ -0,0 +1,82 @@
+import random
+from datetime import timedelta
+from typing import Callable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+from apps.models import DeployedApp, User
+
+SYNTHETIC_BATCH_SIZE = 5000
+
+
+def generate_dataset(
+    users: int,
+    apps_per_user: int = 3,
+    batch_size: int = SYNTHETIC_BATCH_SIZE,
+    seed: int = 0,
+    prefix: str = "bench",
+    pro_ratio: float = 0.2,
+    active_ratio: float = 0.8,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[int, int]:
+    """
+    Bulk-create a synthetic dataset of users and their apps.
+
+    Rows are written with ``bulk_create`` in transactions of ``batch_size``
+    users, so memory stays bounded by one batch at any scale. The number of
+    apps per user varies between 0 and ``2 * apps_per_user``, plans and
+    ``active`` flags are drawn from ``seed``, and ``created_at`` values are
+    spread one second apart so keyset pagination sees distinct cursors. The
+    app counter columns on User are filled in directly, since bulk_create
+    bypasses ``DeployedApp.save()``. Ids are allocated by ``bulk_create``
+    one batch at a time, in creation order.
+
+    Args:
+        users (int): Number of users to create.
+        apps_per_user (int): Average number of apps per user.
+        batch_size (int): Users written per transaction.
+        seed (int): Seed for plans, app counts and ``active`` flags.
+        prefix (str): Username prefix; numbering continues after existing
+            users with the same prefix.
+        pro_ratio (float): Share of users on the PRO plan.
+        active_ratio (float): Share of active apps.
+        progress (Optional[Callable[[int, int], None]]): Called with the
+            running user and app totals after every batch.
+    Returns:
+        Tuple[int, int]: Number of users and apps created.
+    """
+    rng = random.Random(seed)
+    offset = User.objects.filter(username__startswith=prefix).count()
+    start = timezone.now() - timedelta(seconds=users)
+    created_users = created_apps = 0
+
+    for batch_start in range(0, users, batch_size):
+        user_rows, app_specs = [], []
+        for index in range(batch_start, min(batch_start + batch_size, users)):
+            created_at = start + timedelta(seconds=index)
+            user = User(
+                username=f"{prefix}{offset + index}",
+                plan="PRO" if rng.random() < pro_ratio else "HOBBY",
+                created_at=created_at,
+            )
+            for position in range(rng.randint(0, 2 * apps_per_user)):
+                active = rng.random() < active_ratio
+                app_specs.append((user, active, created_at + timedelta(milliseconds=position)))
+                user.app_count += 1
+                user.active_app_count += active
+            user_rows.append(user)
+
+        with transaction.atomic():
+            User.objects.bulk_create(user_rows, batch_size=batch_size)
+            # Reason: apps reference their owners' ids, allocated by the insert above.
+            app_rows = [
+                DeployedApp(owner_id=user.id, active=active, created_at=created_at)
+                for user, active, created_at in app_specs
+            ]
+            DeployedApp.objects.bulk_create(app_rows, batch_size=batch_size)
+        created_users += len(user_rows)
+        created_apps += len(app_rows)
+        if progress is not None:
+            progress(created_users, created_apps)
+
+    return created_users, created_apps
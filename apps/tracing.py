@@ -0,0 +1,175 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Trace of the operation executing in the current context, if it is sampled.
+current_trace: ContextVar = ContextVar("graphql_trace", default=None)
+
+
+class Trace:
+    """
+    Timings and SQL counts collected for one traced GraphQL operation.
+
+    Attributes:
+        requested (bool): Whether the client asked for the trace, in which
+            case it is returned in the response ``extensions``.
+        sql_queries (int): SQL statements executed on any connection.
+        db_time (float): Seconds spent executing those statements.
+        resolver_time (float): Seconds spent inside field resolvers.
+        resolver_calls (int): Field resolvers called.
+        duration (Optional[float]): Seconds from start to finish.
+    """
+
+    __slots__ = (
+        "requested",
+        "sql_queries",
+        "db_time",
+        "resolver_time",
+        "resolver_calls",
+        "started",
+        "duration",
+    )
+
+    def __init__(self, requested: bool = False):
+        self.requested = requested
+        self.sql_queries = 0
+        self.db_time = 0.0
+        self.resolver_time = 0.0
+        self.resolver_calls = 0
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def as_extension(self) -> dict:
+        return {
+            "sqlQueries": self.sql_queries,
+            "dbTimeMs": round(self.db_time * 1000, 3),
+            "resolverTimeMs": round(self.resolver_time * 1000, 3),
+            "resolverCalls": self.resolver_calls,
+            "durationMs": round((self.duration or 0.0) * 1000, 3),
+        }
+
+
+def get_tracing_settings() -> dict:
+    config = {
+        "SAMPLE_RATE": 0.0,
+        "ALLOW_CLIENT_REQUESTS": True,
+        "HEADER": "X-GraphQL-Trace",
+    }
+    config.update(getattr(settings, "GRAPHQL_TRACING", {}))
+    return config
+
+
+def trace_requested(request, data) -> bool:
+    """
+    Whether the client asked for a trace, by header or by ``extensions.tracing``.
+    """
+    config = get_tracing_settings()
+    if not config["ALLOW_CLIENT_REQUESTS"]:
+        return False
+    if request.headers.get(config["HEADER"], "").lower() not in ("", "0", "false"):
+        return True
+    extensions = data.get("extensions") if isinstance(data, dict) else None
+    return isinstance(extensions, dict) and bool(extensions.get("tracing"))
+
+
+def sample_trace(request, data) -> Optional[Trace]:
+    """
+    Start a trace if the client requested one or the request is sampled.
+
+    Returns:
+        Optional[Trace]: The new trace, or None when the request is not traced.
+    """
+    if trace_requested(request, data):
+        return Trace(requested=True)
+    rate = get_tracing_settings()["SAMPLE_RATE"]
+    if rate and random.random() < rate:
+        return Trace()
+    return None
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """
+    Make ``trace`` the current trace while an operation executes.
+    """
+    if trace is None:
+        yield
+        return
+    token = current_trace.set(trace)
+    try:
+        yield
+    finally:
+        current_trace.reset(token)
+        trace.finish()
+
+
+def record_sql(execute, sql, params, many, context):
+    """
+    Execute wrapper adding statement counts and time to the current trace.
+
+    Installed on every connection once; untraced statements only pay for the
+    context variable lookup.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        trace.db_time += time.perf_counter() - started
+        trace.sql_queries += 1
+
+
+def install_sql_recorder(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver adding ``record_sql`` to a new connection.
+    """
+    # Reason: the signal fires on every reconnect of the same connection object.
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class TracingMiddleware:
+    """
+    Graphene middleware timing field resolvers for the current trace.
+
+    Only the synchronous part of a resolver is timed; batched loads run
+    outside resolvers and are counted as database time. The view adds this
+    middleware to traced requests only.
+    """
+
+    def resolve(self, next, root, info, **args):
+        started = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            trace = current_trace.get()
+            if trace is not None:
+                trace.resolver_time += time.perf_counter() - started
+                trace.resolver_calls += 1
+
+
+def report_trace(trace: Trace, operation_name: Optional[str]):
+    """
+    Log a sampled trace the client did not ask for.
+    """
+    if not trace.requested:
+        logger.info(
+            "graphql operation %s: %d queries, %.3f ms db, %.3f ms resolvers",
+            operation_name or "<anonymous>",
+            trace.sql_queries,
+            trace.db_time * 1000,
+            trace.resolver_time * 1000,
+            extra={"graphql_trace": trace.as_extension()},
+        )
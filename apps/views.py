@@ -1,3 +1,383 @@
-from django.shortcuts import render
+import asyncio
+import inspect
+import time
+from typing import Any, NamedTuple, Optional
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
+from graphene_django.views import HttpError
+from graphql import (
+    ExecutionResult,
+    OperationDefinitionNode,
+    OperationType,
+    execute,
+    get_operation_ast,
+)
+from apps.batching import ResolvedOperation, encode_batch, operation_request
+from apps.compiler import CompiledAsyncExecutionContext
+from apps.dataloaders import AsyncLoaderRegistry
+from apps.document_cache import CachedDocument
+from apps.execution import AsyncExecutionContext
+from apps.introspection import is_introspection, schema_etag, schema_sdl
+from apps.response_cache import ResponseCache
+from apps.schema import LimitedComplexityGraphQLView, schema
+from apps.streaming import STREAM_CONTENT_TYPE, iterate_in_thread
+from apps.tracing import Trace, activate
 
-# Create your views here.
+
+class PreparedQuery(NamedTuple):
+    """
+    A query operation whose blocking steps are done, ready to execute.
+
+    Fields:
+        entry (CachedDocument): The parsed and validated document.
+        operation_ast (OperationDefinitionNode): The operation to execute.
+        variables (Optional[dict]): Request variables.
+        operation_name (Optional[str]): Requested operation name.
+        id (Optional[str]): Batched operation id, echoed in the response.
+        trace (Optional[Trace]): The request's trace, if sampled.
+        response_cache (Optional[ResponseCache]): Cache to store the response in.
+        cache_key (Optional[str]): Response cache key, None if not cacheable.
+        started_at (Optional[int]): Start of the response cache's tag collection.
+        plan (Optional[ExecutionPlan]): Compiled plan of the operation, if any.
+    """
+
+    entry: CachedDocument
+    operation_ast: OperationDefinitionNode
+    variables: Optional[dict]
+    operation_name: Optional[str]
+    id: Optional[str]
+    trace: Optional[Trace]
+    response_cache: Optional[ResponseCache]
+    cache_key: Optional[str]
+    started_at: Optional[int]
+    plan: Optional[Any]
+
+
+class AsyncGraphQLView(LimitedComplexityGraphQLView):
+    """
+    GraphQL view that executes query operations natively on the event loop.
+
+    Fields resolve as coroutines and loaders batch through asyncio futures, so a
+    slow database round trip no longer pins a worker thread. Mutations, GraphiQL
+    and malformed requests are handed to the synchronous view, which owns
+    transaction handling and error reporting. Streamed responses are produced
+    by the synchronous view one chunk at a time.
+    """
+
+    async_execution_context_class = AsyncExecutionContext
+    compiled_async_execution_context_class = CompiledAsyncExecutionContext
+
+    # Reason: Django only treats a class-based view as async when its handlers are coroutines.
+    async def get(self, request, *args, **kwargs):
+        return await self.dispatch(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.dispatch(request, *args, **kwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            if self.wants_stream(request):
+                plan = await sync_to_async(self.start_stream)(request)
+                if isinstance(plan, ExecutionResult):
+                    return self.rejected_stream_response(request, plan)
+                if plan is not None:
+                    return StreamingHttpResponse(
+                        iterate_in_thread(self.stream_payloads(request, *plan)),
+                        content_type=STREAM_CONTENT_TYPE,
+                    )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            result, status_code = await self.get_response_async(request, data)
+            return self.add_etag(
+                request,
+                HttpResponse(
+                    status=status_code, content=result, content_type="application/json"
+                ),
+            )
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+            return response
+
+    async def get_batch_response_async(self, request, operations) -> str:
+        """
+        Execute the operations of a batched request, running queries concurrently.
+
+        Consecutive queries run together on the event loop with one shared
+        loader registry, so the keys they load are de-duplicated and fetched
+        in the same batches. A mutation runs alone, in order, and the queries
+        after it get a fresh registry.
+
+        Returns:
+            str: JSON array of the operations' results, in input order.
+        """
+        results, position = [], 0
+        while position < len(operations):
+            # Reason: queries share loader batches only if they start executing on
+            # the same tick, so the blocking steps of the whole run happen first.
+            run, mutation = await sync_to_async(self.prepare_run)(
+                request, operations[position:]
+            )
+            position += len(run)
+            executed = iter(
+                await asyncio.gather(
+                    *(
+                        self.execute_prepared_async(r, query)
+                        for r, query in run
+                        if isinstance(query, PreparedQuery)
+                    )
+                )
+            )
+            results.extend(
+                (next(executed) if isinstance(query, PreparedQuery) else query)[0]
+                for _, query in run
+            )
+            if mutation is not None:
+                position += 1
+                results.append(
+                    await sync_to_async(self.get_operation_response)(
+                        operation_request(request, None),
+                        operations[position - 1],
+                        mutation.params,
+                    )
+                )
+        return encode_batch(results)
+
+    def prepare_run(self, request, operations):
+        """
+        Classify batched operations in order and prepare the queries leading them.
+
+        Stops at the first mutation, so the queries after it are prepared,
+        cached responses included, only once it ran.
+
+        Returns:
+            Tuple[list, Optional[ResolvedOperation]]: ``(operation request,
+            prepared)`` pairs of the leading queries, whose requests share one
+            loader registry, and the mutation that ended the run, if any.
+        """
+        loaders = AsyncLoaderRegistry()
+        run = []
+        for data in operations:
+            try:
+                resolved = self.resolve_operation(request, data)
+            except HttpError as e:
+                run.append((request, self.operation_error(request, e)))
+                continue
+            if not resolved.is_query:
+                return run, resolved
+            operation = operation_request(request, loaders)
+            run.append((operation, self.prepare_operation(operation, data, resolved)))
+        return run, None
+
+    def prepare_operation(self, request, data, resolved: ResolvedOperation):
+        """
+        Batched counterpart of ``prepare_response``, answering HTTP errors in
+        the operation's result.
+        """
+        try:
+            return self.prepare_response(request, data, resolved)
+        except HttpError as e:
+            return self.operation_error(request, e)
+
+    def operation_error(self, request, error: HttpError):
+        """
+        Encode an operation's request error as its result, next to its neighbours'.
+        """
+        return self.json_encode(request, {"errors": [self.format_error(error)]}), 200
+
+    async def get_response_async(self, request, data):
+        """
+        Execute a request body, running query operations on the event loop.
+
+        Returns:
+            Tuple[str, int]: Encoded JSON response and HTTP status code.
+        """
+        if isinstance(data, list):
+            return await self.get_batch_response_async(request, data), 200
+        prepared = await sync_to_async(self.prepare_response)(request, data)
+        if not isinstance(prepared, PreparedQuery):
+            return prepared
+        return await self.execute_prepared_async(request, prepared)
+
+    def prepare_response(self, request, data, resolved: Optional[ResolvedOperation] = None):
+        """
+        Run the blocking steps that precede executing a request body.
+
+        Persisted queries, ETags and cached responses are read from the cache
+        backend, so this runs through ``sync_to_async``, off the event loop.
+        Anything but a query to execute is answered here: a 304, a cached
+        response, a rejected or introspection query, or a mutation, which
+        the synchronous view runs.
+
+        Args:
+            resolved (Optional[ResolvedOperation]): The body's parameters and
+                document, when the caller already resolved them.
+        Returns:
+            Union[PreparedQuery, Tuple[str, int]]: The query to execute on the
+            event loop, or the encoded response and HTTP status code.
+        """
+        if resolved is None:
+            resolved = self.resolve_operation(request, data)
+        (query, variables, operation_name, id), entry, operation_ast = resolved
+        if self.check_etag(request, data, query, variables, operation_name):
+            return "", 304
+
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return self.get_response(request, data, params=resolved.params)
+
+        trace = self.start_trace(request, data)
+        response_cache, cache_key = self.get_response_cache_key(
+            query, variables, operation_name
+        )
+        if trace is not None and trace.requested:
+            cache_key = None
+        started_at = None
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached, 200
+            started_at = self.start_response_cache(request, response_cache)
+
+        prepared = PreparedQuery(
+            entry,
+            operation_ast,
+            variables,
+            operation_name,
+            id,
+            trace,
+            response_cache,
+            cache_key,
+            started_at,
+            self.get_execution_plan(entry, operation_ast),
+        )
+        execution_result = self.check_document(entry, operation_ast, variables)
+        if execution_result is not None:
+            return self.finish_response(request, prepared, execution_result)
+        if is_introspection(operation_ast):
+            return self.finish_executed(
+                request,
+                prepared,
+                self.execute_introspection(entry, operation_ast, variables, operation_name),
+            )
+        return prepared
+
+    async def execute_prepared_async(self, request, prepared: PreparedQuery):
+        """
+        Execute a prepared query on the event loop and encode its response.
+
+        Returns:
+            Tuple[str, int]: Encoded JSON response and HTTP status code.
+        """
+        with activate(prepared.trace):
+            execution_result = await self.execute_document_async(
+                request,
+                prepared.entry.document,
+                prepared.variables,
+                prepared.operation_name,
+                plan=prepared.plan,
+            )
+        return await sync_to_async(self.finish_executed)(
+            request, prepared, execution_result
+        )
+
+    def finish_executed(self, request, prepared: PreparedQuery, execution_result):
+        """
+        Add an executed query's cost extensions and encode its response.
+
+        Returns:
+            Tuple[str, int]: Encoded JSON response and HTTP status code.
+        """
+        execution_result = self.add_cost_extensions(
+            execution_result, prepared.entry, prepared.operation_ast, prepared.variables
+        )
+        return self.finish_response(request, prepared, execution_result)
+
+    def finish_response(self, request, prepared: PreparedQuery, execution_result):
+        """
+        Encode a query's result, storing its ETag and cached response.
+
+        Returns:
+            Tuple[str, int]: Encoded JSON response and HTTP status code.
+        """
+        execution_result = self.add_trace_extensions(
+            execution_result, prepared.trace, prepared.operation_name
+        )
+        result, status_code = self.encode_execution_result(
+            request, execution_result, prepared.id
+        )
+        self.store_etag(request, execution_result)
+        if prepared.cache_key is not None:
+            self.store_response(
+                request,
+                prepared.response_cache,
+                prepared.cache_key,
+                execution_result,
+                result,
+                prepared.started_at,
+            )
+        return result, status_code
+
+    async def execute_document_async(
+        self, request, document, variables, operation_name, plan=None
+    ):
+        """
+        Execute a parsed and validated query document with AsyncExecutionContext.
+
+        Args:
+            plan (Optional[ExecutionPlan]): Compiled plan of the operation, run
+                with ``compiled_async_execution_context_class``.
+        Returns:
+            ExecutionResult: The result of executing the document.
+        """
+        started = time.perf_counter()
+        execution_context_class = self.async_execution_context_class
+        if plan is not None:
+            request.graphql_plan = plan
+            execution_context_class = self.compiled_async_execution_context_class
+        try:
+            result = execute(
+                self.schema.graphql_schema,
+                document,
+                root_value=self.get_root_value(request),
+                context_value=self.get_context(request),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=self.get_middleware(request),
+                execution_context_class=execution_context_class,
+            )
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            result = ExecutionResult(errors=[e])
+        self.record_operation(
+            get_operation_ast(document, operation_name), started, result
+        )
+        return result
+
+
+@require_safe
+@condition(etag_func=lambda request: schema_etag(schema.graphql_schema))
+def sdl_view(request):
+    """
+    Serve the schema in the GraphQL schema definition language.
+
+    The SDL is printed once per process; clients revalidating with the
+    ETag get a 304 until a deploy changes the schema.
+    """
+    return HttpResponse(
+        schema_sdl(schema.graphql_schema), content_type="text/plain; charset=utf-8"
+    )
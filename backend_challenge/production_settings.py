@@ -6,6 +6,13 @@ from pathlib import Path
 
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "unsafe-secret-key")
 DEBUG = os.environ.get("DJANGO_DEBUG", "False") == "True"
+
+# Client-requested traces skip the response cache and expose DB timings, so
+# anonymous clients may only ask for them when explicitly allowed.
+GRAPHQL_TRACING = {
+    **GRAPHQL_TRACING,
+    "ALLOW_CLIENT_REQUESTS": os.environ.get("GRAPHQL_TRACING_CLIENTS", str(DEBUG)) == "True",
+}
 ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "*").split(",")
 
 DATABASES = {
@@ -18,3 +25,24 @@ DATABASES = {
         "PORT": os.environ.get("DJANGO_DB_PORT", ""),
     }
 }
+
+# Read replicas share the primary's engine and credentials. DJANGO_DB_REPLICAS
+# lists their hosts (host or host:port), or file paths for SQLite.
+for index, replica in enumerate(
+    filter(None, os.environ.get("DJANGO_DB_REPLICAS", "").split(","))
+):
+    replica = replica.strip()
+    if DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+        DATABASES[f"replica{index + 1}"] = {**DATABASES["default"], "NAME": replica}
+    else:
+        host, _, port = replica.partition(":")
+        DATABASES[f"replica{index + 1}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "PORT": port or DATABASES["default"]["PORT"],
+        }
+
+GRAPHQL_REPLICAS = {
+    **GRAPHQL_REPLICAS,
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+}
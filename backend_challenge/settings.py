@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,7 +32,6 @@ ALLOWED_HOSTS = ["localhost", "127.0.0.1", "testserver"]
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -42,6 +42,12 @@ INSTALLED_APPS = [
     "apps",
 ]
 
+# Reason: the admin's modules cost every worker startup time; deployments without it
+# set DJANGO_ADMIN_ENABLED=False to leave them unimported.
+ADMIN_ENABLED = os.environ.get("DJANGO_ADMIN_ENABLED", "True") == "True"
+if ADMIN_ENABLED:
+    INSTALLED_APPS.insert(0, "django.contrib.admin")
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -50,6 +56,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.replicas.PrimaryStickinessMiddleware",
 ]
 
 ROOT_URLCONF = "backend_challenge.urls"
@@ -84,6 +91,12 @@ DATABASES = {
     }
 }
 
+# Read replicas of "default": SQLite file paths here, hosts in production settings.
+for index, name in enumerate(filter(None, os.environ.get("DJANGO_DB_REPLICAS", "").split(","))):
+    DATABASES[f"replica{index + 1}"] = {**DATABASES["default"], "NAME": name.strip()}
+
+DATABASE_ROUTERS = ["apps.replicas.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -126,9 +139,136 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Carries subscription events to websocket consumers. The in-memory layer only
+# reaches consumers in the same process; multi-process deployments need a
+# shared layer such as channels_redis.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    }
+}
+
 GRAPHENE = {
     "SCHEMA": "apps.schema.schema",
-    "MIDDLEWARE": [
-        "graphene_django.debug.DjangoDebugMiddleware",
-    ],
+    "MIDDLEWARE": [],
+}
+
+# Per-operation SQL count, DB time and resolver time. Clients get them in
+# extensions.tracing by sending the header or {"extensions": {"tracing": true}};
+# SAMPLE_RATE traces that share of other requests and logs the result.
+GRAPHQL_TRACING = {
+    "SAMPLE_RATE": 0.0,
+    "ALLOW_CLIENT_REQUESTS": True,
+    "HEADER": "X-GraphQL-Trace",
+}
+
+# Number of parsed and validated GraphQL documents kept per process.
+GRAPHQL_DOCUMENT_CACHE_SIZE = 512
+
+# A JSON array POSTed to /graphql/ runs as one batch of operations sharing
+# their loaders; longer arrays are rejected.
+GRAPHQL_BATCH = {
+    "ENABLED": True,
+    "MAX_OPERATIONS": 25,
 }
+
+# Static cost limits enforced before a GraphQL operation executes. List sizes
+# given by variables are read from the request; unknown sizes are priced at the
+# field's cap (a connection's max_limit, MAX_NODE_IDS for nodes), and at
+# DEFAULT_LIST_SIZE only for lists without one.
+GRAPHQL_COMPLEXITY = {
+    "MAX_COST": 50000,
+    "MAX_DEPTH": 10,
+    "DEFAULT_LIST_SIZE": 100,
+    "FIELD_COSTS": {},
+}
+
+# Process-wide row cache under UserLoader and AppLoader (TTLs in seconds).
+# A write only invalidates the cache of the process that made it: with more
+# than one worker (`manage.py serve` starts one per CPU), other workers serve
+# the old row until TTL expires. Only enable it with a single worker process
+# or when reads up to TTL seconds stale are acceptable.
+GRAPHQL_ENTITY_CACHE = {
+    "ENABLED": False,
+    "MAX_SIZE": 10000,
+    "TTL": 30,
+    "NEGATIVE_TTL": 2,
+}
+
+# Rows read per server-side cursor fetch when a root connection is streamed
+# as application/x-ndjson.
+GRAPHQL_STREAM_CHUNK_SIZE = 500
+# Most rows one streamed response returns. Streams are cost-checked as if the
+# connection returned this many rows, or `first` if smaller.
+GRAPHQL_STREAM_MAX_ROWS = 10000
+
+# Maintain counter columns on User in every app write and serve
+# UserNode.appCount/activeAppCount from them instead of a GROUP BY over apps.
+# The columns are not maintained while this is off; run
+# refresh_app_counters() after turning it on.
+GRAPHQL_APP_COUNTERS = False
+
+# Prometheus metrics served at /metrics. Worker processes share totals through
+# MULTIPROCESS_DIR (or the GRAPHQL_METRICS_DIR environment variable). `serve`
+# clears it on start, or creates a temporary one when unset, and archives the
+# files of exited workers so their counts survive pid reuse.
+GRAPHQL_METRICS = {
+    "ENABLED": True,
+    "MULTIPROCESS_DIR": os.environ.get("GRAPHQL_METRICS_DIR") or None,
+    "FLUSH_INTERVAL": 5,
+    "MAX_OPERATION_NAMES": 200,
+}
+
+# Defaults for `manage.py serve`, the preforking server started by start.sh.
+GRAPHQL_SERVER = {
+    "INTERFACE": os.environ.get("WEB_INTERFACE", "asgi"),
+    "WORKERS": int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+    "THREADS": int(os.environ.get("WEB_THREADS", 4)),
+    "BACKLOG": 2048,
+    "GRACEFUL_TIMEOUT": 30,
+    # Idle keep-alive seconds (asgi); socket timeout and connections waiting
+    # for a thread before answering 503 (wsgi).
+    "KEEPALIVE_TIMEOUT": 5,
+    "TIMEOUT": 30,
+    "MAX_QUEUED": 64,
+}
+
+# Read replicas receiving query reads; a client that wrote reads from the
+# primary for STICKY_SECONDS afterwards.
+GRAPHQL_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+    "STICKY_SECONDS": float(os.environ.get("DJANGO_DB_STICKY_SECONDS", 5)),
+    "COOKIE": "graphql_primary_until",
+}
+
+# Opt-in whole-response cache for query operations, invalidated by row writes.
+# ETAGS sends an ETag with GET query responses and answers If-None-Match with
+# 304 until a row the response read is written. Both need CACHE_ALIAS to be
+# shared by all workers once there is more than one.
+GRAPHQL_RESPONSE_CACHE = {
+    "ENABLED": False,
+    "ETAGS": False,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": 60,
+    "ETAG_TIMEOUT": 86400,
+    "KEY_PREFIX": "graphql",
+}
+
+# Automatic persisted queries: clients register a query under its SHA-256
+# hash once, then send only the hash, including in GET requests.
+GRAPHQL_PERSISTED_QUERIES = {
+    "ENABLED": True,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": 86400,
+    "KEY_PREFIX": "graphql",
+}
+
+# Execute repeated query operations from plans compiled once per cached
+# document, reading UserNode/DeployedAppNode scalars straight off the rows.
+GRAPHQL_COMPILED_PLANS = False
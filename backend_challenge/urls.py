@@ -15,12 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from apps.schema import LimitedComplexityGraphQLView
+from apps.metrics import metrics_view
+from apps.views import AsyncGraphQLView, sdl_view
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("graphql/", csrf_exempt(LimitedComplexityGraphQLView.as_view(graphiql=True))),
+    path("graphql/", csrf_exempt(AsyncGraphQLView.as_view(graphiql=True))),
+    path("graphql/schema.graphql", sdl_view),
+    path("metrics", metrics_view),
 ]
+
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
@@ -8,9 +8,9 @@ until PGPASSWORD=$DJANGO_DB_PASSWORD psql -h "$DJANGO_DB_HOST" -U "$DJANGO_DB_US
 done
 
 python manage.py migrate
-python manage.py loaddata fixtures/users.json fixtures/apps.json
+python manage.py import_data --ignore-conflicts fixtures/users.json fixtures/apps.json
 
 # Run tests before starting the server
 pytest || { echo "Tests failed. Not starting server."; exit 1; }
 
-exec python manage.py runserver 0.0.0.0:8000
+exec python manage.py serve --bind 0.0.0.0:8000
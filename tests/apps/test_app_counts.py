@@ -0,0 +1,119 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from apps.models import User, DeployedApp, refresh_app_counters
+from apps.schema import schema
+
+COUNTS_QUERY = "{ allUsers { edges { node { username appCount activeAppCount } } } }"
+
+
+def _create_owners():
+    users = [User.objects.create(username=f"counter{i}", plan="HOBBY") for i in range(3)]
+    for i, user in enumerate(users):
+        for j in range(i * 2):
+            DeployedApp.objects.create(owner=user, active=j % 2 == 0)
+    return users
+
+
+@pytest.fixture
+def owners(db):
+    return _create_owners()
+
+
+@pytest.fixture
+def counted_owners(db, settings):
+    settings.GRAPHQL_APP_COUNTERS = True
+    return _create_owners()
+
+
+def _counts(result):
+    return {
+        edge["node"]["username"]: (edge["node"]["appCount"], edge["node"]["activeAppCount"])
+        for edge in result["data"]["allUsers"]["edges"]
+    }
+
+
+EXPECTED = {"counter0": (0, 0), "counter1": (2, 1), "counter2": (4, 2)}
+
+
+def test_counts_use_one_group_by_for_the_page(owners):
+    with CaptureQueriesContext(connection) as ctx:
+        result = Client(schema).execute(COUNTS_QUERY)
+    assert "errors" not in result, result
+    assert _counts(result) == EXPECTED
+    assert len(ctx.captured_queries) == 2
+    assert "GROUP BY" in ctx.captured_queries[1]["sql"]
+
+
+def test_async_counts_use_one_group_by(owners, run_async):
+    with CaptureQueriesContext(connection) as ctx:
+        result = run_async(schema.execute_async, COUNTS_QUERY)
+    assert result.errors is None
+    assert _counts({"data": result.data}) == EXPECTED
+    assert len(ctx.captured_queries) == 2
+
+
+def test_counter_columns_serve_counts_without_scanning_apps(counted_owners):
+    with CaptureQueriesContext(connection) as ctx:
+        result = Client(schema).execute(COUNTS_QUERY)
+    assert _counts(result) == EXPECTED
+    assert len(ctx.captured_queries) == 1
+
+
+def _counters(user):
+    user.refresh_from_db()
+    return user.app_count, user.active_app_count
+
+
+def test_app_writes_keep_counters_current(counted_owners):
+    first, second = counted_owners[1], counted_owners[2]
+    app = DeployedApp.objects.filter(owner=first, active=True).get()
+
+    app.active = False
+    app.save()
+    assert _counters(first) == (2, 0)
+
+    app.owner = second
+    app.active = True
+    app.save()
+    assert _counters(first) == (1, 0)
+    assert _counters(second) == (5, 3)
+
+    app.delete()
+    assert _counters(second) == (4, 2)
+
+    second.delete()
+    assert not DeployedApp.objects.filter(owner_id=second.id).exists()
+
+
+def test_user_save_does_not_overwrite_counters(counted_owners):
+    stale = User.objects.get(id=counted_owners[0].id)
+    DeployedApp.objects.create(owner=counted_owners[0])
+    stale.username = "renamed"
+    stale.save()
+    assert _counters(counted_owners[0]) == (1, 1)
+
+
+def test_refresh_repairs_counters_after_bulk_writes(counted_owners):
+    DeployedApp.objects.filter(owner=counted_owners[2]).update(active=False)
+    assert _counters(counted_owners[2]) == (4, 2)
+    refresh_app_counters([counted_owners[2].id])
+    assert _counters(counted_owners[2]) == (4, 0)
+    refresh_app_counters()
+    assert [_counters(user) for user in counted_owners] == [(0, 0), (2, 1), (4, 0)]
+
+
+def test_app_writes_leave_users_alone_when_counters_are_off(owners):
+    app = DeployedApp.objects.filter(owner=owners[1]).first()
+    with CaptureQueriesContext(connection) as ctx:
+        DeployedApp.objects.create(owner=owners[1])
+        app.active = not app.active
+        app.save()
+        app.delete()
+    assert not any('"apps_user"' in query["sql"] for query in ctx.captured_queries)
+    assert _counters(owners[1]) == (0, 0)
+
+    with CaptureQueriesContext(connection) as ctx:
+        owners[1].save()
+    assert '"app_count"' in ctx.captured_queries[-1]["sql"]
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphene.test import Client
+from apps.filters import filter_apps
+from apps.models import User, DeployedApp
+from apps.schema import encode_relay_id, schema
+
+
+@pytest.fixture
+def apps_by_plan(db):
+    now = timezone.now()
+    hobby = User.objects.create(username="filterhobby", plan="HOBBY")
+    pro = User.objects.create(username="filterpro", plan="PRO")
+    apps = {
+        "old_active": DeployedApp.objects.create(
+            owner=hobby, created_at=now - timedelta(days=10)
+        ),
+        "new_inactive": DeployedApp.objects.create(
+            owner=hobby, active=False, created_at=now - timedelta(days=1)
+        ),
+        "pro_active": DeployedApp.objects.create(
+            owner=pro, created_at=now - timedelta(days=5)
+        ),
+    }
+    return now, apps
+
+
+def _execute(query, variables=None):
+    with CaptureQueriesContext(connection) as ctx:
+        result = Client(schema).execute(query, variables=variables)
+    assert "errors" not in result, result
+    return result["data"], [q["sql"] for q in ctx.captured_queries]
+
+
+ALL_APPS = """
+query ($active: Boolean, $after: DateTime, $before: DateTime, $plan: AppsUserPlanChoices) {
+  allApps(active: $active, createdAfter: $after, createdBefore: $before, ownerPlan: $plan) {
+    edges { node { id active } }
+  }
+}
+"""
+
+
+@pytest.mark.parametrize(
+    "variables, expected",
+    [
+        ({"active": True}, {"old_active", "pro_active"}),
+        ({"active": False}, {"new_inactive"}),
+        ({"after": -6}, {"new_inactive", "pro_active"}),
+        ({"before": -3}, {"old_active", "pro_active"}),
+        ({"plan": "PRO"}, {"pro_active"}),
+        ({"active": True, "plan": "HOBBY", "before": -3}, {"old_active"}),
+    ],
+)
+def test_all_apps_filters_are_applied_in_sql(apps_by_plan, variables, expected):
+    now, apps = apps_by_plan
+    for name in ("after", "before"):
+        if name in variables:
+            variables[name] = (now + timedelta(days=variables[name])).isoformat()
+    data, queries = _execute(ALL_APPS, variables)
+    assert len(queries) == 1
+    returned = {edge["node"]["id"] for edge in data["allApps"]["edges"]}
+    names = {
+        name
+        for name, app in apps.items()
+        if encode_relay_id("DeployedAppNode", app.id) in returned
+    }
+    assert names == expected
+
+
+def test_user_apps_filters_batch_across_the_page(apps_by_plan):
+    data, queries = _execute(
+        "{ allUsers { edges { node { username apps(active: true) { edges { node { active } } } } } } }"
+    )
+    counts = {
+        edge["node"]["username"]: len(edge["node"]["apps"]["edges"])
+        for edge in data["allUsers"]["edges"]
+    }
+    assert counts == {"filterhobby": 1, "filterpro": 1}
+    assert len(queries) == 2
+    assert '"owner_id" IN' in queries[1]
+    assert '"active"' in queries[1]
+
+
+def _plan(queryset):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            # Reason: tiny test tables are cheaper to scan, which would hide index use.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+@pytest.mark.skipif(
+    connection.vendor not in ("sqlite", "postgresql"),
+    reason="Query plan format is backend specific.",
+)
+def test_filtered_app_queries_use_the_composite_and_partial_indexes(apps_by_plan):
+    now, apps = apps_by_plan
+    owner_ids = [apps["old_active"].owner_id, apps["pro_active"].owner_id]
+    per_owner = filter_apps(
+        DeployedApp.objects.filter(owner_id__in=owner_ids),
+        active=True,
+        created_after=now - timedelta(days=30),
+    )
+    assert "app_owner_active_created_idx" in _plan(per_owner)
+
+    active_page = filter_apps(DeployedApp.objects.all(), active=True).order_by(
+        "created_at", "id"
+    )[:10]
+    assert "app_active_created_id_idx" in _plan(active_page)
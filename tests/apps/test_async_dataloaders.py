@@ -1,47 +1,61 @@
-import pytest
 import asyncio
-from django.conf import settings
+import pytest
 from apps.dataloaders import AsyncUserLoader, AsyncAppLoader, AsyncUserAppsLoader
 from apps.models import User, DeployedApp
 
 
-# Skip async DataLoader tests on SQLite and PostgreSQL due to transaction isolation issues.
-pytestmark = pytest.mark.skipif(
-    settings.DATABASES['default']['ENGINE'] in [
-        'django.db.backends.sqlite3',
-        'django.db.backends.postgresql',
-        'django.db.backends.postgresql_psycopg2',
-    ],
-    reason="Async DataLoader tests are skipped on SQLite and PostgreSQL due to transaction isolation and async visibility limitations. These tests require a DB setup that supports async test isolation."
-)
-
-
 @pytest.mark.django_db
-def test_async_user_loader_batch():
+def test_async_user_loader_batch(run_async):
     u1 = User.objects.create(username="asyncuser1_unique", plan="HOBBY")
     u2 = User.objects.create(username="asyncuser2_unique", plan="PRO")
     loader = AsyncUserLoader()
-    result = asyncio.run(loader.load_many([u1.id, u2.id]))
+    result = run_async(loader.load_many, [u1.id, u2.id])
     assert result[0].username == "asyncuser1_unique"
     assert result[1].username == "asyncuser2_unique"
 
 
 @pytest.mark.django_db
-def test_async_app_loader_batch():
+def test_async_app_loader_batch(run_async):
     u = User.objects.create(username="asyncuser3_unique", plan="HOBBY")
     a1 = DeployedApp.objects.create(owner=u)
     a2 = DeployedApp.objects.create(owner=u)
     loader = AsyncAppLoader()
-    result = asyncio.run(loader.load_many([a1.id, a2.id]))
+    result = run_async(loader.load_many, [a1.id, a2.id])
     assert result[0].id == a1.id
     assert result[1].id == a2.id
 
 
 @pytest.mark.django_db
-def test_async_user_apps_loader_batch():
+def test_async_user_apps_loader_batch(run_async):
     u = User.objects.create(username="asyncuser4_unique", plan="PRO")
     a1 = DeployedApp.objects.create(owner=u)
     a2 = DeployedApp.objects.create(owner=u)
     loader = AsyncUserAppsLoader()
-    result = asyncio.run(loader.load_many([u.id]))
+    result = run_async(loader.load_many, [u.id])
     assert set(app.id for app in result[0]) == {a1.id, a2.id}
+
+
+@pytest.mark.django_db
+def test_async_loader_load_batches_one_tick(run_async):
+    u1 = User.objects.create(username="asyncuser5_unique", plan="HOBBY")
+    u2 = User.objects.create(username="asyncuser6_unique", plan="PRO")
+    loader = AsyncUserLoader()
+    calls = []
+    load_many = loader.load_many
+
+    async def counting_load_many(ids):
+        calls.append(list(ids))
+        return await load_many(ids)
+
+    loader.load_many = counting_load_many
+
+    async def load_both():
+        futures = [loader.load(u1.id), loader.load(u2.id)]
+        await asyncio.sleep(0)
+        assert len(loader._dispatches) == 1
+        return await asyncio.gather(*futures)
+
+    result = run_async(load_both)
+    assert not loader._dispatches
+    assert [u.username for u in result] == ["asyncuser5_unique", "asyncuser6_unique"]
+    assert calls == [[u1.id, u2.id]]
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from apps.schema import LimitedComplexityGraphQLView, schema, encode_relay_id
+from apps.models import User, DeployedApp
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [2, 20])
+def test_execute_async_batches_nested_loaders(run_async, count, create_users_with_apps):
+    create_users_with_apps(count)
+    query = "{ allApps { edges { node { id owner { username apps { edges { node { id } } } } } } } }"
+    with CaptureQueriesContext(connection) as ctx:
+        result = run_async(schema.execute_async, query)
+    assert result.errors is None
+    assert len(result.data["allApps"]["edges"]) == count * 2
+    assert len(ctx.captured_queries) == 2
+
+
+@pytest.mark.django_db
+def test_execute_async_node_lookup(run_async):
+    user = User.objects.create(username="asyncnode", plan="PRO")
+    query = f'{{ node(id: "{encode_relay_id("UserNode", user.id)}") {{ ... on UserNode {{ username plan }} }} }}'
+    result = run_async(schema.execute_async, query)
+    assert result.errors is None
+    assert result.data["node"] == {"username": "asyncnode", "plan": "PRO"}
+
+
+@pytest.mark.django_db
+def test_execute_async_nodes_batches_per_type(run_async, create_users_with_apps):
+    users = create_users_with_apps(3, apps_per_user=1)
+    app = DeployedApp.objects.filter(owner=users[1]).get()
+    ids = [encode_relay_id("UserNode", u.id) for u in users]
+    ids.insert(1, encode_relay_id("DeployedAppNode", app.id))
+    query = "query ($ids: [ID!]!) { nodes(ids: $ids) { id } }"
+    with CaptureQueriesContext(connection) as ctx:
+        result = run_async(schema.execute_async, query, variable_values={"ids": ids})
+    assert result.errors is None
+    assert [node["id"] for node in result.data["nodes"]] == ids
+    assert len(ctx.captured_queries) == 2
+
+
+@pytest.mark.django_db
+def test_async_view_serves_queries_and_mutations():
+    user = User.objects.create(username="asyncview", plan="HOBBY")
+    client = Client()
+    user_id = encode_relay_id("UserNode", user.id)
+    query = f'{{ node(id: "{user_id}") {{ ... on UserNode {{ plan }} }} }}'
+    resp = client.post(
+        "/graphql/", data=json.dumps({"query": query}), content_type="application/json"
+    )
+    assert resp.status_code == 200
+    assert resp.json()["data"]["node"]["plan"] == "HOBBY"
+
+    mutation = "mutation Up($id: ID!) { upgradeAccount(userId: $id) { ok user { plan } } }"
+    resp = client.post(
+        "/graphql/",
+        data=json.dumps({"query": mutation, "variables": {"id": user_id}}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 200
+    assert resp.json()["data"]["upgradeAccount"] == {"ok": True, "user": {"plan": "PRO"}}
+
+
+@pytest.mark.django_db
+def test_async_view_keeps_cache_calls_off_the_event_loop(settings, monkeypatch):
+    settings.GRAPHQL_RESPONSE_CACHE = {**settings.GRAPHQL_RESPONSE_CACHE, "ENABLED": True}
+    User.objects.create(username="asynccache", plan="HOBBY")
+    on_loop = {}
+
+    def spy(name):
+        method = getattr(LimitedComplexityGraphQLView, name)
+
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop[name] = True
+            except RuntimeError:
+                on_loop[name] = False
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(LimitedComplexityGraphQLView, name, wrapper)
+
+    for name in ("get_graphql_params", "check_etag", "store_etag", "store_response"):
+        spy(name)
+    response = Client().get("/graphql/", {"query": "{ allUsers { edges { node { id } } } }"})
+    assert response.status_code == 200
+    assert on_loop == dict.fromkeys(on_loop, False) and len(on_loop) == 4
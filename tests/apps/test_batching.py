@@ -0,0 +1,108 @@
+import json
+from unittest import mock
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from apps.models import User
+from apps.schema import LimitedComplexityGraphQLView, encode_relay_id
+from apps.views import AsyncGraphQLView
+
+NODES_QUERY = "query ($ids: [ID!]!) { nodes(ids: $ids) { ... on UserNode { username } } }"
+PLAN_QUERY = "query ($id: ID!) { node(id: $id) { ... on UserNode { plan } } }"
+UPGRADE_MUTATION = "mutation ($id: ID!) { upgradeAccount(userId: $id) { ok } }"
+
+
+def _post_batch(client, operations):
+    return client.post(
+        "/graphql/", data=json.dumps(operations), content_type="application/json"
+    )
+
+
+def _user_selects(queries):
+    table = f'FROM "{User._meta.db_table}"'
+    return [q for q in queries if q["sql"].startswith("SELECT") and table in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_batched_queries_share_one_loader_batch_and_keep_errors_apart():
+    a, b, c = (User.objects.create(username=name, plan="HOBBY") for name in "abc")
+    ids = [encode_relay_id("UserNode", user.id) for user in (a, b, c)]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = _post_batch(
+            Client(),
+            [
+                {"query": NODES_QUERY, "variables": {"ids": ids[:2]}},
+                {"query": "{ nope }"},
+                {"query": NODES_QUERY, "variables": {"ids": ids[1:]}},
+            ],
+        )
+
+    assert response.status_code == 200
+    first, invalid, last = response.json()
+    assert first["data"]["nodes"] == [{"username": "a"}, {"username": "b"}]
+    assert last["data"]["nodes"] == [{"username": "b"}, {"username": "c"}]
+    assert "nope" in invalid["errors"][0]["message"] and "data" not in invalid
+    selects = _user_selects(queries.captured_queries)
+    assert len(selects) == 1 and all(user.id in selects[0]["sql"] for user in (a, b, c))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sync_view", [False, True])
+def test_queries_after_a_mutation_see_its_write(rf, sync_view):
+    user = User.objects.create(username="batched", plan="HOBBY")
+    variables = {"id": encode_relay_id("UserNode", user.id)}
+    operations = [
+        {"query": PLAN_QUERY, "variables": variables},
+        {"query": UPGRADE_MUTATION, "variables": variables},
+        {"query": PLAN_QUERY, "variables": variables},
+    ]
+    if sync_view:
+        request = rf.post("/graphql/", json.dumps(operations), content_type="application/json")
+        body = json.loads(LimitedComplexityGraphQLView.as_view()(request).content)
+    else:
+        body = _post_batch(Client(), operations).json()
+
+    assert [result["data"] for result in body] == [
+        {"node": {"plan": "HOBBY"}},
+        {"upgradeAccount": {"ok": True}},
+        {"node": {"plan": "PRO"}},
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sync_view", [False, True])
+def test_batched_operations_resolve_their_parameters_once(rf, sync_view):
+    user = User.objects.create(username="resolved", plan="HOBBY")
+    variables = {"id": encode_relay_id("UserNode", user.id)}
+    operations = [
+        {"query": PLAN_QUERY, "variables": variables},
+        {"query": UPGRADE_MUTATION, "variables": variables},
+        {"query": "{ nope }"},
+    ]
+    view_class = LimitedComplexityGraphQLView if sync_view else AsyncGraphQLView
+    resolve = view_class.get_graphql_params
+    with mock.patch.object(
+        view_class, "get_graphql_params", autospec=True, side_effect=resolve
+    ) as get_graphql_params:
+        if sync_view:
+            request = rf.post(
+                "/graphql/", json.dumps(operations), content_type="application/json"
+            )
+            body = json.loads(view_class.as_view()(request).content)
+        else:
+            body = _post_batch(Client(), operations).json()
+
+    assert body[1]["data"] == {"upgradeAccount": {"ok": True}}
+    assert get_graphql_params.call_count == len(operations)
+
+
+@pytest.mark.django_db
+def test_oversized_and_empty_batches_are_rejected(settings):
+    settings.GRAPHQL_BATCH = {"ENABLED": True, "MAX_OPERATIONS": 2}
+    client = Client()
+    too_many = _post_batch(client, [{"query": "{ __typename }"}] * 3)
+    assert too_many.status_code == 400
+    assert "maximum of 2" in too_many.json()["errors"][0]["message"]
+    assert _post_batch(client, []).status_code == 400
@@ -0,0 +1,106 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from apps.benchmarks import (
+    QueryBudgetExceeded,
+    Scenario,
+    build_scenarios,
+    check_budgets,
+    percentile,
+    run_scenario,
+)
+from apps.models import DeployedApp, User, refresh_app_counters
+from apps.synthetic import generate_dataset
+
+
+@pytest.fixture
+def dataset(db):
+    return generate_dataset(120, apps_per_user=3, batch_size=50, seed=7)
+
+
+def test_generator_bulk_creates_consistent_rows(dataset):
+    users, apps = dataset
+    assert User.objects.count() == users == 120
+    assert DeployedApp.objects.count() == apps
+    counters = User.objects.order_by("id").values_list("app_count", "active_app_count")
+    generated = list(counters)
+    refresh_app_counters()
+    assert list(counters) == generated
+    # Reason: a second run continues the numbering instead of clashing on username.
+    assert generate_dataset(5, seed=7)[0] == 5
+    assert User.objects.filter(username="bench124").exists()
+
+
+def test_every_scenario_stays_within_its_query_budget(dataset):
+    plans = dict(User.objects.values_list("id", "plan"))
+    results = [
+        run_scenario(scenario, iterations=2, warmup=1) for scenario in build_scenarios(40)
+    ]
+    check_budgets(results)
+    assert all(result.rows > 0 for result in results)
+    assert {result.name.split(".")[0] for result in results} == {
+        "loader",
+        "resolver",
+        "query",
+        "tracing",
+        "standard",
+        "compiled",
+        "mutation",
+    }
+    rows = {result.name: result.rows for result in results}
+    assert rows["compiled.users_apps_owners"] == rows["standard.users_apps_owners"]
+    assert dict(User.objects.values_list("id", "plan")) == plans
+
+
+def test_per_row_queries_exceed_the_budget(dataset):
+    user_ids = list(User.objects.values_list("id", flat=True)[:5])
+    n_plus_one = Scenario(
+        "loader.per_row",
+        lambda: len([User.objects.get(id=user_id) for user_id in user_ids]),
+        1,
+    )
+    result = run_scenario(n_plus_one, iterations=1, warmup=0)
+    assert result.queries == 5
+    with pytest.raises(QueryBudgetExceeded, match="loader.per_row issued 5 queries"):
+        check_budgets([result])
+
+
+def test_percentile_uses_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+
+
+def test_commands_generate_and_report(db):
+    out = StringIO()
+    call_command(
+        "generate_synthetic_data", users=30, apps_per_user=2, batch_size=10, stdout=out
+    )
+    assert User.objects.count() == 30
+    assert "rows/s" in out.getvalue()
+
+    out = StringIO()
+    call_command(
+        "run_benchmarks",
+        iterations=1,
+        warmup=0,
+        sample=10,
+        json=True,
+        scenario=["loader."],
+        stdout=out,
+    )
+    results = json.loads(out.getvalue())
+    assert {result["name"] for result in results} == {
+        "loader.users",
+        "loader.apps",
+        "loader.user_apps",
+        "loader.app_counts",
+    }
+    assert all(result["within_budget"] for result in results)
+    with pytest.raises(CommandError):
+        call_command("run_benchmarks", scenario=["missing"], stdout=StringIO())
@@ -0,0 +1,102 @@
+import io
+import json
+from datetime import datetime, timezone
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from apps.bulk_import import BulkImportError, copy_value, iter_records
+from apps.ids import id_created_at
+from apps.models import DeployedApp, User
+
+FIXTURES = ["fixtures/users.json", "fixtures/apps.json"]
+
+
+def _import(*args):
+    out = io.StringIO()
+    call_command("import_data", *args, stdout=out)
+    return out.getvalue()
+
+
+def test_records_stream_from_arrays_and_ndjson():
+    records = [{"model": "apps.user", "pk": f"u_{index}", "fields": {}} for index in range(5)]
+    array = json.dumps(records, indent=2)
+    ndjson = "\n".join(json.dumps(record) for record in records) + "\n"
+    for text in (array, ndjson):
+        assert list(iter_records(io.StringIO(text), chunk_size=7)) == records
+    assert list(iter_records(io.StringIO("[]"))) == []
+
+    with pytest.raises(BulkImportError):
+        list(iter_records(io.StringIO('[{"model": "apps.user"'), chunk_size=4))
+    with pytest.raises(BulkImportError):
+        list(iter_records(io.StringIO("[1, 2]")))
+
+
+def test_copy_values_are_escaped():
+    assert copy_value(None) == "\\N"
+    assert copy_value(True) == "t"
+    assert copy_value("a\tb\\c\nd") == "a\\tb\\\\c\\nd"
+    moment = datetime(2025, 6, 17, 12, tzinfo=timezone.utc)
+    assert copy_value(moment) == "2025-06-17T12:00:00+00:00"
+
+
+@pytest.mark.django_db
+def test_fixtures_import_in_batches_with_counters(settings):
+    settings.GRAPHQL_APP_COUNTERS = True
+    output = _import(*FIXTURES, "--batch-size", "3", "--defer-indexes")
+
+    with open(FIXTURES[0]) as f:
+        users = json.load(f)
+    with open(FIXTURES[1]) as f:
+        apps = json.load(f)
+    assert User.objects.count() == len(users)
+    assert DeployedApp.objects.count() == len(apps)
+    assert "rows/s" in output
+    for user in User.objects.all():
+        assert user.app_count == user.apps.count()
+        assert user.active_app_count == user.apps.filter(active=True).count()
+    first = User.objects.get(pk=users[0]["pk"])
+    assert first.created_at == datetime(2025, 6, 17, 12, tzinfo=timezone.utc)
+
+    indexes = connection.introspection.get_constraints(
+        connection.cursor(), DeployedApp._meta.db_table
+    )
+    for index in DeployedApp._meta.indexes:
+        assert index.name in indexes
+
+    with pytest.raises(CommandError):
+        _import(FIXTURES[0])
+    User.objects.get(pk=users[0]["pk"]).delete()
+    output = _import(*FIXTURES, "--ignore-conflicts")
+    assert User.objects.count() == len(users)
+    # Reason: deleting the user cascaded to its apps, which are inserted again too.
+    apps_of_first = sum(app["fields"]["owner"] == users[0]["pk"] for app in apps)
+    assert f"Imported {1 + apps_of_first} rows" in output
+
+
+@pytest.mark.django_db
+def test_rows_without_keys_get_time_ordered_ids(tmp_path):
+    path = tmp_path / "users.ndjson"
+    path.write_text(
+        "\n".join(
+            json.dumps({"model": "apps.user", "fields": {"username": f"n{index}", "plan": "PRO"}})
+            for index in range(3)
+        )
+    )
+    _import(str(path))
+    ids = list(User.objects.order_by("username").values_list("id", flat=True))
+    assert ids == sorted(ids) and all(id_created_at(user_id, "u_") for user_id in ids)
+
+
+@pytest.mark.django_db
+def test_failed_first_batch_keeps_deferred_indexes_and_reports_the_conflict():
+    _import(*FIXTURES)
+    with pytest.raises(CommandError, match="--ignore-conflicts"):
+        _import(*FIXTURES, "--batch-size", "3", "--defer-indexes")
+
+    for model in (User, DeployedApp):
+        indexes = connection.introspection.get_constraints(
+            connection.cursor(), model._meta.db_table
+        )
+        for index in model._meta.indexes:
+            assert index.name in indexes
@@ -0,0 +1,105 @@
+import json
+import pytest
+from graphql import get_operation_ast
+from apps import compiler
+from apps.benchmarks import NESTED_QUERY, NODES_QUERY
+from apps.models import DeployedApp, User
+from apps.schema import LimitedComplexityGraphQLView, encode_relay_id
+
+ALIASED_QUERY = """
+query Users($first: Int!) {
+  allUsers(first: $first) {
+    edges { node { __typename key: id name: username plan createdAt ...Dates } }
+  }
+}
+fragment Dates on UserNode { updatedAt username }
+"""
+
+
+@pytest.fixture
+def users():
+    a = User.objects.create(username="compiled-a", plan="HOBBY")
+    b = User.objects.create(username="compiled-b", plan="PRO")
+    DeployedApp.objects.create(owner=a, active=True)
+    DeployedApp.objects.create(owner=b, active=False)
+    return a, b
+
+
+def _compiled_reads(monkeypatch):
+    reads = []
+    execute_fields = compiler.CompiledPlanMixin.execute_fields
+
+    def spy(self, parent_type, source_value, path, fields):
+        if self.read_leaves and id(fields) in self.plan.objects:
+            reads.append(parent_type.name)
+        return execute_fields(self, parent_type, source_value, path, fields)
+
+    monkeypatch.setattr(compiler.CompiledPlanMixin, "execute_fields", spy)
+    return reads
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sync_view", [False, True])
+def test_compiled_plans_return_the_standard_results(
+    rf, settings, monkeypatch, users, sync_view, post_graphql
+):
+    ids = [encode_relay_id("UserNode", user.id) for user in users] + ["bm9wZTox"]
+    cases = [
+        (NESTED_QUERY, {"first": 10}),
+        (ALIASED_QUERY, {"first": 10}),
+        (NODES_QUERY, {"ids": ids}),
+    ]
+    def post(query, variables):
+        if not sync_view:
+            return post_graphql(query, variables).json()
+        body = json.dumps({"query": query, "variables": variables})
+        request = rf.post("/graphql/", body, content_type="application/json")
+        return json.loads(LimitedComplexityGraphQLView.as_view()(request).content)
+
+    expected = [post(query, variables) for query, variables in cases]
+
+    settings.GRAPHQL_COMPILED_PLANS = True
+    reads = _compiled_reads(monkeypatch)
+    assert [post(query, variables) for query, variables in cases] == expected
+    assert {"UserNode", "DeployedAppNode"} <= set(reads)
+
+
+@pytest.mark.django_db
+def test_unsupported_values_and_operations_use_the_standard_executor(
+    settings, monkeypatch, users, post_graphql
+):
+    settings.GRAPHQL_COMPILED_PLANS = True
+    User.objects.filter(id=users[0].id).update(plan="")
+    reads = _compiled_reads(monkeypatch)
+
+    blank = post_graphql("{ allUsers { edges { node { username plan } } } }", {}).json()
+    assert "Cannot return null for non-nullable field UserNode.plan." in [
+        error["message"] for error in blank["errors"]
+    ]
+    assert reads
+
+    del reads[:]
+    skipped = post_graphql(
+        "query ($all: Boolean!) "
+        "{ allUsers { edges { node { username plan @include(if: $all) } } } }",
+        {"all": False},
+    ).json()
+    assert skipped["data"]["allUsers"]["edges"][1]["node"] == {"username": "compiled-b"}
+    assert reads == []
+
+
+@pytest.mark.django_db
+def test_plans_are_compiled_once_per_cached_document(settings):
+    settings.GRAPHQL_COMPILED_PLANS = True
+    view = LimitedComplexityGraphQLView()
+    entry = view.get_document(ALIASED_QUERY)
+    operation = get_operation_ast(entry.document, "Users")
+
+    plan = view.get_execution_plan(entry, operation)
+    assert plan is not None and view.get_execution_plan(entry, operation) is plan
+    assert view.get_document(ALIASED_QUERY).plans == {"Users": plan}
+
+    mutation = view.get_document("mutation { __typename }")
+    assert view.get_execution_plan(mutation, mutation.document.definitions[0]) is None
+    settings.GRAPHQL_COMPILED_PLANS = False
+    assert view.get_execution_plan(entry, operation) is None
@@ -0,0 +1,127 @@
+import pytest
+from graphql import parse
+from apps.complexity import QueryCost, QueryCostAnalyzer
+from apps.schema import MAX_NODE_IDS, encode_relay_id, list_size_limits, schema
+
+
+def _cost(query, **kwargs):
+    analyzer = QueryCostAnalyzer(schema.graphql_schema, **kwargs)
+    return analyzer.analyze(parse(query))
+
+
+def test_list_multipliers_use_first_or_default():
+    costs = _cost(
+        "query Q { allUsers(first: 10) { edges { node { username apps { edges { node { id } } } } } } }",
+        default_list_size=50,
+    )
+    # allUsers (1) + 10 users x apps (1).
+    assert costs["Q"] == QueryCost(cost=11, depth=3)
+
+
+def test_nested_fan_out_is_multiplied():
+    costs = _cost(
+        "{ allApps { edges { node { owner { apps { edges { node { owner { username } } } } } } } } }",
+        default_list_size=100,
+    )
+    # allApps 1 + 100 * (owner 1 + apps 1 + 100 * owner 1)
+    assert costs[None].cost == 1 + 100 * (1 + 1 + 100)
+
+
+def test_fragments_are_followed_and_branches_take_the_max():
+    query = """
+    query Q($id: ID!) {
+      node(id: $id) {
+        ... on UserNode { ...UserApps }
+        ... on DeployedAppNode { owner { username } }
+      }
+    }
+    fragment UserApps on UserNode { apps(first: 5) { edges { node { owner { id } } } } }
+    """
+    costs = _cost(query)
+    # node 1 + max(UserNode: apps 1 + 5 * owner 1, DeployedAppNode: owner 1)
+    assert costs["Q"] == QueryCost(cost=7, depth=4)
+
+
+def test_variable_sizes_use_their_values_or_the_field_cap():
+    query = """
+    query Q($ids: [ID!]!, $first: Int) {
+      nodes(ids: $ids) { ... on UserNode { apps(first: $first) { edges { node { id } } } } }
+    }
+    """
+    limits = list_size_limits(schema.graphql_schema)
+    assert limits["Query.nodes"] == MAX_NODE_IDS
+    assert limits["Query.allUsers"] == limits["UserNode.apps"] == 100
+
+    cached = _cost(query, list_sizes=limits, default_list_size=10)
+    # nodes 1 + 500 users x (apps 1 + 100 apps x 0)
+    assert cached["Q"] == QueryCost(cost=1 + MAX_NODE_IDS, depth=3, uses_variables=True)
+
+    analyzer = QueryCostAnalyzer(schema.graphql_schema, list_sizes=limits)
+    priced = analyzer.analyze(parse(query), {"ids": ["a", "b"], "first": None})
+    assert priced["Q"].cost == 1 + 2
+
+
+@pytest.mark.django_db
+def test_view_reports_cost_and_allows_wide_cheap_queries(post_graphql):
+    fields = " ".join(f"f{i}: allUsers(first: 1) {{ edges {{ cursor }} }}" for i in range(11))
+    resp = post_graphql(f"{{ {fields} }}")
+    assert resp.status_code == 200
+    assert resp.json()["extensions"]["cost"]["requestedQueryCost"] == 11
+
+
+def test_relay_wrappers_add_no_depth(post_graphql):
+    query = (
+        "{ allApps { pageInfo { hasNextPage } edges { node { owner {"
+        " apps { edges { node { owner { username } } } } } } } } }"
+    )
+    # allApps > owner > apps > owner > username
+    assert _cost(query)[None].depth == 5
+
+
+@pytest.mark.django_db
+def test_view_allows_ordinary_nested_connections(post_graphql):
+    resp = post_graphql(
+        "{ allApps(first: 5) { edges { node { owner { apps(first: 5) { edges { node {"
+        " owner { apps(first: 5) { edges { node { id } } } } } } } } } } } }"
+    )
+    assert resp.status_code == 200
+    assert resp.json()["extensions"]["cost"]["depth"] == 6
+
+
+@pytest.mark.django_db
+def test_view_rejects_costly_and_deep_queries(post_graphql):
+    nested = "{ allUsers { edges { node { username } } } }"
+    for _ in range(5):
+        nested = nested.replace(
+            "username", "apps { edges { node { owner { username } } } }", 1
+        )
+    resp = post_graphql(nested)
+    assert resp.status_code == 400
+    messages = [e["message"] for e in resp.json()["errors"]]
+    assert any("too complex" in m for m in messages)
+    assert any("too deep" in m for m in messages)
+    assert resp.json()["extensions"]["cost"]["requestedQueryCost"] > 50000
+
+
+@pytest.mark.django_db
+def test_view_prices_variable_sizes_with_the_request_variables(post_graphql):
+    query = (
+        "query Q($first: Int) { allUsers(first: $first) "
+        "{ edges { node { apps { edges { node { owner { id } } } } } } } }"
+    )
+    # allUsers 1 + first x (apps 1 + 100 x owner 1)
+    resp = post_graphql(query, {"first": 3})
+    assert resp.json()["extensions"]["cost"]["requestedQueryCost"] == 1 + 3 * 101
+
+    resp = post_graphql(query)
+    assert resp.status_code == 200
+    assert resp.json()["extensions"]["cost"]["requestedQueryCost"] == 1 + 100 * 101
+
+    nodes = (
+        "query ($ids: [ID!]!) { nodes(ids: $ids) "
+        "{ ... on UserNode { apps(first: 1) { edges { cursor } } } } }"
+    )
+    ids = [encode_relay_id("UserNode", "missing")] * 2
+    # nodes 1 + 2 ids x apps 1, not MAX_NODE_IDS x apps 1
+    cost = post_graphql(nodes, {"ids": ids}).json()["extensions"]["cost"]
+    assert cost["requestedQueryCost"] == 3
@@ -1,45 +1,37 @@
 import pytest
-import time
 from apps.dataloaders import UserLoader, AppLoader, UserAppsLoader
 from apps.models import User, DeployedApp
+from apps.synthetic import generate_dataset
+
+# Reason: query counts are deterministic, so an N+1 regression fails here on any
+# machine; timings live in the run_benchmarks command instead.
 
 
 @pytest.mark.django_db
-def test_dataloader_performance_many_users():
-    users = [
-        User.objects.create(username=f"perfuser{i}", plan="HOBBY") for i in range(100)
-    ]
+def test_dataloader_performance_many_users(django_assert_num_queries):
+    generate_dataset(1000, apps_per_user=0)
+    user_ids = list(User.objects.values_list("id", flat=True))
     loader = UserLoader()
-    start = time.time()
-    result = loader.load_many([u.id for u in users])
-    elapsed = time.time() - start
-    assert len(result) == 100
-    assert elapsed < 1.0  # Should be fast for 100 users
+    with django_assert_num_queries(1):
+        result = loader.load_many(user_ids)
+    assert [u.id for u in result] == user_ids
 
 
 @pytest.mark.django_db
-def test_dataloader_performance_many_apps():
-    u = User.objects.create(username="perfuser_apps", plan="PRO")
-    apps = [DeployedApp.objects.create(owner=u) for _ in range(200)]
+def test_dataloader_performance_many_apps(django_assert_num_queries):
+    generate_dataset(200, apps_per_user=5)
+    app_ids = list(DeployedApp.objects.values_list("id", flat=True))
     loader = AppLoader()
-    start = time.time()
-    result = loader.load_many([a.id for a in apps])
-    elapsed = time.time() - start
-    assert len(result) == 200
-    assert elapsed < 1.0  # Should be fast for 200 apps
+    with django_assert_num_queries(1):
+        result = loader.load_many(app_ids)
+    assert [a.id for a in result] == app_ids
 
 
 @pytest.mark.django_db
-def test_user_apps_loader_performance():
-    users = [
-        User.objects.create(username=f"perfuserapps{i}", plan="PRO") for i in range(10)
-    ]
-    for u in users:
-        for _ in range(20):
-            DeployedApp.objects.create(owner=u)
+def test_user_apps_loader_performance(django_assert_num_queries):
+    generate_dataset(300, apps_per_user=4)
+    users = list(User.objects.all())
     loader = UserAppsLoader()
-    start = time.time()
-    result = loader.load_many([u.id for u in users])
-    elapsed = time.time() - start
-    assert all(len(apps) == 20 for apps in result)
-    assert elapsed < 1.0  # Should be fast for 200 apps
+    with django_assert_num_queries(1):
+        result = loader.load_many([u.id for u in users])
+    assert [len(apps) for apps in result] == [u.app_count for u in users]
@@ -0,0 +1,48 @@
+import json
+import pytest
+from django.test import Client
+from apps.document_cache import CachedDocument, DocumentCache
+from apps.schema import LimitedComplexityGraphQLView
+
+
+def test_document_cache_evicts_least_recently_used():
+    cache = DocumentCache(maxsize=2)
+    for name in ("a", "b"):
+        cache.put(cache.key(name), CachedDocument(name, [], 1))
+    assert cache.get(cache.key("a")).document == "a"
+    cache.put(cache.key("c"), CachedDocument("c", [], 1))
+    assert cache.get(cache.key("b")) is None
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_view_reuses_parsed_and_validated_documents():
+    cache = LimitedComplexityGraphQLView.document_cache
+    cache.clear()
+    client = Client()
+    body = json.dumps({"query": "{ allUsers(first: 1) { edges { node { id } } } }"})
+    for _ in range(3):
+        resp = client.post("/graphql/", data=body, content_type="application/json")
+        assert resp.status_code == 200
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+    assert stats["size"] == 1
+
+
+@pytest.mark.django_db
+def test_view_caches_validation_errors():
+    LimitedComplexityGraphQLView.document_cache.clear()
+    client = Client()
+    body = json.dumps({"query": "{ noSuchField }"})
+    for _ in range(2):
+        resp = client.post("/graphql/", data=body, content_type="application/json")
+        assert resp.status_code == 400
+        assert "noSuchField" in resp.json()["errors"][0]["message"]
+    assert LimitedComplexityGraphQLView.document_cache.stats()["hits"] == 1
@@ -0,0 +1,126 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from apps.dataloaders import (
+    AsyncUserLoader,
+    EntityCache,
+    UserLoader,
+    entity_cache,
+)
+from apps.models import User
+from apps.replicas import pin_primary
+from apps.schema import encode_relay_id, schema
+
+
+@pytest.fixture(autouse=True)
+def enable_entity_cache(settings):
+    settings.GRAPHQL_ENTITY_CACHE = {**settings.GRAPHQL_ENTITY_CACHE, "ENABLED": True}
+
+
+def _load(ids):
+    with CaptureQueriesContext(connection) as ctx:
+        result = UserLoader().load_many(ids)
+    return result, len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_only_missing_keys_reach_the_database():
+    users = [User.objects.create(username=f"ecuser{i}", plan="HOBBY") for i in range(3)]
+    _load([users[0].id])
+    with CaptureQueriesContext(connection) as ctx:
+        result = UserLoader().load_many([u.id for u in users])
+    assert [u.username for u in result] == ["ecuser0", "ecuser1", "ecuser2"]
+    assert len(ctx.captured_queries) == 1
+    assert users[0].id not in ctx.captured_queries[0]["sql"]
+
+    result, queries = _load([u.id for u in users])
+    assert queries == 0
+    # Reason: every read builds a fresh instance, so requests cannot share mutations.
+    assert result[0] is not _load([users[0].id])[0][0]
+
+
+@pytest.mark.django_db
+def test_save_invalidates_cached_row():
+    user = User.objects.create(username="ecsaved", plan="HOBBY")
+    _load([user.id])
+    user.plan = "PRO"
+    user.save()
+    result, queries = _load([user.id])
+    assert queries == 1
+    assert result[0].plan == "PRO"
+
+
+@pytest.mark.django_db
+def test_missing_ids_are_cached_briefly():
+    result, queries = _load(["u_missing"])
+    assert result == [None] and queries == 1
+    result, queries = _load(["u_missing"])
+    assert result == [None] and queries == 0
+
+    user = User(id="u_missing", username="ecnew", plan="HOBBY")
+    user.save()
+    result, queries = _load(["u_missing"])
+    assert result[0].username == "ecnew"
+
+
+def test_entries_expire_and_lru_is_bounded():
+    cache = EntityCache(maxsize=2, ttl=60, negative_ttl=0)
+    snapshot = cache.snapshot()
+    cache.put_many(User, ["a"], [], snapshot)
+    assert cache.get_many(User, ["a"]) == {}
+
+    users = [User(id=f"u_{i}", username=f"lru{i}", plan="HOBBY") for i in range(3)]
+    cache.put_many(User, [u.id for u in users], users, snapshot)
+    assert set(cache.get_many(User, ["u_0", "u_1", "u_2"])) == {"u_1", "u_2"}
+
+
+def test_rows_fetched_before_an_invalidation_are_not_stored():
+    cache = EntityCache()
+    user = User(id="u_race", username="race", plan="HOBBY")
+    snapshot = cache.snapshot()
+    cache.invalidate(User, user.id)
+    cache.put_many(User, [user.id], [user], snapshot)
+    assert cache.get_many(User, [user.id]) == {}
+
+
+@pytest.mark.django_db
+def test_node_lookups_share_the_cache_across_requests():
+    user = User.objects.create(username="ecnode", plan="HOBBY")
+    query = '{ node(id: "%s") { ... on UserNode { username } } }' % encode_relay_id(
+        "UserNode", user.id
+    )
+    Client(schema).execute(query)
+    with CaptureQueriesContext(connection) as ctx:
+        result = Client(schema).execute(query)
+    assert result["data"]["node"]["username"] == "ecnode"
+    assert len(ctx.captured_queries) == 0
+    assert entity_cache.stats()["hits"] >= 1
+
+
+@pytest.mark.django_db
+def test_async_loader_uses_the_cache(run_async):
+    user = User.objects.create(username="ecasync", plan="HOBBY")
+    _load([user.id])
+
+    async def load():
+        return await AsyncUserLoader().load(user.id)
+
+    with CaptureQueriesContext(connection) as ctx:
+        loaded = run_async(load)
+    assert loaded.username == "ecasync"
+    assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_disabled_cache_and_pinned_clients_read_the_database(settings):
+    user = User.objects.create(username="ecpinned", plan="HOBBY")
+    _load([user.id])
+    with pin_primary():
+        assert _load([user.id])[1] == 1
+
+    settings.GRAPHQL_ENTITY_CACHE = {**settings.GRAPHQL_ENTITY_CACHE, "ENABLED": False}
+    entity_cache.clear()
+    _load([user.id])
+    assert _load([user.id])[1] == 1
+    assert entity_cache.stats()["size"] == 0
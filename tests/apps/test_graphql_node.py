@@ -1,6 +1,13 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from graphene.test import Client
-from apps.schema import schema
+from apps.schema import (
+    decode_relay_ids,
+    encode_relay_id,
+    encode_relay_ids,
+    schema,
+)
 from apps.models import User, DeployedApp
 
 
@@ -10,9 +17,9 @@ def test_node_query_user():
     client = Client(schema)
     global_id = f"VXNlck5vZGU6{user.id}"  # This is not the real encoding, but graphene will encode automatically
     # Get the real global id from graphene
-    query = """{ allUsers { id username } }"""
+    query = """{ allUsers(last: 1) { edges { node { id username } } } }"""
     result = client.execute(query)
-    user_id = result["data"]["allUsers"][-1]["id"]
+    user_id = result["data"]["allUsers"]["edges"][-1]["node"]["id"]
     node_query = (
         f"""{{ node(id: "{user_id}") {{ ... on UserNode {{ id username plan }} }} }}"""
     )
@@ -26,9 +33,61 @@ def test_node_query_app():
     user = User.objects.create(username="testnodeappuser", plan="PRO")
     app = DeployedApp.objects.create(owner=user)
     client = Client(schema)
-    query = """{ allApps { id active owner { id username } } }"""
+    query = """{ allApps(last: 1) { edges { node { id active owner { id username } } } } }"""
     result = client.execute(query)
-    app_id = result["data"]["allApps"][-1]["id"]
+    app_id = result["data"]["allApps"]["edges"][-1]["node"]["id"]
     node_query = f"""{{ node(id: "{app_id}") {{ ... on DeployedAppNode {{ id active owner {{ username }} }} }} }}"""
     node_result = client.execute(node_query)
     assert node_result["data"]["node"]["owner"]["username"] == "testnodeappuser"
+
+
+NODES_QUERY = """
+query ($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    __typename
+    ... on UserNode { username }
+    ... on DeployedAppNode { active owner { username } }
+  }
+}
+"""
+
+
+@pytest.mark.django_db
+def test_nodes_returns_input_order_with_nulls_for_misses():
+    users = [User.objects.create(username=f"nodes{i}", plan="HOBBY") for i in range(3)]
+    apps = [DeployedApp.objects.create(owner=users[0]) for _ in range(2)]
+    ids = [
+        encode_relay_id("DeployedAppNode", apps[1].id),
+        encode_relay_id("UserNode", users[2].id),
+        encode_relay_id("UserNode", "u_missing"),
+        "not-an-id",
+        encode_relay_id("UserNode", users[0].id),
+        encode_relay_id("DeployedAppNode", apps[0].id),
+    ]
+    with CaptureQueriesContext(connection) as ctx:
+        result = Client(schema).execute(NODES_QUERY, variables={"ids": ids})
+    assert "errors" not in result, result
+    nodes = result["data"]["nodes"]
+    assert [n and n["__typename"] for n in nodes] == [
+        "DeployedAppNode",
+        "UserNode",
+        None,
+        None,
+        "UserNode",
+        "DeployedAppNode",
+    ]
+    assert nodes[1]["username"] == "nodes2"
+    assert nodes[5]["owner"]["username"] == "nodes0"
+    # One batch per type; the apps' owner was already loaded with the users.
+    assert len(ctx.captured_queries) == 2
+
+
+def test_relay_id_batch_helpers_round_trip():
+    ids = encode_relay_ids("UserNode", ["u_a", "u_b"])
+    assert ids == [encode_relay_id("UserNode", i) for i in ["u_a", "u_b"]]
+    assert decode_relay_ids(ids + ["%%%", "bm9jb2xvbg=="]) == [
+        ("UserNode", "u_a"),
+        ("UserNode", "u_b"),
+        None,
+        None,
+    ]
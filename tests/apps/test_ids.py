@@ -0,0 +1,75 @@
+import time
+from datetime import datetime, timezone
+import pytest
+from graphene.test import Client
+import apps.models
+from apps.ids import IdAllocator, id_created_at
+from apps.models import DeployedApp, User, generate_app_id, generate_user_id
+from apps.schema import encode_relay_id, schema
+
+
+def test_ids_are_increasing_and_carry_creation_time():
+    before = datetime.now(timezone.utc).replace(microsecond=0)
+    ids = [generate_user_id() for _ in range(1000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(len(user_id) == 18 and user_id[2:].isalnum() for user_id in ids)
+    assert before <= id_created_at(ids[0], "u_") <= datetime.now(timezone.utc)
+    assert len(generate_app_id()) == 20
+
+
+def test_allocator_stays_ordered_when_a_millisecond_runs_out(monkeypatch):
+    allocator = IdAllocator()
+    monkeypatch.setattr(time, "time_ns", lambda: 1_700_000_000_000_000_000)
+    bodies = allocator.allocate(3)
+    monkeypatch.setattr("apps.ids._SEQUENCE_LIMIT", allocator._sequence)
+    bodies += allocator.allocate(2)
+    assert bodies == sorted(bodies)
+    assert bodies[3][:10] > bodies[2][:10]
+
+
+@pytest.mark.django_db
+def test_existing_ids_still_resolve():
+    user = User.objects.create(id="u_AbC123xyZ9", username="legacy", plan="HOBBY")
+    assert id_created_at(user.id, "u_") is None
+    result = Client(schema).execute(
+        "query ($id: ID!) { node(id: $id) { ... on UserNode { username } } }",
+        variables={"id": encode_relay_id("UserNode", user.id)},
+    )
+    assert result == {"data": {"node": {"username": "legacy"}}}
+
+
+@pytest.mark.django_db
+def test_bulk_create_assigns_ids_in_order():
+    users = User.objects.bulk_create(
+        [User(username=f"bulk{index}", plan="HOBBY") for index in range(5)]
+        + [User(id="u_keepthisid", username="kept", plan="HOBBY")]
+    )
+    ids = [user.id for user in users[:5]]
+    assert ids == sorted(ids) and all(id_created_at(user_id, "u_") for user_id in ids)
+    assert users[5].id == "u_keepthisid"
+    assert User.objects.count() == 6
+
+
+@pytest.mark.django_db
+def test_colliding_ids_are_replaced(monkeypatch):
+    owner = User.objects.create(username="owner", plan="HOBBY")
+    app = DeployedApp.objects.create(owner=owner)
+    allocate_ids = apps.models.allocate_ids
+    collisions = {"u_": [owner.id], "app_": [app.id, app.id]}
+
+    def colliding_allocate_ids(prefix, count):
+        taken = collisions[prefix][:count]
+        del collisions[prefix][:count]
+        return taken + allocate_ids(prefix, count - len(taken))
+
+    monkeypatch.setattr(apps.models, "allocate_ids", colliding_allocate_ids)
+    user = User.objects.create(username="second", plan="PRO")
+    apps_created = DeployedApp.objects.bulk_create(
+        [DeployedApp(owner=owner), DeployedApp(owner=owner, active=False)]
+    )
+
+    assert user.id != owner.id
+    assert User.objects.get(id=owner.id).username == "owner"
+    assert len({app.id} | {created.id for created in apps_created}) == 3
+    assert DeployedApp.objects.count() == 3
@@ -21,14 +21,18 @@ def test_user_registration_and_query():
     query = '''
     query {
       allUsers {
-        id
-        username
-        plan
-        apps {
-          edges {
-            node {
-              id
-              active
+        edges {
+          node {
+            id
+            username
+            plan
+            apps {
+              edges {
+                node {
+                  id
+                  active
+                }
+              }
             }
           }
         }
@@ -45,7 +49,7 @@ def test_user_registration_and_query():
     assert response.status_code == 200
     data = response.json()
     assert 'data' in data
-    users = data['data']['allUsers']
+    users = [edge['node'] for edge in data['data']['allUsers']['edges']]
     assert isinstance(users, list)
     assert 'id' in users[0]
     assert 'username' in users[0]
@@ -60,10 +64,10 @@ def test_user_registration_and_query():
 def test_upgrade_and_downgrade_account():
     client = Client()
     user_query = '''
-    query { allUsers { id username plan } }
+    query { allUsers(first: 1) { edges { node { id username plan } } } }
     '''
     resp = client.post("/graphql/", data=json.dumps({'query': user_query}), content_type='application/json')
-    user_id = resp.json()['data']['allUsers'][0]['id']
+    user_id = resp.json()['data']['allUsers']['edges'][0]['node']['id']
 
     # Upgrade
     upgrade_mut = '''
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+from unittest import mock
+import pytest
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from apps.metrics import (
+    ARCHIVE_FILE,
+    CACHE_ENTRIES,
+    CACHE_HITS,
+    FIELD_DURATION,
+    LOADER_BATCH_SIZE,
+    prepare_multiprocess_dir,
+    process_snapshots,
+    registry,
+    render_prometheus,
+)
+from apps.dataloaders import entity_cache
+from apps.models import User, DeployedApp
+from apps.schema import LimitedComplexityGraphQLView, encode_relay_ids
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def users(db):
+    users = [User.objects.create(username=f"measured{i}", plan="HOBBY") for i in range(3)]
+    for user in users:
+        DeployedApp.objects.create(owner=user)
+    return users
+
+
+def _scrape():
+    response = Client().get("/metrics")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+NODES_QUERY = """
+query Owners($ids: [ID!]!) {
+  nodes(ids: $ids) { ... on UserNode { username apps { edges { node { id } } } } }
+}
+"""
+
+
+def test_fields_operations_and_batches_are_exported(users, post_graphql):
+    ids = encode_relay_ids("UserNode", [user.id for user in users])
+    assert "errors" not in post_graphql(NODES_QUERY, {"ids": ids}).json()
+    samples = _scrape()
+
+    assert samples['graphql_field_duration_seconds_count{type="Query",field="nodes"}'] == 1
+    assert samples['graphql_field_duration_seconds_count{type="UserNode",field="apps"}'] == 3
+    assert 'graphql_field_duration_seconds_count{type="UserNode",field="username"}' not in samples
+    assert samples[
+        'graphql_operation_duration_seconds_count{operation="Owners",operation_type="query"}'
+    ] == 1
+    assert samples['graphql_loader_batch_size_bucket{loader="AsyncUserLoader",le="5.0"}'] == 1
+    assert samples['graphql_loader_batch_size_bucket{loader="AsyncUserLoader",le="2.0"}'] == 0
+    assert samples['graphql_loader_batch_size_sum{loader="AsyncUserLoader"}'] == 3
+
+
+def test_cache_stats_are_exported(users, post_graphql):
+    document_cache = LimitedComplexityGraphQLView.document_cache
+    document_cache.clear()
+    entity_cache.clear()
+    ids = encode_relay_ids("UserNode", [user.id for user in users])
+    for _ in range(2):
+        assert "errors" not in post_graphql(NODES_QUERY, {"ids": ids}).json()
+    samples = _scrape()
+
+    stats = document_cache.stats()
+    assert samples['graphql_cache_hits_total{cache="document"}'] == stats["hits"] == 1
+    assert samples['graphql_cache_misses_total{cache="document"}'] == stats["misses"]
+    assert samples['graphql_cache_entries{cache="document"}'] == stats["size"]
+    assert samples['graphql_cache_max_entries{cache="document"}'] == stats["maxsize"]
+    assert samples['graphql_cache_evictions_total{cache="document"}'] == 0
+    stats = entity_cache.stats()
+    assert samples['graphql_cache_hits_total{cache="entity"}'] == stats["hits"]
+    assert samples['graphql_cache_entries{cache="entity"}'] == stats["size"]
+    assert 'graphql_cache_evictions_total{cache="entity"}' not in samples
+
+
+def test_errors_are_counted_on_the_sync_path(users):
+    request = RequestFactory().post(
+        "/graphql/",
+        data=json.dumps({"query": '{ node(id: "bad") { id } }'}),
+        content_type="application/json",
+    )
+    LimitedComplexityGraphQLView.as_view()(request)
+    samples = _scrape()
+    assert samples['graphql_field_errors_total{type="Query",field="node"}'] == 1
+    assert samples[
+        'graphql_operation_errors_total{operation="anonymous",operation_type="query"}'
+    ] == 1
+
+
+def test_threads_record_without_sharing_a_shard():
+    def work():
+        for _ in range(1000):
+            registry.observe(LOADER_BATCH_SIZE, ("ThreadLoader",), 3)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    series = registry.collect()[(LOADER_BATCH_SIZE.name, ("ThreadLoader",))]
+    assert sum(series[:-1]) == 4000
+    assert series[-1] == 12000
+
+
+def test_worker_snapshots_are_merged(tmp_path):
+    other = [[LOADER_BATCH_SIZE.name, ["SharedLoader"], [0, 2] + [0] * 9 + [4.0]]]
+    (tmp_path / "metrics-1.json").write_text(json.dumps(other))
+    registry.observe(LOADER_BATCH_SIZE, ("SharedLoader",), 2)
+    with override_settings(GRAPHQL_METRICS={"MULTIPROCESS_DIR": str(tmp_path)}):
+        samples = _scrape()
+    assert samples['graphql_loader_batch_size_count{loader="SharedLoader"}'] == 3
+    assert samples['graphql_loader_batch_size_sum{loader="SharedLoader"}'] == 6.0
+    assert len(list(tmp_path.glob("metrics-*.json"))) == 2
+
+
+def test_exited_workers_are_archived_and_fresh_starts_clear_the_directory(
+    tmp_path, settings
+):
+    series = [[LOADER_BATCH_SIZE.name, ["SharedLoader"], [0, 2] + [0] * 9 + [4.0]]]
+    series.append([CACHE_HITS.name, ["entity"], 3])
+    series.append([CACHE_ENTRIES.name, ["entity"], 7])
+    for pid in (101, 102):
+        (tmp_path / f"metrics-{pid}.json").write_text(json.dumps(series))
+    process_snapshots.archive(str(tmp_path), 101)
+    process_snapshots.archive(str(tmp_path), 102)
+    assert [path.name for path in tmp_path.iterdir()] == [ARCHIVE_FILE]
+    merged = process_snapshots.load(str(tmp_path))
+    assert merged[(LOADER_BATCH_SIZE.name, ("SharedLoader",))][1] == 4
+    assert merged[(CACHE_HITS.name, ("entity",))] == 6
+    assert (CACHE_ENTRIES.name, ("entity",)) not in merged
+
+    settings.GRAPHQL_METRICS = {"MULTIPROCESS_DIR": str(tmp_path)}
+    with mock.patch.dict(os.environ, clear=True):
+        assert prepare_multiprocess_dir(reloading=True) == (str(tmp_path), False)
+        assert (tmp_path / ARCHIVE_FILE).exists()
+        prepare_multiprocess_dir()
+        assert list(tmp_path.iterdir()) == []
+
+        settings.GRAPHQL_METRICS = {}
+        directory, temporary = prepare_multiprocess_dir()
+        assert temporary and os.environ["GRAPHQL_METRICS_DIR"] == directory
+    os.rmdir(directory)
+
+
+def test_label_values_are_escaped():
+    registry.observe(FIELD_DURATION, ('Odd"Type', "a\\b\nc"), 0.002)
+    text = render_prometheus(registry.collect())
+    assert re.search(r'type="Odd\\"Type",field="a\\\\b\\nc",le="0\.0025"\} 1', text)
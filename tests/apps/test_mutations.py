@@ -1,7 +1,10 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from graphene.test import Client
-from apps.schema import schema
+from apps.schema import encode_relay_id, schema
 from apps.models import User
+from apps.plans import CHANGED, change_plans
 
 
 @pytest.mark.django_db
@@ -9,9 +12,9 @@ def test_upgrade_account_mutation():
     user = User.objects.create(username="mutuser1", plan="HOBBY")
     client = Client(schema)
     # Get relay global id
-    query = "{ allUsers { id username plan } }"
+    query = "{ allUsers(last: 1) { edges { node { id username plan } } } }"
     result = client.execute(query)
-    user_id = result["data"]["allUsers"][-1]["id"]
+    user_id = result["data"]["allUsers"]["edges"][-1]["node"]["id"]
     mutation = f"""mutation {{ upgradeAccount(userId: "{user_id}") {{ ok user {{ id plan }} }} }}"""
     response = client.execute(mutation)
     assert response["data"]["upgradeAccount"]["ok"] is True
@@ -22,10 +25,71 @@ def test_upgrade_account_mutation():
 def test_downgrade_account_mutation():
     user = User.objects.create(username="mutuser2", plan="PRO")
     client = Client(schema)
-    query = "{ allUsers { id username plan } }"
+    query = "{ allUsers(last: 1) { edges { node { id username plan } } } }"
     result = client.execute(query)
-    user_id = result["data"]["allUsers"][-1]["id"]
+    user_id = result["data"]["allUsers"]["edges"][-1]["node"]["id"]
     mutation = f"""mutation {{ downgradeAccount(userId: "{user_id}") {{ ok user {{ id plan }} }} }}"""
     response = client.execute(mutation)
     assert response["data"]["downgradeAccount"]["ok"] is True
     assert response["data"]["downgradeAccount"]["user"]["plan"] == "HOBBY"
+
+
+BULK_UPGRADE = """
+mutation ($ids: [ID!]!) {
+  upgradeAccounts(userIds: $ids) { changedCount results { userId status ok user { plan } } }
+}
+"""
+
+
+@pytest.mark.django_db
+def test_upgrade_accounts_reports_each_id():
+    hobby = User.objects.create(username="bulk1", plan="HOBBY")
+    pro = User.objects.create(username="bulk2", plan="PRO")
+    ids = [
+        encode_relay_id("UserNode", hobby.id),
+        encode_relay_id("UserNode", pro.id),
+        encode_relay_id("UserNode", "u_missing"),
+        encode_relay_id("DeployedAppNode", hobby.id),
+        "invalid",
+    ]
+    response = Client(schema).execute(BULK_UPGRADE, variables={"ids": ids})
+    assert "errors" not in response, response
+    payload = response["data"]["upgradeAccounts"]
+    assert payload["changedCount"] == 1
+    assert [r["status"] for r in payload["results"]] == [
+        "CHANGED",
+        "UNCHANGED",
+        "NOT_FOUND",
+        "INVALID_ID",
+        "INVALID_ID",
+    ]
+    assert [r["userId"] for r in payload["results"]] == ids
+    assert payload["results"][0]["user"]["plan"] == "PRO"
+    assert payload["results"][2]["user"] is None
+    hobby.refresh_from_db()
+    assert hobby.plan == "PRO"
+
+
+@pytest.mark.django_db
+def test_bulk_plan_change_runs_one_update_per_chunk():
+    users = [User.objects.create(username=f"chunk{i}", plan="PRO") for i in range(5)]
+    with CaptureQueriesContext(connection) as ctx:
+        results = change_plans([u.id for u in users], "HOBBY", chunk_size=2)
+    assert set(results.values()) == {CHANGED}
+    statements = [q["sql"] for q in ctx.captured_queries]
+    assert len(statements) == 3
+    assert all(sql.startswith("UPDATE") and "<>" in sql for sql in statements)
+    assert set(User.objects.values_list("plan", flat=True)) == {"HOBBY"}
+
+
+@pytest.mark.django_db
+def test_single_upgrade_does_not_read_before_writing():
+    user = User.objects.create(username="atomic", plan="HOBBY")
+    mutation = 'mutation { upgradeAccount(userId: "%s") { ok } }' % encode_relay_id(
+        "UserNode", user.id
+    )
+    with CaptureQueriesContext(connection) as ctx:
+        response = Client(schema).execute(mutation)
+    assert response["data"]["upgradeAccount"]["ok"] is True
+    assert len(ctx.captured_queries) == 1
+    assert ctx.captured_queries[0]["sql"].startswith("UPDATE")
@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from apps.schema import schema
+from apps.models import User, DeployedApp
+
+
+def _execute(query):
+    with CaptureQueriesContext(connection) as ctx:
+        result = Client(schema).execute(query)
+    assert "errors" not in result, result
+    return result["data"], [q["sql"] for q in ctx.captured_queries]
+
+
+@pytest.fixture
+def users_with_apps(db):
+    users = [User.objects.create(username=f"optuser{i}", plan="PRO") for i in range(3)]
+    for user in users:
+        DeployedApp.objects.create(owner=user)
+        DeployedApp.objects.create(owner=user, active=False)
+    return users
+
+
+def test_only_selected_columns_are_loaded(users_with_apps):
+    data, queries = _execute("{ allUsers { edges { node { username } } } }")
+    assert len(data["allUsers"]["edges"]) == 3
+    assert len(queries) == 1
+    assert '"updated_at"' not in queries[0]
+    assert '"plan"' not in queries[0]
+    # Keyset cursors always need the sort key.
+    assert '"created_at"' in queries[0]
+
+
+def test_owner_is_joined_through_fragments(users_with_apps):
+    query = """
+    { allApps { edges { node { ...AppOwner } } } }
+    fragment AppOwner on DeployedAppNode { active owner { ... on UserNode { username } } }
+    """
+    data, queries = _execute(query)
+    owners = {edge["node"]["owner"]["username"] for edge in data["allApps"]["edges"]}
+    assert owners == {"optuser0", "optuser1", "optuser2"}
+    assert len(queries) == 1
+    assert "JOIN" in queries[0]
+    assert '"apps_user"."plan"' not in queries[0]
+
+
+def test_apps_connection_is_prefetched(users_with_apps):
+    data, queries = _execute(
+        "{ allUsers { edges { node { username apps { edges { node { active } } } } } } }"
+    )
+    assert [len(e["node"]["apps"]["edges"]) for e in data["allUsers"]["edges"]] == [2, 2, 2]
+    assert len(queries) == 2
+    assert '"owner_id" IN' in queries[1]
+    assert '"updated_at"' not in queries[1]
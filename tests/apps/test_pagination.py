@@ -0,0 +1,89 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphene.test import Client
+from apps.schema import schema
+from apps.models import User
+from apps.pagination import encode_cursor, decode_cursor
+
+PAGE_QUERY = """
+query Page($first: Int, $after: String, $last: Int, $before: String) {
+  allUsers(first: $first, after: $after, last: $last, before: $before) {
+    edges { cursor node { username } }
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+  }
+}
+"""
+
+
+def _create_users(count):
+    base = timezone.now()
+    # Two users share each timestamp so the id tiebreak is exercised.
+    return [
+        User.objects.create(
+            username=f"pageuser{i:02d}",
+            plan="HOBBY",
+            created_at=base + timedelta(seconds=i // 2),
+        )
+        for i in range(count)
+    ]
+
+
+def _page(**variables):
+    result = Client(schema).execute(PAGE_QUERY, variables=variables)
+    assert "errors" not in result, result
+    conn = result["data"]["allUsers"]
+    return [edge["node"]["username"] for edge in conn["edges"]], conn["pageInfo"]
+
+
+def test_cursor_round_trip():
+    now = timezone.now()
+    assert decode_cursor(encode_cursor(now, "u_abc")) == (now, "u_abc")
+
+
+@pytest.mark.django_db
+def test_forward_pagination_visits_every_row_once():
+    users = _create_users(7)
+    expected = sorted(users, key=lambda u: (u.created_at, u.id))
+    seen, after = [], None
+    while True:
+        names, page_info = _page(first=3, after=after)
+        seen.extend(names)
+        if not page_info["hasNextPage"]:
+            break
+        after = page_info["endCursor"]
+    assert seen == [u.username for u in expected]
+
+
+@pytest.mark.django_db
+def test_backward_pagination():
+    users = _create_users(5)
+    expected = [u.username for u in sorted(users, key=lambda u: (u.created_at, u.id))]
+    names, page_info = _page(last=2)
+    assert names == expected[-2:]
+    assert page_info["hasPreviousPage"] is True
+    names, page_info = _page(last=10, before=page_info["startCursor"])
+    assert names == expected[:-2]
+    assert page_info["hasPreviousPage"] is False
+
+
+@pytest.mark.django_db
+def test_page_query_seeks_instead_of_offset():
+    _create_users(6)
+    _, page_info = _page(first=2)
+    with CaptureQueriesContext(connection) as ctx:
+        _page(first=2, after=page_info["endCursor"])
+    assert len(ctx.captured_queries) == 1
+    sql = ctx.captured_queries[0]["sql"].upper()
+    assert "OFFSET" not in sql
+    assert "LIMIT 3" in sql
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_and_limit_errors():
+    result = Client(schema).execute(PAGE_QUERY, variables={"after": "not-a-cursor"})
+    assert "Invalid cursor" in result["errors"][0]["message"]
+    result = Client(schema).execute(PAGE_QUERY, variables={"first": 1000})
+    assert "exceeds the `first` limit" in result["errors"][0]["message"]
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import pytest
+from django.core.cache import caches
+from django.test import Client
+from apps.models import User
+from apps.schema import encode_relay_id
+
+USER_QUERY = "query ($id: ID!) { node(id: $id) { ... on UserNode { username plan } } }"
+USER_QUERY_HASH = hashlib.sha256(USER_QUERY.encode()).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    caches["default"].clear()
+    yield
+    caches["default"].clear()
+
+
+def _extensions(sha256=USER_QUERY_HASH):
+    return json.dumps({"persistedQuery": {"version": 1, "sha256Hash": sha256}})
+
+
+def _get(client, user, **headers):
+    return client.get(
+        "/graphql/",
+        {
+            "extensions": _extensions(),
+            "variables": json.dumps({"id": encode_relay_id("UserNode", user.id)}),
+        },
+        **headers,
+    )
+
+
+@pytest.mark.django_db
+def test_hash_only_requests_run_the_registered_query():
+    user = User.objects.create(username="persisted", plan="HOBBY")
+    client = Client()
+
+    missing = _get(client, user).json()
+    assert missing["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    registered = client.post(
+        "/graphql/",
+        data=json.dumps(
+            {
+                "query": USER_QUERY,
+                "variables": {"id": encode_relay_id("UserNode", user.id)},
+                "extensions": json.loads(_extensions()),
+            }
+        ),
+        content_type="application/json",
+    )
+    assert registered.json()["data"]["node"] == {"username": "persisted", "plan": "HOBBY"}
+    assert _get(client, user).json()["data"] == registered.json()["data"]
+
+    mismatch = client.post(
+        "/graphql/",
+        data=json.dumps({"query": "{ __typename }", "extensions": json.loads(_extensions())}),
+        content_type="application/json",
+    )
+    assert mismatch.status_code == 400
+
+
+@pytest.mark.django_db
+def test_unchanged_results_are_not_modified(settings):
+    settings.GRAPHQL_RESPONSE_CACHE = {**settings.GRAPHQL_RESPONSE_CACHE, "ETAGS": True}
+    user = User.objects.create(username="etag", plan="HOBBY")
+    other = User.objects.create(username="other", plan="HOBBY")
+    client = Client()
+    client.post(
+        "/graphql/",
+        data=json.dumps({"query": USER_QUERY, "extensions": json.loads(_extensions())}),
+        content_type="application/json",
+    )
+
+    first = _get(client, user)
+    etag = first["ETag"]
+    assert first.status_code == 200 and first["Cache-Control"] == "no-cache"
+
+    other.plan = "PRO"
+    other.save()
+    not_modified = _get(client, user, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b"" and not_modified["ETag"] == etag
+
+    user.plan = "PRO"
+    user.save()
+    changed = _get(client, user, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200 and changed["ETag"] != etag
+    assert changed.json()["data"]["node"]["plan"] == "PRO"
+    assert _get(client, user, HTTP_IF_NONE_MATCH=changed["ETag"]).status_code == 304
@@ -0,0 +1,145 @@
+import json
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+from apps.dataloaders import EntityCache
+from apps.models import User
+from apps.plans import change_plans
+from apps.replicas import ReplicaRouter, RoutingState, current_routing, pin_primary
+from apps.schema import encode_relay_id
+
+USERS_QUERY = "{ allUsers(first: 10) { edges { node { username plan } } } }"
+UPGRADE_MUTATION = "mutation ($id: ID!) { upgradeAccount(userId: $id) { ok } }"
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    """
+    A second SQLite file registered as a replica that never receives writes.
+    """
+    alias = "replica_test"
+    connections.settings[alias] = {
+        **connections.settings["default"],
+        "NAME": str(tmp_path / "replica.sqlite3"),
+    }
+    call_command("migrate", database=alias, verbosity=0)
+    settings.GRAPHQL_REPLICAS = {
+        "ALIASES": [alias],
+        "STICKY_SECONDS": 5,
+        "COOKIE": "graphql_primary_until",
+    }
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+@pytest.fixture
+def routing():
+    state = RoutingState()
+    token = current_routing.set(state)
+    yield state
+    current_routing.reset(token)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_go_to_the_replica_unless_pinned(replica, routing):
+    User.objects.create(username="onprimary", plan="HOBBY")
+    routing.pinned = routing.wrote = False
+
+    assert not User.objects.exists()
+    with pin_primary():
+        assert User.objects.get().username == "onprimary"
+    assert User.objects.using(replica).count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_only_routed_reads_of_app_models_use_the_replica(replica):
+    User.objects.create(username="unrouted", plan="HOBBY")
+    assert User.objects.get().username == "unrouted"
+
+    token = current_routing.set(RoutingState())
+    try:
+        assert ReplicaRouter().db_for_read(User) == replica
+        assert ReplicaRouter().db_for_read(ContentType) is None
+    finally:
+        current_routing.reset(token)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_no_op_writes_do_not_pin_the_request(replica, routing):
+    user = User.objects.create(username="unchanged", plan="PRO")
+    routing.pinned = routing.wrote = False
+
+    assert change_plans([user.id], "PRO") == {user.id: "UNCHANGED"}
+    assert not routing.wrote and not routing.pinned
+
+    assert change_plans([user.id], "HOBBY") == {user.id: "CHANGED"}
+    assert routing.wrote and routing.pinned
+
+
+@pytest.mark.django_db(transaction=True)
+def test_mutating_client_reads_its_writes_for_the_sticky_window(replica, post_graphql):
+    user = User.objects.create(username="writer", plan="HOBBY")
+    writer, other = Client(), Client()
+
+    response = post_graphql(
+        UPGRADE_MUTATION, {"id": encode_relay_id("UserNode", user.id)}, client=writer
+    )
+    assert response.json()["data"] == {"upgradeAccount": {"ok": True}}
+    assert float(response.cookies["graphql_primary_until"].value) > time.time()
+
+    body = post_graphql(USERS_QUERY, client=writer).json()
+    assert body["data"]["allUsers"]["edges"] == [
+        {"node": {"username": "writer", "plan": "PRO"}}
+    ]
+    body = post_graphql(USERS_QUERY, client=other).json()
+    assert body["data"]["allUsers"]["edges"] == []
+
+    writer.cookies["graphql_primary_until"] = str(time.time() - 1)
+    body = post_graphql(USERS_QUERY, client=writer).json()
+    assert body["data"]["allUsers"]["edges"] == []
+
+
+@pytest.mark.django_db
+def test_replica_reads_do_not_cache_recent_writes():
+    cache = EntityCache()
+    user = User.objects.create(username="cached", plan="HOBBY")
+    cache.invalidate(User, user.pk)
+
+    snapshot = cache.snapshot()
+    cache.put_many(User, [user.pk], [user], snapshot, settle=5)
+    assert cache.get_many(User, [user.pk]) == {}
+    cache.put_many(User, [user.pk], [user], snapshot)
+    assert cache.get_many(User, [user.pk])[user.pk].username == "cached"
+
+
+async def _drain(content):
+    return [chunk async for chunk in content]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streamed_chunks_of_a_pinned_client_read_the_primary(
+    replica, settings, post_graphql
+):
+    settings.GRAPHQL_STREAM_CHUNK_SIZE = 1
+    for name in ("streamed-a", "streamed-b"):
+        User.objects.create(username=name, plan="HOBBY")
+    client = Client()
+    client.cookies["graphql_primary_until"] = str(time.time() + 5)
+
+    response = post_graphql(
+        "{ allUsers { edges { node { username } } } }",
+        client=client,
+        HTTP_ACCEPT="application/x-ndjson",
+    )
+    body = b"".join(async_to_sync(_drain)(response.streaming_content)).decode()
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [
+        [edge["node"]["username"] for edge in line["data"]["allUsers"]["edges"]]
+        for line in lines
+    ] == [["streamed-a"], ["streamed-b"]]
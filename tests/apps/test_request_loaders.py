@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from apps.schema import schema, encode_relay_id
+from apps.dataloaders import Deferred, LoaderRegistry, UserLoader
+from apps.models import User
+
+
+def _count_queries(query):
+    client = Client(schema)
+    with CaptureQueriesContext(connection) as ctx:
+        result = client.execute(query)
+    assert "errors" not in result
+    return len(ctx.captured_queries), result
+
+
+@pytest.mark.django_db
+def test_loader_batches_keys_queued_before_dispatch():
+    u1 = User.objects.create(username="deferred1", plan="HOBBY")
+    u2 = User.objects.create(username="deferred2", plan="PRO")
+    registry = LoaderRegistry()
+    loader = registry.get(UserLoader)
+    first, second = loader.load(u1.id), loader.load(u2.id)
+    assert loader.load(u1.id) is first
+    assert first.is_pending and second.is_pending
+    with CaptureQueriesContext(connection) as ctx:
+        assert registry.dispatch() is True
+    assert len(ctx.captured_queries) == 1
+    assert first.get().username == "deferred1"
+    assert second.get().username == "deferred2"
+    assert registry.dispatch() is False
+
+
+def test_deferred_all_preserves_order():
+    a, b = Deferred(), Deferred()
+    combined = Deferred.all([a, "plain", b])
+    b.resolve("second")
+    assert combined.is_pending
+    a.resolve("first")
+    assert combined.get() == ["first", "plain", "second"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [2, 20])
+def test_all_users_apps_query_count_is_constant(count, create_users_with_apps):
+    create_users_with_apps(count)
+    num_queries, result = _count_queries(
+        "{ allUsers { edges { node { username apps { edges { node { id active } } } } } } }"
+    )
+    assert len(result["data"]["allUsers"]["edges"]) == count
+    # One query for the users, one owner_id__in query for every user's apps.
+    assert num_queries == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [2, 20])
+def test_all_apps_owner_query_count_is_constant(count, create_users_with_apps):
+    create_users_with_apps(count)
+    num_queries, result = _count_queries(
+        "{ allApps { edges { node { id owner { username apps { edges { node { id } } } } } } } }"
+    )
+    assert len(result["data"]["allApps"]["edges"]) == count * 2
+    # Apps joined to their owners, then the owners' apps in one batch.
+    assert num_queries == 2
+
+
+@pytest.mark.django_db
+def test_node_aliases_share_one_user_batch(create_users_with_apps):
+    users = create_users_with_apps(3, apps_per_user=0)
+    aliases = " ".join(
+        f'u{i}: node(id: "{encode_relay_id("UserNode", user.id)}") {{ ... on UserNode {{ username }} }}'
+        for i, user in enumerate(users)
+    )
+    num_queries, result = _count_queries(f"{{ {aliases} }}")
+    assert [result["data"][f"u{i}"]["username"] for i in range(3)] == [
+        u.username for u in users
+    ]
+    assert num_queries == 1
@@ -0,0 +1,141 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from apps.models import User, DeployedApp
+from apps.schema import encode_relay_id
+
+RESPONSE_CACHE = {"ENABLED": True, "CACHE_ALIAS": "default", "TIMEOUT": 60}
+
+
+@pytest.fixture(autouse=True)
+def response_cache():
+    cache.clear()
+    with override_settings(GRAPHQL_RESPONSE_CACHE=RESPONSE_CACHE):
+        yield
+    cache.clear()
+
+
+@pytest.fixture
+def execute(post_graphql):
+    """
+    Run a query through the view and return its data and SQL query count.
+    """
+
+    def run(query, variables=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = post_graphql(query, variables)
+        assert resp.status_code == 200, resp.content
+        data = resp.json()
+        assert "errors" not in data, data
+        return data["data"], len(ctx.captured_queries)
+
+    return run
+
+
+NODE_QUERY = "query ($id: ID!) { node(id: $id) { ... on UserNode { username plan } } }"
+APPS_QUERY = "{ allApps { edges { node { id active owner { username } } } } }"
+
+
+@pytest.mark.django_db
+def test_repeated_query_is_served_from_cache(execute):
+    user = User.objects.create(username="cached", plan="HOBBY")
+    variables = {"id": encode_relay_id("UserNode", user.id)}
+    first, queries = execute(NODE_QUERY, variables)
+    assert queries == 1
+    # Reason: the key is built from the normalized document, not its formatting.
+    reformatted = NODE_QUERY.replace(" {", "\n  {") + "  # comment"
+    second, queries = execute(reformatted, variables)
+    assert queries == 0
+    assert second == first
+
+
+@pytest.mark.django_db
+def test_variables_are_part_of_the_key(execute):
+    users = [User.objects.create(username=f"var{i}", plan="HOBBY") for i in range(2)]
+    for user in users:
+        data, queries = execute(NODE_QUERY, {"id": encode_relay_id("UserNode", user.id)})
+        assert queries == 1
+        assert data["node"]["username"] == user.username
+
+
+@pytest.mark.django_db
+def test_upgrade_invalidates_only_the_touched_user(execute):
+    user = User.objects.create(username="upgrader", plan="HOBBY")
+    other = User.objects.create(username="bystander", plan="HOBBY")
+    user_id = encode_relay_id("UserNode", user.id)
+    other_id = encode_relay_id("UserNode", other.id)
+    execute(NODE_QUERY, {"id": user_id})
+    execute(NODE_QUERY, {"id": other_id})
+
+    mutation = "mutation ($id: ID!) { upgradeAccount(userId: $id) { ok } }"
+    execute(mutation, {"id": user_id})
+
+    data, queries = execute(NODE_QUERY, {"id": user_id})
+    assert queries == 1
+    assert data["node"]["plan"] == "PRO"
+    _, queries = execute(NODE_QUERY, {"id": other_id})
+    assert queries == 0
+
+
+@pytest.mark.django_db
+def test_row_saves_invalidate_lists_that_read_them(execute):
+    user = User.objects.create(username="owner", plan="HOBBY")
+    app = DeployedApp.objects.create(owner=user)
+    execute(APPS_QUERY)
+    _, queries = execute(APPS_QUERY)
+    assert queries == 0
+
+    user.username = "renamed"
+    user.save()
+    data, queries = execute(APPS_QUERY)
+    assert queries > 0
+    assert data["allApps"]["edges"][0]["node"]["owner"]["username"] == "renamed"
+
+    DeployedApp.objects.create(owner=user)
+    data, _ = execute(APPS_QUERY)
+    assert len(data["allApps"]["edges"]) == 2
+
+    app.delete()
+    data, _ = execute(APPS_QUERY)
+    assert len(data["allApps"]["edges"]) == 1
+
+
+@pytest.mark.django_db
+def test_new_app_invalidates_its_owners_apps_connection(execute):
+    user = User.objects.create(username="lister", plan="HOBBY")
+    query = "query ($id: ID!) { node(id: $id) { ... on UserNode { apps { edges { node { id } } } } } }"
+    variables = {"id": encode_relay_id("UserNode", user.id)}
+    data, _ = execute(query, variables)
+    assert data["node"]["apps"]["edges"] == []
+    DeployedApp.objects.create(owner=user)
+    data, queries = execute(query, variables)
+    assert queries > 0
+    assert len(data["node"]["apps"]["edges"]) == 1
+
+
+@pytest.mark.django_db
+def test_disabled_cache_always_executes(execute):
+    User.objects.create(username="uncached", plan="HOBBY")
+    with override_settings(GRAPHQL_RESPONSE_CACHE={"ENABLED": False}):
+        for _ in range(2):
+            _, queries = execute("{ allUsers { edges { node { username } } } }")
+            assert queries == 1
+
+
+@pytest.mark.django_db
+def test_updates_invalidate_filtered_lists_they_join(execute):
+    user = User.objects.create(username="filtered", plan="HOBBY")
+    app = DeployedApp.objects.create(owner=user, active=False)
+    active = "{ allApps(active: true) { edges { node { id } } } }"
+    pro = "{ allApps(ownerPlan: PRO) { edges { node { id } } } }"
+    assert execute(active)[0]["allApps"]["edges"] == []
+    assert execute(pro)[0]["allApps"]["edges"] == []
+
+    app.active = True
+    app.save()
+    assert len(execute(active)[0]["allApps"]["edges"]) == 1
+
+    mutation = "mutation ($id: ID!) { upgradeAccount(userId: $id) { ok } }"
+    execute(mutation, {"id": encode_relay_id("UserNode", user.id)})
+    assert len(execute(pro)[0]["allApps"]["edges"]) == 1
@@ -0,0 +1,246 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from apps.schema import LimitedComplexityGraphQLView
+from apps.server import PooledWSGIServer, warm_up
+
+WARMUP_QUERY = "{ allUsers(first: 1) { edges { node { id } } } }"
+
+
+@pytest.mark.django_db
+def test_warm_up_fills_the_document_cache():
+    cache = LimitedComplexityGraphQLView.document_cache
+    key = cache.key(WARMUP_QUERY)
+    assert warm_up(get_wsgi_application(), [WARMUP_QUERY]) == ["200 OK"]
+    assert cache.get(key) is not None
+
+
+def test_pooled_server_serves_from_a_shared_socket():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    server = PooledWSGIServer(sock, get_wsgi_application(), threads=2)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05})
+    thread.start()
+    try:
+        statuses = []
+        for _ in range(3):
+            connection = http.client.HTTPConnection(*sock.getsockname())
+            connection.request("GET", "/metrics")
+            response = connection.getresponse()
+            statuses.append((response.status, b"graphql_" in response.read()))
+            connection.close()
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+    assert statuses == [(200, True)] * 3
+    assert sock.fileno() != -1
+    sock.close()
+
+
+def test_pooled_server_rejects_past_its_queue_and_drops_idle_clients():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    server = PooledWSGIServer(
+        sock, get_wsgi_application(), threads=1, timeout=0.5, max_queued=0
+    )
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05})
+    thread.start()
+    try:
+        idle = socket.create_connection(sock.getsockname(), timeout=5)
+        idle.sendall(b"GET /metrics HTTP/1.0\r\n")
+        time.sleep(0.2)
+        connection = http.client.HTTPConnection(*sock.getsockname(), timeout=5)
+        connection.request("GET", "/metrics")
+        assert connection.getresponse().status == 503
+        connection.close()
+        # Reason: the idle client never finishes its headers and is cut off by the timeout.
+        assert idle.recv(1024) == b""
+        idle.close()
+        connection = http.client.HTTPConnection(*sock.getsockname(), timeout=5)
+        connection.request("GET", "/metrics")
+        assert connection.getresponse().status == 200
+        connection.close()
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+        sock.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _wait_for(predicate, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.1)
+    raise AssertionError("timed out waiting for the server")
+
+
+def _children(pid: int) -> set:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            return {int(child) for child in children.read().split()}
+    except FileNotFoundError:
+        return set()
+
+
+def _accepts(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def _start_request(port: int):
+    """
+    Send a request's headers and the first half of its body, leaving it in flight.
+    """
+    body = json.dumps({"query": "{ __typename }"}).encode()
+    client = socket.create_connection(("127.0.0.1", port), timeout=30)
+    client.sendall(
+        b"POST /graphql/ HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        b"Content-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body[:10]
+    )
+    return client, body[10:]
+
+
+def _finish_request(request) -> bytes:
+    client, rest = request
+    client.sendall(rest)
+    chunks = []
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    client.close()
+    return b"".join(chunks)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/task"), reason="needs Linux /proc")
+def test_master_reloads_scales_and_drains_workers():
+    port = _free_port()
+    master = subprocess.Popen(
+        [
+            sys.executable,
+            "manage.py",
+            "serve",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            "2",
+            "--no-warmup",
+            "--graceful-timeout",
+            "20",
+        ],
+        cwd=settings.BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(lambda: _accepts(port) and len(_children(master.pid)) == 2)
+        workers = _children(master.pid)
+
+        master.send_signal(signal.SIGTTIN)
+        _wait_for(lambda: len(_children(master.pid)) == 3)
+        master.send_signal(signal.SIGTTOU)
+        _wait_for(lambda: len(_children(master.pid)) == 2)
+
+        reloading = _start_request(port)
+        master.send_signal(signal.SIGHUP)
+        # Reason: the re-executed master keeps its pid and starts a new generation.
+        _wait_for(lambda: len(_children(master.pid) - workers) == 2)
+        assert b'"__typename":"Query"' in _finish_request(reloading)
+        _wait_for(lambda: not _children(master.pid) & workers)
+        # Reason: the retired worker flushed on exit and the new master archived it.
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        connection.request("GET", "/metrics")
+        scraped = connection.getresponse().read().decode()
+        connection.close()
+        assert (
+            'graphql_operation_duration_seconds_count{operation="anonymous",'
+            'operation_type="query"} 1'
+        ) in scraped
+
+        stopping = _start_request(port)
+        master.send_signal(signal.SIGTERM)
+        time.sleep(0.5)
+        response = _finish_request(stopping)
+        assert response.startswith(b"HTTP/1.1 200")
+        assert b'"__typename":"Query"' in response
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/task"), reason="needs Linux /proc")
+def test_failed_reload_keeps_supervising_the_old_workers(tmp_path):
+    broken = tmp_path / "broken"
+    # Reason: middleware is first imported by preload(), after the system checks.
+    (tmp_path / "reload_middleware.py").write_text(
+        "import os\n"
+        f"if os.path.exists({str(broken)!r}):\n"
+        "    raise RuntimeError('broken deploy')\n"
+        "def middleware(get_response):\n"
+        "    return get_response\n"
+    )
+    (tmp_path / "reload_settings.py").write_text(
+        "from backend_challenge.settings import *\n"
+        "MIDDLEWARE = [*MIDDLEWARE, 'reload_middleware.middleware']\n"
+    )
+    port = _free_port()
+    master = subprocess.Popen(
+        [sys.executable, "manage.py", "serve", "--bind", f"127.0.0.1:{port}"]
+        + ["--workers", "1", "--no-warmup", "--graceful-timeout", "20"],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "reload_settings",
+            "DJANGO_ADMIN_ENABLED": "False",
+            "PYTHONPATH": os.pathsep.join([str(tmp_path), str(settings.BASE_DIR)]),
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(lambda: _accepts(port) and len(_children(master.pid)) == 1)
+        workers = _children(master.pid)
+
+        broken.touch()
+        master.send_signal(signal.SIGHUP)
+        time.sleep(3)
+        assert master.poll() is None and _children(master.pid) == workers
+        assert b'"__typename":"Query"' in _finish_request(_start_request(port))
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+        (worker,) = workers
+        _wait_for(lambda: not os.path.exists(f"/proc/{worker}"))
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
@@ -0,0 +1,60 @@
+import pytest
+from django.test import Client
+from graphql import get_introspection_query, graphql_sync
+from apps.introspection import is_introspection
+from apps.schema import LimitedComplexityGraphQLView, schema
+from apps.startup import parse_importtime, profile_startup
+
+TYPE_QUERY = "query ($name: String!) { __type(name: $name) { name kind } }"
+
+
+@pytest.mark.django_db
+def test_introspection_is_executed_once_per_document_and_variables(post_graphql):
+    cache = LimitedComplexityGraphQLView.introspection_cache
+    cache.clear()
+    query = get_introspection_query(descriptions=True)
+    expected = graphql_sync(schema.graphql_schema, query).data
+
+    assert [post_graphql(query).json()["data"] for _ in range(2)] == [expected, expected]
+    assert post_graphql(TYPE_QUERY, {"name": "UserNode"}).json()["data"] == {
+        "__type": {"name": "UserNode", "kind": "OBJECT"}
+    }
+    named = post_graphql(TYPE_QUERY, {"name": "Query"}).json()
+    assert named["data"]["__type"]["name"] == "Query"
+    assert len(cache) == 3
+
+    mixed = LimitedComplexityGraphQLView().get_document("{ __typename allUsers { totalCount } }")
+    assert not is_introspection(mixed.document.definitions[0])
+
+
+def test_sdl_endpoint_revalidates_with_etag():
+    client = Client()
+    response = client.get("/graphql/schema.graphql")
+    assert response.status_code == 200
+    assert "type Query" in response.content.decode()
+
+    revalidated = client.get("/graphql/schema.graphql", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert revalidated.status_code == 304
+
+
+def test_parse_importtime_reads_nesting():
+    lines = [
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     graphql.error",
+        "import time:      1500 |       1620 |   graphql",
+        "unrelated output",
+    ]
+    assert [tuple(timing) for timing in parse_importtime(lines)] == [
+        ("graphql.error", 120, 120, 2),
+        ("graphql", 1500, 1620, 1),
+    ]
+
+
+def test_workers_without_admin_import_neither_admin_nor_channels():
+    profile = profile_startup(env={"DJANGO_ADMIN_ENABLED": "False"})
+    modules = {timing.module for timing in profile.imports}
+
+    assert profile.status == ["200 OK"]
+    assert list(profile.phases) == ["django.setup", "urlconf", "wsgi handler", "first request"]
+    assert "apps.schema" in modules
+    assert not {"django.contrib.admin", "channels.layers"} & modules
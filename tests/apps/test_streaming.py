@@ -0,0 +1,122 @@
+import functools
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from apps.models import User, DeployedApp
+from apps.schema import LimitedComplexityGraphQLView
+
+NDJSON = "application/x-ndjson"
+
+
+@pytest.fixture
+def apps(db):
+    owner = User.objects.create(username="streamer", plan="PRO")
+    return [DeployedApp.objects.create(owner=owner) for _ in range(5)]
+
+
+@pytest.fixture
+def post_stream(post_graphql):
+    return functools.partial(post_graphql, HTTP_ACCEPT=NDJSON)
+
+
+async def _drain(content):
+    return [chunk async for chunk in content]
+
+
+def _lines(response):
+    assert response["Content-Type"] == NDJSON
+    if response.is_async:
+        # Reason: the ASGI view streams through an async iterator; async_to_sync
+        # keeps the cursor reads on the test thread and its transaction.
+        chunks = async_to_sync(_drain)(response.streaming_content)
+    else:
+        chunks = list(response.streaming_content)
+    body = b"".join(chunks).decode()
+    return [json.loads(line) for line in body.splitlines()]
+
+
+@override_settings(GRAPHQL_STREAM_CHUNK_SIZE=2)
+def test_connection_is_streamed_in_chunks(apps, post_stream):
+    response = post_stream(
+        "{ allApps { edges { cursor node { id owner { username } } } pageInfo { hasNextPage } } }"
+    )
+    lines = _lines(response)
+    assert [len(line["data"]["allApps"]["edges"]) for line in lines] == [2, 2, 1]
+    assert [line["hasNext"] for line in lines] == [True, True, False]
+    assert [line["data"]["allApps"]["pageInfo"]["hasNextPage"] for line in lines] == [
+        True,
+        True,
+        False,
+    ]
+    edges = [edge for line in lines for edge in line["data"]["allApps"]["edges"]]
+    assert len({edge["node"]["id"] for edge in edges}) == 5
+    assert {edge["node"]["owner"]["username"] for edge in edges} == {"streamer"}
+
+
+@override_settings(GRAPHQL_STREAM_CHUNK_SIZE=2)
+def test_stream_prefetches_per_chunk_and_honours_first_and_after(apps, post_stream):
+    factory = RequestFactory()
+    view = LimitedComplexityGraphQLView.as_view()
+    query = "{ allUsers { edges { node { apps { edges { node { id } } } } } } }"
+    User.objects.create(username="streamer2", plan="HOBBY")
+    User.objects.create(username="streamer3", plan="HOBBY")
+    request = factory.post(
+        "/graphql/",
+        data=json.dumps({"query": query}),
+        content_type="application/json",
+        HTTP_ACCEPT=NDJSON,
+    )
+    with CaptureQueriesContext(connection) as ctx:
+        lines = _lines(view(request))
+    assert [len(line["data"]["allUsers"]["edges"]) for line in lines] == [2, 1]
+    # One cursor query plus one apps prefetch per chunk.
+    assert len(ctx.captured_queries) == 3
+
+    lines = _lines(post_stream("{ allApps(first: 3) { edges { cursor } } }"))
+    assert sum(len(line["data"]["allApps"]["edges"]) for line in lines) == 3
+    after = lines[0]["data"]["allApps"]["edges"][1]["cursor"]
+    lines = _lines(post_stream('{ allApps(after: "%s") { edges { cursor } } }' % after))
+    assert sum(len(line["data"]["allApps"]["edges"]) for line in lines) == 3
+
+
+def test_non_streamable_requests_fall_back_to_json(apps, post_stream):
+    for query in (
+        "{ allApps(last: 2) { edges { cursor } } }",
+        "{ allApps { edges { cursor } } allUsers { edges { cursor } } }",
+        "{ noSuchField }",
+    ):
+        response = post_stream(query)
+        assert not response.streaming
+        assert response["Content-Type"] == "application/json"
+
+
+@override_settings(GRAPHQL_STREAM_CHUNK_SIZE=2, GRAPHQL_STREAM_MAX_ROWS=3)
+def test_stream_stops_at_the_row_limit_with_a_next_page(apps, post_stream):
+    lines = _lines(post_stream("{ allApps { edges { cursor } pageInfo { hasNextPage } } }"))
+    assert [len(line["data"]["allApps"]["edges"]) for line in lines] == [2, 1]
+    assert [line["hasNext"] for line in lines] == [True, False]
+    assert lines[-1]["data"]["allApps"]["pageInfo"]["hasNextPage"] is True
+
+    after = lines[-1]["data"]["allApps"]["edges"][-1]["cursor"]
+    query = '{ allApps(after: "%s") { edges { cursor } pageInfo { hasNextPage } } }'
+    lines = _lines(post_stream(query % after))
+    assert sum(len(line["data"]["allApps"]["edges"]) for line in lines) == 2
+    assert lines[-1]["data"]["allApps"]["pageInfo"]["hasNextPage"] is False
+
+
+@override_settings(GRAPHQL_STREAM_MAX_ROWS=1000, GRAPHQL_COMPLEXITY={"MAX_COST": 5000})
+def test_streams_are_priced_by_their_row_limit(apps, post_stream):
+    query = "{ allUsers%s { edges { node { apps { edges { node { owner { id } } } } } } } }"
+
+    response = post_stream(query % "")
+    assert response.status_code == 400
+    assert response["Content-Type"] == "application/json"
+    cost = response.json()["extensions"]["cost"]["requestedQueryCost"]
+    assert cost == 1 + 1000 * (1 + 100)
+    assert "too complex" in response.json()["errors"][0]["message"]
+
+    lines = _lines(post_stream(query % "(first: 10)"))
+    assert [len(line["data"]["allUsers"]["edges"]) for line in lines] == [1]
@@ -0,0 +1,211 @@
+import json
+import pytest
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import Client
+import apps.consumers
+from apps.consumers import GraphQLSubscriptionConsumer
+from apps.models import User, DeployedApp
+from apps.plans import change_plans
+from apps.schema import encode_relay_id
+from apps.subscriptions import publish_plan_changes, subscription_group
+
+PLAN_SUBSCRIPTION = "subscription ($id: ID!) { planChanged(userId: $id) { username plan } }"
+APP_SUBSCRIPTION = (
+    "subscription ($id: ID!) { appChanged(ownerId: $id) { active owner { username } } }"
+)
+
+
+class Socket:
+    """
+    Minimal graphql-transport-ws client driving the consumer in-process.
+    """
+
+    def __init__(self):
+        self.communicator = ApplicationCommunicator(
+            GraphQLSubscriptionConsumer.as_asgi(),
+            {
+                "type": "websocket",
+                "path": "/graphql/",
+                "subprotocols": ["graphql-transport-ws"],
+                "headers": [],
+            },
+        )
+
+    async def connect(self):
+        await self.communicator.send_input({"type": "websocket.connect"})
+        accepted = await self.communicator.receive_output(1)
+        assert accepted["subprotocol"] == "graphql-transport-ws"
+        await self.send({"type": "connection_init"})
+        assert await self.receive() == {"type": "connection_ack"}
+        return self
+
+    async def send(self, message):
+        await self.communicator.send_input(
+            {"type": "websocket.receive", "text": json.dumps(message)}
+        )
+
+    async def receive(self):
+        output = await self.communicator.receive_output(1)
+        assert output["type"] == "websocket.send", output
+        return json.loads(output["text"])
+
+    async def subscribe(self, operation_id, query, variables):
+        await self.send(
+            {
+                "id": operation_id,
+                "type": "subscribe",
+                "payload": {"query": query, "variables": variables},
+            }
+        )
+        # Reason: a ping round trip proves the subscribe message was processed.
+        await self.send({"type": "ping"})
+        return await self.receive()
+
+    async def close(self):
+        await self.communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await self.communicator.wait(1)
+
+
+@pytest.fixture
+def executions(monkeypatch):
+    calls = []
+    execute = apps.consumers.execute
+
+    def counting_execute(*args, **kwargs):
+        calls.append(kwargs.get("variable_values"))
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(apps.consumers, "execute", counting_execute)
+    return calls
+
+
+@pytest.mark.django_db
+def test_plan_change_fans_out_one_rendering_per_group(
+    run_async, executions, django_capture_on_commit_callbacks
+):
+    user = User.objects.create(username="watched", plan="HOBBY")
+    other = User.objects.create(username="unwatched", plan="HOBBY")
+    variables = {"id": encode_relay_id("UserNode", user.id)}
+
+    def upgrade():
+        with django_capture_on_commit_callbacks(execute=True):
+            change_plans([user.id, other.id], "PRO")
+
+    async def scenario():
+        sockets = [await Socket().connect() for _ in range(3)]
+        for socket in sockets:
+            assert await socket.subscribe("1", PLAN_SUBSCRIPTION, variables) == {
+                "type": "pong"
+            }
+        await sync_to_async(upgrade)()
+        messages = [await socket.receive() for socket in sockets]
+        for socket in sockets:
+            assert await socket.communicator.receive_nothing()
+            await socket.close()
+        return messages
+
+    messages = run_async(scenario)
+    assert messages == [
+        {
+            "id": "1",
+            "type": "next",
+            "payload": {"data": {"planChanged": {"username": "watched", "plan": "PRO"}}},
+        }
+    ] * 3
+    assert executions == [variables]
+
+
+@pytest.mark.django_db
+def test_app_saves_reach_current_and_previous_owner(
+    run_async, django_capture_on_commit_callbacks
+):
+    first = User.objects.create(username="firstowner", plan="HOBBY")
+    second = User.objects.create(username="secondowner", plan="HOBBY")
+    DeployedApp.objects.create(owner=first)
+
+    def save(**changes):
+        app = DeployedApp.objects.get()
+        for name, value in changes.items():
+            setattr(app, name, value)
+        with django_capture_on_commit_callbacks(execute=True):
+            app.save()
+
+    async def scenario():
+        socket = await Socket().connect()
+        for operation_id, owner in (("first", first), ("second", second)):
+            await socket.subscribe(
+                operation_id, APP_SUBSCRIPTION, {"id": encode_relay_id("UserNode", owner.id)}
+            )
+        await sync_to_async(save)(owner=second)
+        moved = [await socket.receive(), await socket.receive()]
+        await socket.send({"id": "first", "type": "complete"})
+        await sync_to_async(save)(active=False)
+        deactivated = await socket.receive()
+        assert await socket.communicator.receive_nothing()
+        await socket.close()
+        return moved, deactivated
+
+    moved, deactivated = run_async(scenario)
+    assert sorted(message["id"] for message in moved) == ["first", "second"]
+    for message in moved:
+        assert message["payload"]["data"]["appChanged"] == {
+            "active": True,
+            "owner": {"username": "secondowner"},
+        }
+    assert deactivated["id"] == "second"
+    assert deactivated["payload"]["data"]["appChanged"]["active"] is False
+
+
+@pytest.mark.django_db
+def test_invalid_subscriptions_are_rejected(run_async):
+    async def scenario():
+        socket = await Socket().connect()
+        errors = []
+        for query, variables in (
+            ("{ allUsers { edges { cursor } } }", {}),
+            (PLAN_SUBSCRIPTION, {"id": encode_relay_id("DeployedAppNode", "app_x")}),
+            ("subscription { planChanged(userId: 1) { nope } }", {}),
+        ):
+            message = await socket.subscribe("bad", query, variables)
+            assert message["type"] == "error"
+            errors.append(message["payload"][0]["message"])
+            assert await socket.receive() == {"type": "pong"}
+        await socket.close()
+        return errors
+
+    errors = run_async(scenario)
+    assert errors[0] == "Only subscription operations can be subscribed to."
+    assert errors[1] == "Invalid user ID type."
+    assert "nope" in errors[2]
+
+
+@pytest.mark.django_db
+def test_subscriptions_are_not_executed_over_http():
+    response = Client().post(
+        "/graphql/",
+        data=json.dumps({"query": PLAN_SUBSCRIPTION, "variables": {"id": "x"}}),
+        content_type="application/json",
+    )
+    assert response.json()["errors"][0]["message"] == (
+        "Subscriptions are only served over websockets."
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_plan_changes_publish_in_one_commit_callback(
+    monkeypatch, django_capture_on_commit_callbacks
+):
+    sent = []
+
+    class RecordingLayer:
+        async def group_send(self, group, message):
+            sent.append((group, message["pk"]))
+
+    monkeypatch.setattr("channels.layers.get_channel_layer", lambda: RecordingLayer())
+    with django_capture_on_commit_callbacks() as callbacks:
+        publish_plan_changes(["u_1", "u_2", "u_3"])
+    assert len(callbacks) == 1
+
+    callbacks[0]()
+    assert sent == [(subscription_group("planChanged", pk), pk) for pk in ("u_1", "u_2", "u_3")]
@@ -0,0 +1,93 @@
+import json
+import logging
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from apps.models import User, DeployedApp
+from apps.schema import LimitedComplexityGraphQLView, encode_relay_id
+
+QUERY = "{ allUsers { edges { node { username apps { edges { node { id } } } } } } }"
+
+
+@pytest.fixture
+def users(db):
+    for i in range(3):
+        user = User.objects.create(username=f"traced{i}", plan="HOBBY")
+        DeployedApp.objects.create(owner=user)
+
+
+def test_requested_trace_is_returned_in_extensions(users, post_graphql):
+    data = post_graphql(QUERY, HTTP_X_GRAPHQL_TRACE="1").json()
+    tracing = data["extensions"]["tracing"]
+    # Reason: one query for the users page and one prefetch of their apps.
+    assert tracing["sqlQueries"] == 2
+    assert tracing["resolverCalls"] > 0
+    assert 0 <= tracing["dbTimeMs"] <= tracing["durationMs"]
+
+    data = post_graphql(body={"query": QUERY, "extensions": {"tracing": True}}).json()
+    assert data["extensions"]["tracing"]["sqlQueries"] == 2
+
+
+def test_sync_view_traces_mutations(users):
+    view = LimitedComplexityGraphQLView.as_view()
+    user_id = User.objects.values_list("id", flat=True).first()
+    body = {
+        "query": "mutation ($id: ID!) { upgradeAccount(userId: $id) { ok } }",
+        "variables": {"id": encode_relay_id("UserNode", user_id)},
+        "extensions": {"tracing": True},
+    }
+    request = RequestFactory().post(
+        "/graphql/", data=json.dumps(body), content_type="application/json"
+    )
+    data = json.loads(view(request).content)
+    assert data["data"]["upgradeAccount"]["ok"] is True
+    # Reason: the plan change is a single UPDATE ... RETURNING and no user is selected.
+    assert data["extensions"]["tracing"]["sqlQueries"] == 1
+
+
+def test_untraced_requests_skip_the_middleware(users, monkeypatch, post_graphql):
+    calls = []
+    monkeypatch.setattr(
+        LimitedComplexityGraphQLView.tracing_middleware,
+        "resolve",
+        lambda next, root, info, **args: calls.append(1) or next(root, info, **args),
+    )
+    data = post_graphql(QUERY).json()
+    assert "extensions" not in data or "tracing" not in data["extensions"]
+    assert calls == []
+    with override_settings(GRAPHQL_TRACING={"ALLOW_CLIENT_REQUESTS": False}):
+        data = post_graphql(QUERY, HTTP_X_GRAPHQL_TRACE="1").json()
+    assert "tracing" not in data.get("extensions", {})
+    assert calls == []
+
+
+def test_sampled_requests_are_logged_not_returned(users, caplog, post_graphql):
+    with override_settings(GRAPHQL_TRACING={"SAMPLE_RATE": 1.0}):
+        with caplog.at_level(logging.INFO, logger="apps.tracing"):
+            data = post_graphql(
+                body={"query": "query Page " + QUERY, "operationName": "Page"}
+            ).json()
+    assert "tracing" not in data.get("extensions", {})
+    (record,) = caplog.records
+    assert record.graphql_trace["sqlQueries"] == 2
+    assert "graphql operation Page: 2 queries" in record.getMessage()
+
+
+def test_requested_traces_bypass_the_response_cache(users, post_graphql):
+    cache.clear()
+    config = {"ENABLED": True, "CACHE_ALIAS": "default", "TIMEOUT": 60}
+    with override_settings(GRAPHQL_RESPONSE_CACHE=config):
+        post_graphql(QUERY)
+        data = post_graphql(QUERY, HTTP_X_GRAPHQL_TRACE="1").json()
+        assert data["extensions"]["tracing"]["sqlQueries"] == 2
+        assert "tracing" not in post_graphql(QUERY).json().get("extensions", {})
+    cache.clear()
+
+
+def test_production_settings_ignore_client_trace_requests(users, settings, post_graphql):
+    # Reason: production settings allow client traces only under DEBUG or an opt-in.
+    production = {**settings.GRAPHQL_TRACING, "ALLOW_CLIENT_REQUESTS": False}
+    with override_settings(DEBUG=False, GRAPHQL_TRACING=production):
+        data = post_graphql(QUERY, HTTP_X_GRAPHQL_TRACE="1").json()
+    assert "tracing" not in data["extensions"]
@@ -1,3 +1,4 @@
+import json
 import sys
 import os
 import django
@@ -5,3 +6,73 @@ import django
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend_challenge.settings")
 django.setup()
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import Client
+
+
+@pytest.fixture
+def run_async():
+    """
+    Run a coroutine function to completion from a synchronous test.
+
+    async_to_sync keeps thread-sensitive sync_to_async calls on the test thread,
+    so ORM work done by async code shares the test's connection and transaction.
+    """
+
+    def run(coroutine_function, *args, **kwargs):
+        return async_to_sync(coroutine_function)(*args, **kwargs)
+
+    return run
+
+
+@pytest.fixture(autouse=True)
+def clear_entity_cache():
+    """
+    Start every test with an empty process-wide entity cache.
+    """
+    from apps.dataloaders import entity_cache
+
+    entity_cache.clear()
+    yield
+    entity_cache.clear()
+
+
+@pytest.fixture
+def post_graphql():
+    """
+    POST a GraphQL request to ``/graphql/`` as JSON and return the response.
+
+    Pass ``query`` and ``variables``, or a whole request ``body`` such as one
+    with ``extensions``. ``client`` keeps cookies across requests; other
+    keyword arguments become request headers, e.g. ``HTTP_ACCEPT``.
+    """
+
+    def post(query=None, variables=None, client=None, body=None, **extra):
+        if body is None:
+            body = {"query": query, "variables": variables}
+        return (client or Client()).post(
+            "/graphql/", data=json.dumps(body), content_type="application/json", **extra
+        )
+
+    return post
+
+
+@pytest.fixture
+def create_users_with_apps(db):
+    """
+    Create ``count`` HOBBY users owning ``apps_per_user`` apps each and return them.
+    """
+    from apps.models import DeployedApp, User
+
+    def create(count, apps_per_user=2):
+        users = [
+            User.objects.create(username=f"owner{i}", plan="HOBBY") for i in range(count)
+        ]
+        for user in users:
+            for _ in range(apps_per_user):
+                DeployedApp.objects.create(owner=user)
+        return users
+
+    return create